@@ -1,82 +1,141 @@
 # app.py - API Backend for Resume Screener
 import os
-import csv
 import json
+import time
+import hashlib
+import logging
+import zipfile
 from datetime import datetime
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify, stream_with_context
 from werkzeug.utils import secure_filename
-from parser import parse_resume
-from llm_client import rate_candidate
+from matcher import (
+    score_records, iter_scored, rank_results, passes_min_score, expand_results,
+    explain_results, resolve_mode, candidate_summary, MATCH_EXPLAIN_TOP
+)
+from prefilter import prefilter
+from storage import get_storage, FIELDNAMES
+from ingest import (
+    UPLOAD_FOLDER, get_ingest_queue, ingest_batch, store_upload, find_duplicate, content_hash, add_stored_listener
+)
+from requisitions import (
+    STATUSES as REQUISITION_STATUSES, STATUS_OPEN, REQUISITION_AUTO_SCORE, get_requisition_store, get_requisition_worker,
+    match_requisition, requisition_results
+)
+from score_cache import get_score_cache
+from llm_router import get_router
+from llm_scheduler import get_scheduler
+from match_runs import MATCH_DEADLINE_MS, MatchRun, get_match_runs, match_key
+from search_index import get_search_index
+from metrics import STAGE_SECONDS, HTTP_REQUEST_SECONDS, CACHE_LOOKUPS, render as render_metrics
 from flask_cors import CORS
 
 from dotenv import load_dotenv
 load_dotenv()
 
-UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "uploads")
+logging.basicConfig(
+    level=os.getenv("LOG_LEVEL", "INFO").upper(),
+    format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+)
+logger = logging.getLogger(__name__)
+
 if not os.path.exists(UPLOAD_FOLDER):
     os.makedirs(UPLOAD_FOLDER)
 
-# Use absolute path for CSV file in project root (parent of backend directory)
-CSV_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "resumes.csv")
 ALLOWED_EXT = {"pdf", "docx", "txt"}
 
-print(f"DEBUG: CSV_PATH is set to: {CSV_PATH}")
-print(f"DEBUG: UPLOAD_FOLDER is set to: {UPLOAD_FOLDER}")
+# Limits for /upload/batch (zip members count towards both)
+BATCH_MAX_FILES = int(os.getenv("BATCH_MAX_FILES", "1000"))
+BATCH_MAX_FILE_BYTES = int(os.getenv("BATCH_MAX_FILE_BYTES", str(20 * 1024 * 1024)))
+
+# /candidates pagination and projection; the raw resume text is opt-in
+CANDIDATES_DEFAULT_LIMIT = int(os.getenv("CANDIDATES_DEFAULT_LIMIT", "100"))
+CANDIDATES_MAX_LIMIT = int(os.getenv("CANDIDATES_MAX_LIMIT", "1000"))
+CANDIDATE_FIELDS = FIELDNAMES + ["created_at"]
+DEFAULT_CANDIDATE_FIELDS = [f for f in CANDIDATE_FIELDS if f != "text"]
+
+# Most candidates one /match/explain call (or a rank-mode explain_top) may explain
+MATCH_EXPLAIN_MAX = int(os.getenv("MATCH_EXPLAIN_MAX", "50"))
+
+# /search paging
+SEARCH_DEFAULT_LIMIT = int(os.getenv("SEARCH_DEFAULT_LIMIT", "20"))
+SEARCH_MAX_LIMIT = int(os.getenv("SEARCH_MAX_LIMIT", "200"))
+
+storage = get_storage()
+ingest_queue = get_ingest_queue()
+requisition_store = get_requisition_store()
+if REQUISITION_AUTO_SCORE:
+    # Newly ingested resumes are scored against open requisitions before anyone asks
+    add_stored_listener(get_requisition_worker().submit_candidates)
+search_index = get_search_index()
+# Ingested and re-parsed resumes are searchable as soon as they are stored
+add_stored_listener(search_index.update_candidates)
+logger.info("Storage engine: %s", type(storage).__name__)
+logger.info("UPLOAD_FOLDER is set to: %s", UPLOAD_FOLDER)
 
 def allowed_file(fn):
     return "." in fn and fn.rsplit(".",1)[1].lower() in ALLOWED_EXT
 
+def collect_batch_uploads(files):
+    """
+    Save every resume in a /upload/batch request, expanding zip archives.
+    Returns (items, skipped): items ready for ingest_batch() and status
+    entries for anything rejected before parsing.
+    """
+    items = []
+    skipped = []
+
+    def add(name, read_bytes, size):
+        filename = secure_filename(os.path.basename(name))
+        if not filename or not allowed_file(filename):
+            skipped.append({"filename": name, "status": "skipped", "candidate_id": None,
+                            "error": f"Invalid file type. Allowed: {', '.join(ALLOWED_EXT)}"})
+        elif size is not None and size > BATCH_MAX_FILE_BYTES:
+            skipped.append({"filename": name, "status": "skipped", "candidate_id": None,
+                            "error": f"File exceeds {BATCH_MAX_FILE_BYTES} bytes"})
+        elif len(items) >= BATCH_MAX_FILES:
+            skipped.append({"filename": name, "status": "skipped", "candidate_id": None,
+                            "error": f"Batch limit of {BATCH_MAX_FILES} files reached"})
+        else:
+            ext = filename.rsplit(".", 1)[1].lower()
+            digest, path = store_upload(read_bytes(), ext)
+            items.append({"filename": filename, "path": path, "ext": ext, "content_hash": digest})
+
+    for file in files:
+        if not file or file.filename == "":
+            continue
+        if file.filename.lower().endswith(".zip"):
+            try:
+                with zipfile.ZipFile(file.stream) as archive:
+                    for info in archive.infolist():
+                        if info.is_dir():
+                            continue
+                        add(info.filename, lambda info=info: archive.read(info), info.file_size)
+            except zipfile.BadZipFile as e:
+                skipped.append({"filename": file.filename, "status": "skipped", "candidate_id": None,
+                                "error": f"Invalid zip archive: {str(e)}"})
+        else:
+            add(file.filename, file.read, None)
+    return items, skipped
+
 def write_csv_record(rec: dict):
-    """Append record dict to resumes.csv (create header if not exists)."""
-    fieldnames = ["id","filename","name","email","phone","skills","education","experience","text"]
-    write_header = not os.path.exists(CSV_PATH)
+    """Persist a candidate record through the configured storage engine."""
     try:
-        with open(CSV_PATH, "a", newline="", encoding="utf-8") as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames, extrasaction='ignore')
-            if write_header:
-                writer.writeheader()
-            writer.writerow(rec)
-            print(f"DEBUG: Successfully wrote record to CSV: {rec['id']}")
-    except Exception as e:
-        print(f"DEBUG: Error writing to CSV: {str(e)}")
-        print(f"DEBUG: Record keys: {list(rec.keys())}")
-        print(f"DEBUG: Expected fieldnames: {fieldnames}")
+        storage.write_record(rec)
+        logger.debug("Wrote record %s", rec["id"])
+    except Exception:
+        logger.exception("Error writing record")
         raise
 
 def read_all_records():
-    """Read all from resumes.csv into list of dicts."""
-    if not os.path.exists(CSV_PATH):
-        print(f"DEBUG: CSV file does not exist at {CSV_PATH}")
-        return []
-
-    print(f"DEBUG: CSV file exists, reading from {CSV_PATH}")
+    """Read all candidate records from the configured storage engine."""
     try:
-        with open(CSV_PATH, 'r', encoding="utf-8") as f:
-            content = f.read()
-            print(f"DEBUG: CSV content length: {len(content)}")
-            print(f"DEBUG: First 200 chars: {content[:200]}")
-
-        with open(CSV_PATH, newline="", encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-            rows = list(reader)
-            print(f"DEBUG: Parsed {len(rows)} rows")
-
-            for i, row in enumerate(rows):
-                print(f"DEBUG: Row {i}: {row}")
-                if i >= 2:  # Only show first few rows
-                    break
-
-            return rows
-    except Exception as e:
-        print(f"DEBUG: Error reading CSV: {str(e)}")
+        return storage.read_all()
+    except Exception:
+        logger.exception("Error reading records")
         return []
 
 def get_record_by_id(rec_id: str):
-    recs = read_all_records()
-    for rec in recs:
-        if rec["id"] == rec_id:
-            return rec
-    return None
+    return storage.get_by_id(rec_id)
 
 app = Flask(__name__)
 app.config["SECRET_KEY"] = os.getenv("SECRET_KEY", "change-me")
@@ -85,11 +144,28 @@ app.config["UPLOAD_FOLDER"] = UPLOAD_FOLDER
 # Enable CORS for frontend communication
 CORS(app, origins=["http://localhost:8501", "http://127.0.0.1:8501"])
 
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_latency(response):
+    started = g.pop("request_started", None)
+    if started is not None:
+        endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+        HTTP_REQUEST_SECONDS.observe(
+            time.perf_counter() - started,
+            method=request.method, endpoint=endpoint, status=response.status_code
+        )
+    return response
+
 # Response helper functions
-def success_response(data=None, message="Success", code=200):
+def success_response(data=None, message="Success", code=200, extra=None):
     response = {"success": True, "message": message}
     if data is not None:
         response["data"] = data
+    if extra:
+        response.update(extra)
     return jsonify(response), code
 
 def error_response(message="Error", code=400, error=None):
@@ -105,12 +181,11 @@ def index():
 @app.route("/upload", methods=["POST"])
 def upload():
     try:
-        print("DEBUG: Upload endpoint called")
         if "resume" not in request.files:
             return error_response("No file part in the request", 400)
 
         file = request.files["resume"]
-        print(f"DEBUG: File received: {file.filename}")
+        logger.debug("Upload received: %s", file.filename)
         if file.filename == "":
             return error_response("No file selected", 400)
 
@@ -118,66 +193,185 @@ def upload():
             return error_response(f"Invalid file type. Allowed: {', '.join(ALLOWED_EXT)}", 400)
 
         filename = secure_filename(file.filename)
-        path = os.path.join(app.config["UPLOAD_FOLDER"], filename)
-        print(f"DEBUG: Saving file to: {path}")
-        file.save(path)
-        print(f"DEBUG: File saved successfully")
-
         ext = filename.rsplit(".", 1)[1].lower()
-        print(f"DEBUG: File extension: {ext}")
-        print(f"DEBUG: About to parse resume...")
-        parsed = parse_resume(path, ext)
-        print(f"DEBUG: Resume parsed successfully")
-        print(f"DEBUG: Parsed keys: {list(parsed.keys())}")
-
-        recs = read_all_records()
-        new_id = str(len(recs) + 1)
-
-        # Extract skills from skills_section (parser returns skills_section, not skills list)
-        skills_section = parsed.get("skills_section") or ""
-        # Convert skills_section text to a simple string (keep newlines as semicolons for CSV)
-        skills_str = skills_section.replace("\n", "; ").strip()
-
-        rec = {
-            "id": new_id,
-            "filename": filename,
-            "name": parsed.get("name") or "",
-            "email": parsed.get("email") or "",
-            "phone": parsed.get("phone") or "",
-            "skills": skills_str,
-            "education": parsed.get("education") or "",
-            "experience": parsed.get("experience") or "",
-            "text": parsed.get("text") or "",
-            "created_at": datetime.now().isoformat()
-        }
-
-        write_csv_record(rec)
+        data = file.read()
+
+        # Exact bytes seen before: return the existing candidate without parsing
+        duplicate = find_duplicate(content_hash(data))
+        CACHE_LOOKUPS.inc(cache="parse", result="hit" if duplicate else "miss")
+        if duplicate:
+            logger.debug("Duplicate upload of candidate %s", duplicate["id"])
+            return success_response({
+                "candidate": duplicate,
+                "duplicate": True,
+                "status": "done",
+                "message": "Resume already ingested"
+            }, "Resume already ingested")
+
+        digest, path = store_upload(data, ext)
+
+        # Parsing happens on an ingest worker; poll /jobs/<job_id> for the result
+        job = ingest_queue.submit(filename, path, ext, digest)
+        logger.debug("Queued ingest job %s for %s (%s)", job["id"], filename, path)
 
         return success_response({
-            "candidate": rec,
-            "message": "Resume uploaded and parsed successfully"
-        })
+            "job_id": job["id"],
+            "status": job["status"],
+            "status_url": f"/jobs/{job['id']}",
+            "message": "Resume uploaded and queued for parsing"
+        }, "Resume queued for parsing", 202)
 
     except Exception as e:
-        import traceback
-        print(f"DEBUG: Upload exception: {str(e)}")
-        print(f"DEBUG: Traceback: {traceback.format_exc()}")
+        logger.exception("Upload failed")
         return error_response(f"Upload failed: {str(e)}", 500, e)
 
+@app.route("/upload/batch", methods=["POST"])
+def upload_batch():
+    """
+    Ingest many resumes in one request: any number of "resumes" file fields
+    and/or zip archives. Files are parsed in a process pool and all records
+    are committed in one storage transaction.
+    """
+    try:
+        files = request.files.getlist("resumes") + request.files.getlist("resume")
+        if not files:
+            return error_response("No files in the request", 400)
+
+        items, skipped = collect_batch_uploads(files)
+        logger.debug("Batch upload saved %d files, skipped %d", len(items), len(skipped))
+        report = ingest_batch(items) if items else []
+        report.extend(skipped)
+
+        succeeded = sum(1 for entry in report if entry["status"] in ("done", "duplicate"))
+        return success_response({
+            "files": report,
+            "total_files": len(report),
+            "succeeded": succeeded,
+            "duplicates": sum(1 for entry in report if entry["status"] == "duplicate"),
+            "failed": len(report) - succeeded
+        }, f"Processed {succeeded} of {len(report)} files")
+
+    except Exception as e:
+        return error_response(f"Batch upload failed: {str(e)}", 500, e)
+
+@app.route("/jobs/<job_id>")
+def job_status(job_id):
+    try:
+        job = ingest_queue.jobs.get(job_id)
+        if job is None:
+            return error_response(f"Job with ID {job_id} not found", 404)
+        job.pop("path", None)
+        return success_response(job, f"Job is {job['status']}")
+    except Exception as e:
+        return error_response(f"Failed to retrieve job: {str(e)}", 500, e)
+
+def parse_candidate_fields(raw):
+    """Resolve the fields= query parameter; the raw resume text is left out unless asked for."""
+    if raw is None:
+        return DEFAULT_CANDIDATE_FIELDS
+    if raw in ("*", "all"):
+        return CANDIDATE_FIELDS
+    fields = [f.strip() for f in raw.split(",") if f.strip()]
+    unknown = [f for f in fields if f not in CANDIDATE_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}. Allowed: {', '.join(CANDIDATE_FIELDS)}")
+    return fields
+
+def parse_include(include):
+    """Record fields for a match request's include (list or comma string), or None for compact rows."""
+    if isinstance(include, list):
+        include = ",".join(str(field) for field in include)
+    return parse_candidate_fields(include) if include else None
+
 @app.route("/candidates")
 def candidates():
+    """
+    Paginated candidate list: ?limit=&offset=&fields=a,b,c (fields=* includes text).
+    Responses carry an ETag derived from the corpus version and the query, and
+    If-None-Match requests for an unchanged page get 304 with no body.
+    """
     try:
-        recs = read_all_records()
-        print(f"DEBUG Backend: About to return {len(recs)} candidates")
-        print(f"DEBUG Backend: First candidate: {recs[0] if recs else 'None'}")
-        print(f"DEBUG Backend: First candidate type: {type(recs[0]) if recs else 'N/A'}")
-        response_data = success_response(recs, f"Retrieved {len(recs)} candidates")
-        print(f"DEBUG Backend: Response data: {response_data[0].get_json()}")
-        return response_data
+        try:
+            limit = int(request.args.get("limit", CANDIDATES_DEFAULT_LIMIT))
+            offset = int(request.args.get("offset", 0))
+            fields = parse_candidate_fields(request.args.get("fields"))
+        except ValueError as e:
+            return error_response(f"Invalid query parameters: {str(e)}", 400, e)
+        limit = max(1, min(limit, CANDIDATES_MAX_LIMIT))
+        offset = max(0, offset)
+
+        etag = hashlib.sha1(
+            f"{storage.version()}|{limit}|{offset}|{','.join(fields)}".encode("utf-8")
+        ).hexdigest()
+        if request.if_none_match.contains(etag):
+            not_modified = Response(status=304)
+            not_modified.set_etag(etag)
+            return not_modified
+
+        recs = storage.list_records(limit=limit, offset=offset, fields=fields)
+        total = storage.count()
+        next_offset = offset + len(recs) if offset + len(recs) < total else None
+
+        response, code = success_response(recs, f"Retrieved {len(recs)} candidates", extra={
+            "pagination": {"total": total, "limit": limit, "offset": offset, "next_offset": next_offset}
+        })
+        response.set_etag(etag)
+        return response, code
     except Exception as e:
-        print(f"DEBUG Backend: Error: {str(e)}")
+        logger.exception("Failed to retrieve candidates")
         return error_response(f"Failed to retrieve candidates: {str(e)}", 500, e)
 
+@app.route("/search")
+def search():
+    """
+    Full-text candidate search without the LLM: ?q=&limit=&offset=&include=.
+    q supports AND / OR / NOT (or -term), parentheses, "phrases" and field
+    filters on skills, experience, education and text; adjacent terms are ANDed.
+    """
+    try:
+        query = request.args.get("q", "").strip()
+        if not query:
+            return error_response("Query parameter q is required", 400)
+        try:
+            limit = max(1, min(int(request.args.get("limit", SEARCH_DEFAULT_LIMIT)), SEARCH_MAX_LIMIT))
+            offset = max(0, int(request.args.get("offset", 0)))
+            include = parse_include(request.args.get("include"))
+            found = search_index.search(query, limit, offset)
+        except ValueError as e:
+            return error_response(f"Invalid search: {str(e)}", 400, e)
+
+        recs_by_id = {}
+        hits = []
+        for hit in found["hits"]:
+            rec = get_record_by_id(hit["candidate_id"])
+            if rec is None:
+                continue
+            recs_by_id[rec["id"]] = rec
+            hits.append(dict(hit, candidate_name=rec.get("name") or rec.get("filename"),
+                             candidate=candidate_summary(rec)))
+        expand_results(hits, recs_by_id, include)
+
+        total = found["total"]
+        next_offset = offset + limit if offset + limit < total else None
+        return success_response({
+            "query": query,
+            "hits": hits,
+            "total_hits": total,
+            "took_ms": found["took_ms"]
+        }, f"Found {total} candidates", extra={
+            "pagination": {"total": total, "limit": limit, "offset": offset, "next_offset": next_offset}
+        })
+    except Exception as e:
+        logger.exception("Search failed")
+        return error_response(f"Search failed: {str(e)}", 500, e)
+
+@app.route("/search/stats")
+def search_stats():
+    try:
+        return success_response(search_index.stats(), "Search index statistics")
+    except Exception as e:
+        return error_response(f"Failed to read search index statistics: {str(e)}", 500, e)
+
 @app.route("/candidate/<rec_id>")
 def candidate(rec_id):
     try:
@@ -192,74 +386,421 @@ def candidate(rec_id):
     except Exception as e:
         return error_response(f"Failed to retrieve candidate: {str(e)}", 500, e)
 
+def read_match_request():
+    """Validate a /match style JSON body. Returns (data, None) or (None, error response)."""
+    if not request.is_json:
+        return None, error_response("Content-Type must be application/json", 400)
+
+    data = request.get_json()
+    if not data:
+        return None, error_response("No JSON data provided", 400)
+
+    data["job_description"] = data.get("job_description", "").strip()
+    if not data["job_description"]:
+        return None, error_response("Job description is required", 400)
+
+    # Checked before any run starts, so a bad value cannot leave LLM calls running for a failed request
+    try:
+        data["min_score"] = float(data.get("min_score", 0.0))
+    except (TypeError, ValueError) as e:
+        return None, error_response(f"Invalid min_score: {str(e)}", 400, e)
+    if data["min_score"] != data["min_score"]:
+        return None, error_response("min_score must be a number", 400)
+
+    # include: record fields to embed per result as candidate_data ("*" = everything, text included)
+    try:
+        data["include"] = parse_include(data.get("include"))
+    except ValueError as e:
+        return None, error_response(f"Invalid include: {str(e)}", 400, e)
+
+    # mode: "full" scores with justifications, "rank" asks for scores only and
+    # explains just the explain_top best rows
+    try:
+        data["mode"] = resolve_mode(data.get("mode"))
+        data["explain_top"] = int(data.get("explain_top", MATCH_EXPLAIN_TOP))
+    except (TypeError, ValueError) as e:
+        return None, error_response(f"Invalid mode or explain_top: {str(e)}", 400, e)
+    if not 0 <= data["explain_top"] <= MATCH_EXPLAIN_MAX:
+        return None, error_response(f"explain_top must be between 0 and {MATCH_EXPLAIN_MAX}", 400)
+
+    # deadline_ms: answer with the rows scored by then; the rest are scored in the background
+    try:
+        deadline_ms = data.get("deadline_ms")
+        data["deadline_ms"] = MATCH_DEADLINE_MS if deadline_ms is None else int(deadline_ms)
+    except (TypeError, ValueError) as e:
+        return None, error_response(f"Invalid deadline_ms: {str(e)}", 400, e)
+    if data["deadline_ms"] < 0:
+        return None, error_response("deadline_ms must not be negative", 400)
+    return data, None
+
+def match_run_response(run: MatchRun, min_score: float = None, include=None, coalesced: bool = None):
+    data = run.snapshot(min_score, include)
+    if coalesced is not None:
+        data["coalesced"] = coalesced
+    if data["partial"]:
+        message = (f"Matched {data['matched_candidates']} candidates so far; "
+                   f"{data['pending_candidates']} still being scored")
+    elif run.error:
+        return error_response(f"Matching failed: {run.error}", 500, run.error)
+    else:
+        message = f"Matched {data['matched_candidates']} candidates against job description"
+    return success_response(data, message)
+
 @app.route("/match", methods=["POST"])
 def match():
     try:
-        if not request.is_json:
-            return error_response("Content-Type must be application/json", 400)
+        data, error = read_match_request()
+        if error:
+            return error
+
+        job_desc = data["job_description"]
+
+        # Identical requests (same normalized JD, corpus and scoring options) share one
+        # in-flight run; each applies its own min_score and include to the result
+        runs = get_match_runs()
+        key = match_key(job_desc, data, storage.version())
+        run = runs.find(key)
+        coalesced = run is not None
+        if run is None:
+            recs = read_all_records()
+            # Stage 1: local BM25 ranking; only the top_k go on to the LLM
+            with STAGE_SECONDS.time(stage="prefilter"):
+                shortlisted, pruned = prefilter(recs, job_desc, data.get("top_k"))
+            run, coalesced = runs.add(MatchRun(job_desc, shortlisted, data, len(recs), pruned, key))
+
+        run.wait(data["deadline_ms"] / 1000.0 if data["deadline_ms"] else None)
+        # The caller's own options, never the run's: no include means compact rows
+        return match_run_response(run, data["min_score"], data["include"] or (), coalesced)
 
-        data = request.get_json()
-        if not data:
-            return error_response("No JSON data provided", 400)
+    except Exception as e:
+        return error_response(f"Matching failed: {str(e)}", 500, e)
 
-        job_desc = data.get("job_description", "").strip()
-        if not job_desc:
-            return error_response("Job description is required", 400)
+@app.route("/match/runs/<token>")
+def match_run(token):
+    """
+    Results of a /match that hit its deadline_ms, by its continuation_token:
+    everything scored so far, with partial=false once the background run is done.
+    ?min_score= and ?include= default to the values of the request that started the run.
+    """
+    try:
+        run = get_match_runs().get(token)
+        if run is None:
+            return error_response(f"Match run {token} not found or expired", 404)
+        try:
+            min_score = float(request.args["min_score"]) if "min_score" in request.args else None
+            include = parse_include(request.args.get("include"))
+        except ValueError as e:
+            return error_response(f"Invalid query parameter: {str(e)}", 400, e)
+        return match_run_response(run, min_score, include)
 
-        min_score = data.get("min_score", 0.0)
+    except Exception as e:
+        return error_response(f"Matching failed: {str(e)}", 500, e)
+
+@app.route("/match/stream", methods=["POST"])
+def match_stream():
+    """
+    Streaming variant of /match. Emits NDJSON events: one "start" event, a
+    "result" event per candidate as soon as it is scored (completion order,
+    filtered by min_score), then a "summary" event with the final ranking.
+    In rank mode an "explanation" event with the completed row follows the
+    summary for each of the explain_top best candidates.
+    """
+    try:
+        data, error = read_match_request()
+        if error:
+            return error
 
+        job_desc = data["job_description"]
+        min_score = data["min_score"]
         recs = read_all_records()
-        results = []
+        with STAGE_SECONDS.time(stage="prefilter"):
+            shortlisted, pruned = prefilter(recs, job_desc, data.get("top_k"))
+        shortlisted_by_id = {rec["id"]: rec for rec in shortlisted}
+    except Exception as e:
+        return error_response(f"Matching failed: {str(e)}", 500, e)
 
-        for rec in recs:
-            skills_section_text = rec.get("skills_section", "") or rec.get("text", "")[:2000]
+    def events():
+        yield json.dumps({
+            "event": "start",
+            "total_candidates": len(recs),
+            "scored_candidates": len(shortlisted),
+            "pruned_count": len(recs) - len(shortlisted),
+            "pruned_candidates": pruned
+        }) + "\n"
 
-            try:
-                resp = rate_candidate(skills_section_text, job_desc)
-                score = float(resp.get("score", 0.0))
-                justification = resp.get("justification", resp.get("raw", ""))
-                matches = resp.get("matches", [])
-                recommendation = resp.get("recommendation", "")
-
-                # Only include if score meets minimum threshold
-                if score >= min_score:
-                    results.append({
-                        "candidate_id": rec["id"],
-                        "candidate_name": rec.get("name") or rec.get("filename"),
-                        "score": score,
-                        "justification": justification,
-                        "matches": matches,
-                        "recommendation": recommendation,
-                        "candidate_data": rec
-                    })
+        results = []
+        score_only = data["mode"] == "rank"
+        scoring_started = time.perf_counter()
+        try:
+            for result in iter_scored(shortlisted, job_desc, data.get("concurrency"), data.get("batch_size"),
+                                      score_only):
+                if passes_min_score(result, min_score):
+                    expand_results([result], shortlisted_by_id, data["include"])
+                    results.append(result)
+                    yield json.dumps({"event": "result", "result": result}) + "\n"
+        except Exception as e:
+            yield json.dumps({"event": "error", "message": f"Matching failed: {str(e)}"}) + "\n"
+            return
+
+        STAGE_SECONDS.observe(time.perf_counter() - scoring_started, stage="match_scoring")
+        ranked = rank_results(results, min_score)
+        yield json.dumps({
+            "event": "summary",
+            "ranking": [r["candidate_id"] for r in ranked],
+            "total_candidates": len(recs),
+            "scored_candidates": len(shortlisted),
+            "matched_candidates": len(ranked),
+            "min_score": min_score,
+            "mode": data["mode"],
+            "timestamp": datetime.now().isoformat()
+        }) + "\n"
 
+        if score_only and data["explain_top"]:
+            top = [r for r in ranked[:data["explain_top"]] if not r["explained"]]
+            try:
+                with STAGE_SECONDS.time(stage="match_explain"):
+                    explain_results(top, shortlisted_by_id, job_desc, data.get("concurrency"))
             except Exception as e:
-                # Include error cases with score 0
-                results.append({
-                    "candidate_id": rec["id"],
-                    "candidate_name": rec.get("name") or rec.get("filename"),
-                    "score": 0.0,
-                    "justification": f"LLM error: {str(e)}",
-                    "matches": [],
-                    "recommendation": "",
-                    "candidate_data": rec,
-                    "error": str(e)
-                })
-
-        # Sort by score descending
-        results.sort(key=lambda x: x["score"], reverse=True)
+                yield json.dumps({"event": "error", "message": f"Explaining results failed: {str(e)}"}) + "\n"
+                return
+            for result in top:
+                yield json.dumps({"event": "explanation", "result": result}) + "\n"
+
+    return Response(stream_with_context(events()), mimetype="application/x-ndjson")
+
+@app.route("/match/explain", methods=["POST"])
+def match_explain():
+    """
+    Justification, matches and recommendation for chosen candidates, e.g. the
+    ones a user opens after a rank-mode /match. Body: job_description and
+    candidate_ids. Scores come from the full scoring prompt and can differ
+    slightly from the ranking pass; repeated calls are served by the score cache.
+    """
+    try:
+        if not request.is_json:
+            return error_response("Content-Type must be application/json", 400)
+        data = request.get_json() or {}
+        job_desc = str(data.get("job_description", "")).strip()
+        if not job_desc:
+            return error_response("Job description is required", 400)
+
+        candidate_ids = data.get("candidate_ids")
+        if isinstance(candidate_ids, str):
+            candidate_ids = [cid for cid in candidate_ids.split(",") if cid.strip()]
+        if not candidate_ids or not isinstance(candidate_ids, list):
+            return error_response("candidate_ids must be a non-empty list", 400)
+        if len(candidate_ids) > MATCH_EXPLAIN_MAX:
+            return error_response(f"At most {MATCH_EXPLAIN_MAX} candidates can be explained per request", 400)
+
+        try:
+            include = parse_include(data.get("include"))
+        except ValueError as e:
+            return error_response(f"Invalid include: {str(e)}", 400, e)
+
+        recs = []
+        missing = []
+        for cid in dict.fromkeys(str(cid).strip() for cid in candidate_ids):
+            rec = get_record_by_id(cid)
+            if rec is None:
+                missing.append(cid)
+            else:
+                recs.append(rec)
+        if not recs:
+            return error_response("None of the requested candidates were found", 404)
+
+        with STAGE_SECONDS.time(stage="match_explain"):
+            results = score_records(recs, job_desc, data.get("concurrency"))
+        expand_results(results, {rec["id"]: rec for rec in recs}, include)
 
         return success_response({
             "job_description": job_desc,
             "results": results,
-            "total_candidates": len(recs),
-            "matched_candidates": len(results),
-            "min_score": min_score,
+            "missing_ids": missing,
             "timestamp": datetime.now().isoformat()
-        }, f"Matched {len(results)} candidates against job description")
+        }, f"Explained {len(results)} candidates")
 
     except Exception as e:
-        return error_response(f"Matching failed: {str(e)}", 500, e)
+        return error_response(f"Explaining candidates failed: {str(e)}", 500, e)
+
+def read_requisition_fields(data: dict, partial: bool = False) -> dict:
+    """
+    Validate requisition fields from a JSON body. partial=True (updates) only
+    checks the fields present. Raises ValueError.
+    """
+    fields = {}
+    if "title" in data or not partial:
+        fields["title"] = str(data.get("title") or "").strip()
+        if not fields["title"]:
+            raise ValueError("title is required")
+    if "job_description" in data or not partial:
+        fields["job_description"] = str(data.get("job_description") or "").strip()
+        if not fields["job_description"]:
+            raise ValueError("job_description is required")
+    if "min_score" in data or not partial:
+        fields["min_score"] = float(data.get("min_score", 0.0))
+    if "top_k" in data:
+        fields["top_k"] = None if data["top_k"] is None else int(data["top_k"])
+    if "status" in data:
+        if data["status"] not in REQUISITION_STATUSES:
+            raise ValueError(f"status must be one of {', '.join(REQUISITION_STATUSES)}")
+        fields["status"] = data["status"]
+    return fields
+
+def requisition_summary(req: dict) -> dict:
+    return dict(req, scored_candidates=requisition_store.result_count(req["id"]))
+
+@app.route("/requisitions", methods=["GET", "POST"])
+def requisitions():
+    """
+    GET lists saved requisitions (?status=open|closed). POST saves one from
+    {title, job_description, min_score, top_k} and scores the corpus against it
+    in the background.
+    """
+    try:
+        if request.method == "GET":
+            status = request.args.get("status")
+            reqs = [requisition_summary(req) for req in requisition_store.list(status)]
+            return success_response(reqs, f"Retrieved {len(reqs)} requisitions")
+
+        if not request.is_json:
+            return error_response("Content-Type must be application/json", 400)
+        try:
+            fields = read_requisition_fields(request.get_json() or {})
+        except (TypeError, ValueError) as e:
+            return error_response(f"Invalid requisition: {str(e)}", 400, e)
+        req = requisition_store.create(fields["title"], fields["job_description"], fields["min_score"],
+                                       fields.get("top_k"))
+        get_requisition_worker().submit_requisition(req["id"])
+        return success_response(requisition_summary(req), "Requisition saved; scoring started", 201)
+    except Exception as e:
+        return error_response(f"Requisition request failed: {str(e)}", 500, e)
+
+@app.route("/requisitions/<req_id>", methods=["GET", "PATCH", "DELETE"])
+def requisition(req_id):
+    """
+    GET returns one requisition, PATCH changes any of title, job_description,
+    status, min_score and top_k (a new job description discards its stored
+    results and triggers a fresh background run), DELETE removes it.
+    """
+    try:
+        req = requisition_store.get(req_id)
+        if req is None:
+            return error_response(f"Requisition with ID {req_id} not found", 404)
+
+        if request.method == "DELETE":
+            requisition_store.delete(req_id)
+            return success_response({"id": req_id}, "Requisition deleted")
+
+        if request.method == "PATCH":
+            if not request.is_json:
+                return error_response("Content-Type must be application/json", 400)
+            try:
+                fields = read_requisition_fields(request.get_json() or {}, partial=True)
+            except (TypeError, ValueError) as e:
+                return error_response(f"Invalid requisition: {str(e)}", 400, e)
+            rescore = fields.get("job_description", req["job_description"]) != req["job_description"] or (
+                fields.get("status") == STATUS_OPEN and req["status"] != STATUS_OPEN
+            )
+            req = requisition_store.update(req_id, **fields)
+            if rescore:
+                get_requisition_worker().submit_requisition(req_id)
+            return success_response(requisition_summary(req), "Requisition updated")
+
+        return success_response(requisition_summary(req), "Requisition retrieved")
+    except Exception as e:
+        return error_response(f"Requisition request failed: {str(e)}", 500, e)
+
+def requisition_results_response(req: dict, run: dict = None):
+    """Stored results of a requisition, filtered by ?min_score= (default: the requisition's) and paged."""
+    try:
+        min_score = request.args.get("min_score", type=float)
+        limit = request.args.get("limit", type=int)
+        offset = max(0, request.args.get("offset", 0, type=int))
+        include = parse_include(request.args.get("include"))
+    except ValueError as e:
+        return error_response(f"Invalid query parameters: {str(e)}", 400, e)
+
+    results = requisition_results(req, min_score)
+    total = len(results)
+    page = results[offset:offset + limit] if limit is not None else results[offset:]
+    if include:
+        expand_results(page, {r["candidate_id"]: storage.get_by_id(r["candidate_id"]) or {} for r in page}, include)
+
+    data = {
+        "requisition": requisition_summary(req),
+        "results": page,
+        "matched_candidates": total,
+        "min_score": req["min_score"] if min_score is None else min_score,
+        "timestamp": datetime.now().isoformat()
+    }
+    if run is not None:
+        # Freshly failed candidates are reported here but never stored
+        data.update(
+            newly_scored=run["scored"],
+            reused_scores=run["reused"],
+            total_candidates=run["total_candidates"],
+            scored_candidates=run["shortlisted_candidates"],
+            pruned_count=run["pruned_count"],
+            pruned_candidates=run["pruned_candidates"],
+            errors=run["errors"]
+        )
+    return success_response(data, f"Requisition has {total} matching candidates")
+
+@app.route("/requisitions/<req_id>/results")
+def requisition_results_view(req_id):
+    """Stored match results of a requisition; no LLM calls."""
+    try:
+        req = requisition_store.get(req_id)
+        if req is None:
+            return error_response(f"Requisition with ID {req_id} not found", 404)
+        return requisition_results_response(req)
+    except Exception as e:
+        return error_response(f"Failed to read requisition results: {str(e)}", 500, e)
+
+@app.route("/requisitions/<req_id>/match", methods=["POST"])
+def requisition_match(req_id):
+    """
+    Re-match a requisition incrementally: only candidates added or changed since
+    their stored result (or never scored) go to the LLM. Optional JSON body:
+    concurrency, batch_size. Query parameters as for /results.
+    """
+    try:
+        req = requisition_store.get(req_id)
+        if req is None:
+            return error_response(f"Requisition with ID {req_id} not found", 404)
+        data = request.get_json(silent=True) or {}
+        run = match_requisition(req, data.get("concurrency"), data.get("batch_size"))
+        return requisition_results_response(requisition_store.get(req_id), run)
+    except Exception as e:
+        return error_response(f"Requisition match failed: {str(e)}", 500, e)
+
+@app.route("/cache/stats")
+def cache_stats():
+    try:
+        cache = get_score_cache()
+        stats = cache.stats() if cache else {"enabled": False}
+        return success_response(stats, "Score cache statistics")
+    except Exception as e:
+        return error_response(f"Failed to read cache statistics: {str(e)}", 500, e)
+
+@app.route("/llm/backends")
+def llm_backends():
+    try:
+        return success_response(get_router().snapshot(), "LLM backend health")
+    except Exception as e:
+        return error_response(f"Failed to read LLM backend health: {str(e)}", 500, e)
+
+@app.route("/llm/scheduler")
+def llm_scheduler_stats():
+    try:
+        return success_response(get_scheduler().stats(), "LLM scheduler statistics")
+    except Exception as e:
+        return error_response(f"Failed to read LLM scheduler statistics: {str(e)}", 500, e)
+
+@app.route("/metrics")
+def metrics():
+    """Prometheus scrape endpoint: stage and request latency histograms plus LLM and cache counters."""
+    return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
 
 if __name__ == "__main__":
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,510 @@
+# ingest.py - Background resume ingestion with a persistent job table
+import os
+import time
+import uuid
+import hashlib
+import argparse
+import logging
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from parser import parse_resume, PARSER_VERSION
+from storage import DB_PATH, get_storage, open_sqlite
+from metrics import STAGE_SECONDS, CACHE_LOOKUPS, timed
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_FOLDER = os.getenv("UPLOAD_FOLDER", os.path.join(os.path.dirname(os.path.abspath(__file__)), "uploads"))
+
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "2"))
+INGEST_DB_PATH = os.getenv("INGEST_DB_PATH", DB_PATH)
+
+# Processes parsing /upload/batch files; pdfminer is CPU-bound, so threads would serialize on the GIL
+BATCH_PARSE_PROCESSES = int(os.getenv("BATCH_PARSE_PROCESSES", "0")) or os.cpu_count() or 1
+
+# Job lifecycle: queued -> parsing -> done | failed
+JOB_QUEUED = "queued"
+JOB_PARSING = "parsing"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+# Batch report only: the exact bytes were ingested before
+JOB_DUPLICATE = "duplicate"
+
+# Serializes the duplicate check and record write so identical uploads in flight become one candidate
+_ingest_lock = threading.Lock()
+
+# Callbacks run with the ids of candidates added or re-parsed by ingestion
+_stored_listeners = []
+
+
+def add_stored_listener(callback):
+    """Register callback(candidate_ids), called after ingestion writes new or changed candidates."""
+    _stored_listeners.append(callback)
+
+
+def notify_stored(candidate_ids: list):
+    if not candidate_ids:
+        return
+    for callback in _stored_listeners:
+        try:
+            callback(candidate_ids)
+        except Exception:
+            logger.exception("Ingest listener failed")
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def content_path(digest: str, ext: str) -> str:
+    """Content-addressed upload path, sharded as uploads/ab/cd/<sha256>.<ext>."""
+    return os.path.join(UPLOAD_FOLDER, digest[:2], digest[2:4], f"{digest}.{ext}")
+
+
+@timed("file_save")
+def store_upload(data: bytes, ext: str):
+    """
+    Save upload bytes under their SHA-256 and return (digest, path).
+    Identical bytes map to the same file, so nothing is ever overwritten
+    with different content.
+    """
+    digest = content_hash(data)
+    path = content_path(digest, ext)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "wb") as out:
+            out.write(data)
+        os.replace(tmp_path, path)
+    return digest, path
+
+
+def build_record(parsed: dict, filename: str) -> dict:
+    """Turn parse_resume() output into a candidate record (id is assigned by storage)."""
+    # Extract skills from skills_section (parser returns skills_section, not skills list)
+    skills_section = parsed.get("skills_section") or ""
+    # Convert skills_section text to a simple string (keep newlines as semicolons for CSV)
+    skills_str = skills_section.replace("\n", "; ").strip()
+
+    return {
+        "id": None,
+        "filename": filename,
+        "name": parsed.get("name") or "",
+        "email": parsed.get("email") or "",
+        "phone": parsed.get("phone") or "",
+        "skills": skills_str,
+        "education": parsed.get("education") or "",
+        "experience": parsed.get("experience") or "",
+        "text": parsed.get("text") or "",
+        "created_at": datetime.now().isoformat()
+    }
+
+
+class JobStore:
+    """SQLite table tracking every ingestion job, so status survives restarts."""
+
+    def __init__(self, path: str = INGEST_DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS ingest_jobs (
+                    id TEXT PRIMARY KEY,
+                    filename TEXT NOT NULL,
+                    path TEXT NOT NULL,
+                    ext TEXT NOT NULL,
+                    content_hash TEXT,
+                    status TEXT NOT NULL,
+                    candidate_id TEXT,
+                    error TEXT,
+                    created_at TEXT NOT NULL,
+                    updated_at TEXT NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_ingest_jobs_status ON ingest_jobs(status)")
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(ingest_jobs)")}
+            if "content_hash" not in columns:
+                conn.execute("ALTER TABLE ingest_jobs ADD COLUMN content_hash TEXT")
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = open_sqlite(self.path)
+            self._local.conn = conn
+        return conn
+
+    def create(self, filename: str, path: str, ext: str, digest: str = None) -> dict:
+        now = datetime.now().isoformat()
+        job = {
+            "id": uuid.uuid4().hex,
+            "filename": filename,
+            "path": path,
+            "ext": ext,
+            "content_hash": digest,
+            "status": JOB_QUEUED,
+            "candidate_id": None,
+            "error": None,
+            "created_at": now,
+            "updated_at": now
+        }
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT INTO ingest_jobs (id, filename, path, ext, content_hash, status, candidate_id, error, created_at, updated_at) "
+                "VALUES (:id, :filename, :path, :ext, :content_hash, :status, :candidate_id, :error, :created_at, :updated_at)",
+                job,
+            )
+        return job
+
+    def update(self, job_id: str, status: str, candidate_id: str = None, error: str = None):
+        with self._conn() as conn:
+            conn.execute(
+                "UPDATE ingest_jobs SET status = ?, candidate_id = ?, error = ?, updated_at = ? WHERE id = ?",
+                (status, candidate_id, error, datetime.now().isoformat(), job_id),
+            )
+
+    def get(self, job_id: str):
+        row = self._conn().execute("SELECT * FROM ingest_jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def unfinished(self) -> list:
+        rows = self._conn().execute(
+            "SELECT * FROM ingest_jobs WHERE status IN (?, ?) ORDER BY created_at",
+            (JOB_QUEUED, JOB_PARSING),
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+
+class ParseCache:
+    """
+    Maps a resume's content hash to the candidate parsed from it and the
+    PARSER_VERSION that produced it. An entry only counts as a hit while its
+    parser_version matches the current PARSER_VERSION; older entries are
+    re-parsed into the same candidate id (see reparse_stale()).
+    """
+
+    def __init__(self, path: str = INGEST_DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS parse_cache (
+                    content_hash TEXT PRIMARY KEY,
+                    parser_version TEXT NOT NULL,
+                    candidate_id TEXT NOT NULL,
+                    ext TEXT NOT NULL,
+                    updated_at TEXT NOT NULL
+                )
+                """
+            )
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = open_sqlite(self.path)
+            self._local.conn = conn
+        return conn
+
+    def get(self, digest: str):
+        row = self._conn().execute("SELECT * FROM parse_cache WHERE content_hash = ?", (digest,)).fetchone()
+        return dict(row) if row else None
+
+    def put(self, digest: str, candidate_id: str, ext: str, parser_version: str = None):
+        parser_version = parser_version or PARSER_VERSION
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO parse_cache (content_hash, parser_version, candidate_id, ext, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (digest, parser_version, candidate_id, ext, datetime.now().isoformat()),
+            )
+
+    def stale(self, include_current: bool = False) -> list:
+        """Entries produced by an older parser version (or every entry)."""
+        if include_current:
+            rows = self._conn().execute("SELECT * FROM parse_cache").fetchall()
+        else:
+            rows = self._conn().execute(
+                "SELECT * FROM parse_cache WHERE parser_version != ?", (PARSER_VERSION,)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+
+_parse_cache = None
+_parse_cache_lock = threading.Lock()
+
+
+def get_parse_cache() -> ParseCache:
+    global _parse_cache
+    if _parse_cache is None:
+        with _parse_cache_lock:
+            if _parse_cache is None:
+                _parse_cache = ParseCache()
+    return _parse_cache
+
+
+def find_duplicate(digest: str):
+    """Candidate record already parsed from these exact bytes by the current parser, if any."""
+    entry = get_parse_cache().get(digest)
+    if entry is None or entry["parser_version"] != PARSER_VERSION:
+        return None
+    return get_storage().get_by_id(entry["candidate_id"])
+
+
+def _prepare_record(parsed: dict, filename: str, digest: str):
+    """
+    Build the record for freshly parsed content. Content parsed before by an
+    older parser keeps its candidate id. Returns (rec, is_update).
+    Caller holds _ingest_lock.
+    """
+    rec = build_record(parsed, filename)
+    entry = get_parse_cache().get(digest) if digest else None
+    existing = get_storage().get_by_id(entry["candidate_id"]) if entry else None
+    if existing:
+        rec["id"] = existing["id"]
+        rec["filename"] = existing.get("filename") or filename
+        rec["created_at"] = existing.get("created_at") or rec["created_at"]
+        return rec, True
+    return rec, False
+
+
+def store_parsed(parsed: dict, filename: str, digest: str, ext: str) -> str:
+    """Write one parsed resume and record it in the parse cache. Returns the candidate id."""
+    with _ingest_lock:
+        if digest:
+            duplicate = find_duplicate(digest)
+            if duplicate:
+                return duplicate["id"]
+        rec, is_update = _prepare_record(parsed, filename, digest)
+        storage = get_storage()
+        if is_update:
+            storage.update_record(rec)
+        else:
+            storage.add_record(rec)
+        if digest:
+            get_parse_cache().put(digest, rec["id"], ext)
+    notify_stored([rec["id"]])
+    return rec["id"]
+
+
+class IngestQueue:
+    """
+    Worker pool that parses saved uploads off the request thread.
+    /upload only saves the file and enqueues a job; workers run parse_resume()
+    and write the candidate record, recording progress in the JobStore.
+    """
+
+    def __init__(self, workers: int = INGEST_WORKERS, jobs: JobStore = None):
+        self.jobs = jobs or JobStore()
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="ingest")
+
+    def submit(self, filename: str, path: str, ext: str, digest: str = None) -> dict:
+        job = self.jobs.create(filename, path, ext, digest)
+        self._pool.submit(self._process, job["id"])
+        return job
+
+    def resume_pending(self) -> int:
+        """Re-queue jobs a previous process left queued or mid-parse."""
+        pending = self.jobs.unfinished()
+        for job in pending:
+            self.jobs.update(job["id"], JOB_QUEUED)
+            self._pool.submit(self._process, job["id"])
+        if pending:
+            logger.info("Re-queued %d unfinished ingest jobs", len(pending))
+        return len(pending)
+
+    def _process(self, job_id: str):
+        job = self.jobs.get(job_id)
+        if job is None:
+            return
+        try:
+            digest = job.get("content_hash")
+            duplicate = find_duplicate(digest) if digest else None
+            if duplicate:
+                self.jobs.update(job_id, JOB_DONE, candidate_id=duplicate["id"])
+                return
+            self.jobs.update(job_id, JOB_PARSING)
+            with STAGE_SECONDS.time(stage="parse_resume"):
+                parsed = parse_resume(job["path"], job["ext"])
+            candidate_id = store_parsed(parsed, job["filename"], digest, job["ext"])
+            self.jobs.update(job_id, JOB_DONE, candidate_id=candidate_id)
+        except Exception as e:
+            logger.exception("Ingest job %s failed", job_id)
+            self.jobs.update(job_id, JOB_FAILED, error=str(e))
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_ingest_queue() -> IngestQueue:
+    """Return the process-wide ingest queue, re-queuing unfinished jobs on first use."""
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                _queue = IngestQueue()
+                _queue.resume_pending()
+    return _queue
+
+
+_parse_pool = None
+_parse_pool_lock = threading.Lock()
+
+
+def get_parse_pool() -> ProcessPoolExecutor:
+    global _parse_pool
+    with _parse_pool_lock:
+        if _parse_pool is None:
+            _parse_pool = ProcessPoolExecutor(max_workers=BATCH_PARSE_PROCESSES)
+        return _parse_pool
+
+
+def _discard_parse_pool(pool: ProcessPoolExecutor):
+    global _parse_pool
+    with _parse_pool_lock:
+        if _parse_pool is pool:
+            pool.shutdown(wait=False, cancel_futures=True)
+            _parse_pool = None
+
+
+def _parse_timed(path: str, ext: str):
+    """parse_resume() plus its own duration, measured inside the parse worker process."""
+    start = time.perf_counter()
+    parsed = parse_resume(path, ext)
+    return parsed, time.perf_counter() - start
+
+
+def ingest_batch(items: list) -> list:
+    """
+    Parse many saved uploads in the process pool and store every new one in
+    a single storage transaction. items is a list of dicts with filename,
+    path, ext and content_hash. Content seen before is reported as a
+    duplicate without parsing, and identical files within the batch are
+    parsed once. Returns one status entry per item, in order.
+    """
+    report = [
+        {"filename": item["filename"], "status": JOB_DONE, "candidate_id": None, "error": None}
+        for item in items
+    ]
+
+    # One parse per distinct content hash that the current parser has not seen
+    to_parse = {}
+    for i, item in enumerate(items):
+        duplicate = find_duplicate(item["content_hash"])
+        CACHE_LOOKUPS.inc(cache="parse", result="hit" if duplicate else "miss")
+        if duplicate:
+            report[i].update(status=JOB_DUPLICATE, candidate_id=duplicate["id"])
+        else:
+            to_parse.setdefault(item["content_hash"], []).append(i)
+
+    pool = get_parse_pool()
+    futures = {
+        digest: pool.submit(_parse_timed, items[idxs[0]]["path"], items[idxs[0]]["ext"])
+        for digest, idxs in to_parse.items()
+    }
+
+    parsed_by_digest = {}
+    for digest, future in futures.items():
+        try:
+            parsed_by_digest[digest], elapsed = future.result()
+            STAGE_SECONDS.observe(elapsed, stage="parse_resume")
+        except BrokenProcessPool as e:
+            # A crashed worker poisons the pool; start a fresh one for the next batch
+            _discard_parse_pool(pool)
+            for i in to_parse[digest]:
+                report[i].update(status=JOB_FAILED, error=f"Parser process crashed: {str(e)}")
+        except Exception as e:
+            for i in to_parse[digest]:
+                report[i].update(status=JOB_FAILED, error=str(e))
+
+    with _ingest_lock:
+        storage = get_storage()
+        cache = get_parse_cache()
+        new_recs = []
+        stored = {}
+        for digest, parsed in parsed_by_digest.items():
+            first = items[to_parse[digest][0]]
+            duplicate = find_duplicate(digest)
+            if duplicate:
+                stored[digest] = (duplicate["id"], JOB_DUPLICATE)
+                continue
+            rec, is_update = _prepare_record(parsed, first["filename"], digest)
+            if is_update:
+                storage.update_record(rec)
+                stored[digest] = (rec["id"], JOB_DONE)
+            else:
+                new_recs.append((digest, rec))
+
+        if new_recs:
+            storage.add_records([rec for _, rec in new_recs])
+            for digest, rec in new_recs:
+                stored[digest] = (rec["id"], JOB_DONE)
+
+        for digest, (candidate_id, status) in stored.items():
+            cache.put(digest, candidate_id, items[to_parse[digest][0]]["ext"])
+            for n, i in enumerate(to_parse[digest]):
+                # Repeats of the same bytes within this batch are duplicates of the first
+                report[i].update(status=status if n == 0 else JOB_DUPLICATE, candidate_id=candidate_id)
+
+    notify_stored([candidate_id for candidate_id, status in stored.values() if status == JOB_DONE])
+    return report
+
+
+def reparse_stale(include_current: bool = False) -> int:
+    """
+    Re-parse stored uploads whose parse-cache entry came from an older
+    PARSER_VERSION (or all of them) and update each candidate in place,
+    keeping its id. Run after changing the parser and bumping PARSER_VERSION.
+    Returns the number of candidates refreshed.
+    """
+    entries = get_parse_cache().stale(include_current)
+    pool = get_parse_pool()
+    futures = []
+    for entry in entries:
+        path = content_path(entry["content_hash"], entry["ext"])
+        if not os.path.exists(path):
+            logger.warning("Upload for %s is missing, skipping re-parse", entry["content_hash"])
+            continue
+        futures.append((entry, pool.submit(_parse_timed, path, entry["ext"])))
+
+    refreshed = []
+    storage = get_storage()
+    cache = get_parse_cache()
+    for entry, future in futures:
+        try:
+            parsed, elapsed = future.result()
+            STAGE_SECONDS.observe(elapsed, stage="parse_resume")
+        except Exception:
+            logger.exception("Re-parse of %s failed", entry["content_hash"])
+            continue
+        with _ingest_lock:
+            existing = storage.get_by_id(entry["candidate_id"])
+            rec = build_record(parsed, existing.get("filename") if existing else "")
+            if existing:
+                rec["id"] = existing["id"]
+                rec["created_at"] = existing.get("created_at") or rec["created_at"]
+                storage.update_record(rec)
+            else:
+                storage.add_record(rec)
+            cache.put(entry["content_hash"], rec["id"], entry["ext"])
+        refreshed.append(rec["id"])
+    notify_stored(refreshed)
+    return len(refreshed)
+
+
+if __name__ == "__main__":
+    # Re-parse path after a parser change: bump PARSER_VERSION in parser.py, then run
+    #   python backend/ingest.py --reparse        (only entries from older parser versions)
+    #   python backend/ingest.py --reparse --all  (every stored upload)
+    logging.basicConfig(level=logging.INFO)
+    cli = argparse.ArgumentParser(description="Resume ingestion maintenance")
+    cli.add_argument("--reparse", action="store_true", help="re-parse uploads from older parser versions")
+    cli.add_argument("--all", action="store_true", help="with --reparse, re-parse every stored upload")
+    args = cli.parse_args()
+    if args.reparse:
+        print(f"Re-parsed {reparse_stale(include_current=args.all)} candidates with parser version {PARSER_VERSION}")
+    else:
+        cli.print_help()
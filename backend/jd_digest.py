@@ -0,0 +1,120 @@
+# jd_digest.py - Compact requirements digest of a job description, computed once per JD
+import os
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from llm_client import call_llm_groq, GROQ_MODEL
+from llm_output import extract_json
+from metrics import STAGE_SECONDS, CACHE_LOOKUPS
+
+logger = logging.getLogger(__name__)
+
+JD_DIGEST_ENABLED = os.getenv("JD_DIGEST_ENABLED", "1").lower() not in ("0", "false", "no")
+# Shorter job descriptions are already compact and are sent as they are
+JD_DIGEST_MIN_CHARS = int(os.getenv("JD_DIGEST_MIN_CHARS", "800"))
+JD_DIGEST_CACHE_SIZE = int(os.getenv("JD_DIGEST_CACHE_SIZE", "256"))
+JD_DIGEST_MAX_TOKENS = int(os.getenv("JD_DIGEST_MAX_TOKENS", "300"))
+
+# Bump whenever build_digest_prompt() or render_digest() changes; part of the score cache key
+DIGEST_VERSION = "1"
+
+
+def build_digest_prompt(job_desc: str) -> str:
+    return (
+        "You are a technical recruiter. Condense the Job Description below into a compact "
+        "requirements digest for screening candidates. Drop company boilerplate, benefits and "
+        "legal text; keep every concrete skill, tool, qualification and experience requirement.\n\n"
+        "Return ONLY JSON in the following format:\n"
+        '{"title": <string>, "must_have": [<requirement>], "nice_to_have": [<requirement>], '
+        '"min_years": <number or null>, "responsibilities": [<string>]}\n\n'
+        "Keep each list item under 8 words; at most 12 must_have, 8 nice_to_have and 5 responsibilities.\n\n"
+        "Job Description:\n" + job_desc
+    )
+
+
+def render_digest(digest: dict) -> str:
+    """Plain-text requirements block used in scoring prompts in place of the raw job description."""
+    lines = []
+    if digest.get("title"):
+        lines.append(f"Role: {digest['title']}")
+    if digest.get("must_have"):
+        lines.append("Must have: " + "; ".join(str(item) for item in digest["must_have"]))
+    if digest.get("nice_to_have"):
+        lines.append("Nice to have: " + "; ".join(str(item) for item in digest["nice_to_have"]))
+    if digest.get("min_years"):
+        lines.append(f"Minimum experience: {digest['min_years']} years")
+    if digest.get("responsibilities"):
+        lines.append("Responsibilities: " + "; ".join(str(item) for item in digest["responsibilities"]))
+    return "\n".join(lines)
+
+
+def summarize_job(job_desc: str) -> str:
+    """One LLM call turning a job description into its rendered digest. Raises on failure."""
+    with STAGE_SECONDS.time(stage="jd_digest"):
+        digest = extract_json(call_llm_groq(build_digest_prompt(job_desc), JD_DIGEST_MAX_TOKENS, json_mode=True))
+    if not isinstance(digest, dict) or not digest.get("must_have"):
+        raise ValueError("Digest has no must_have requirements")
+    return render_digest(digest)
+
+
+class DigestCache:
+    """
+    In-process LRU of rendered digests keyed by JD hash. Concurrent requests
+    for the same job description wait for a single LLM call.
+    """
+
+    def __init__(self, max_entries: int = JD_DIGEST_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key: str, compute):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                CACHE_LOOKUPS.inc(cache="jd_digest", result="hit")
+                return self._entries[key]
+            key_lock = self._inflight.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                if key in self._entries:
+                    CACHE_LOOKUPS.inc(cache="jd_digest", result="hit")
+                    return self._entries[key]
+            CACHE_LOOKUPS.inc(cache="jd_digest", result="miss")
+            try:
+                value = compute()
+                with self._lock:
+                    self._entries[key] = value
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+                return value
+            finally:
+                with self._lock:
+                    self._inflight.pop(key, None)
+
+
+_cache = DigestCache()
+
+
+def digest_key(job_desc: str) -> str:
+    return f"{hashlib.sha256(job_desc.encode('utf-8')).hexdigest()}:{GROQ_MODEL}:{DIGEST_VERSION}"
+
+
+def job_requirements(job_desc: str) -> str:
+    """
+    Text that scoring prompts use for the job: the cached digest for long
+    job descriptions, else the description itself. A failed digest falls back
+    to the full description and is retried on the next request.
+    """
+    if not JD_DIGEST_ENABLED or len(job_desc) < JD_DIGEST_MIN_CHARS:
+        return job_desc
+    try:
+        digest = _cache.get_or_compute(digest_key(job_desc), lambda: summarize_job(job_desc))
+    except Exception as e:
+        logger.warning("Job description digest failed, scoring against the full text: %s", e)
+        return job_desc
+    # A digest that is not actually shorter buys nothing
+    return digest if len(digest) < len(job_desc) else job_desc
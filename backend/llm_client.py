@@ -2,53 +2,278 @@
 import os
 import requests
 import json
+import threading
+import time
+import random
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+from requests.adapters import HTTPAdapter
+import logging
+from metrics import STAGE_SECONDS, LLM_REQUESTS, LLM_ERRORS, LLM_RETRIES, timed
+from llm_router import Backend, LLM_BACKENDS, get_router
+from llm_scheduler import current_flow, get_scheduler
+from llm_output import extract_json, normalize_score
 
-# Make sure these environment variables are set
+logger = logging.getLogger(__name__)
+
+# Make sure these environment variables are set. GROQ_MODEL also identifies cached scores,
+# so every backend in LLM_BACKENDS should serve an equivalent model.
 GROQ_API_KEY = os.getenv("LLM_API_KEY")
 GROQ_API_URL = os.getenv("LLM_API_URL")
 GROQ_MODEL = os.getenv("LLM_MODEL", "llama-3.1-8b-instant")
 
-def build_prompt(resume_skills_text: str, job_desc: str) -> str:
+# Bump whenever build_prompt() changes so cached scores from the old prompt are not reused
+PROMPT_VERSION = "3"
+
+# Ask for JSON mode (response_format json_object); dropped per backend if it rejects it
+LLM_JSON_MODE = os.getenv("LLM_JSON_MODE", "1").lower() not in ("0", "false", "no")
+# Repair requests for replies that stay unparseable after tolerant extraction
+LLM_PARSE_RETRIES = int(os.getenv("LLM_PARSE_RETRIES", "1"))
+
+# Max concurrent in-flight requests per provider host, shared by every caller in the process
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+
+# Batched scoring: prompt-token budget per request and the output tokens reserved per candidate
+LLM_BATCH_TOKEN_BUDGET = int(os.getenv("LLM_BATCH_TOKEN_BUDGET", "6000"))
+LLM_BATCH_OUTPUT_TOKENS = int(os.getenv("LLM_BATCH_OUTPUT_TOKENS", "200"))
+
+# Output budgets for full scoring (score plus justification) and for score-only ranking
+LLM_SCORE_MAX_TOKENS = int(os.getenv("LLM_SCORE_MAX_TOKENS", "300"))
+LLM_SCORE_ONLY_MAX_TOKENS = int(os.getenv("LLM_SCORE_ONLY_MAX_TOKENS", "16"))
+LLM_SCORE_ONLY_BATCH_OUTPUT_TOKENS = int(os.getenv("LLM_SCORE_ONLY_BATCH_OUTPUT_TOKENS", "16"))
+
+# Pooled keep-alive connections to the provider and the per-request timeout
+LLM_POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", str(max(LLM_MAX_CONCURRENCY, 10))))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+
+# Retries for 429, 5xx and connection failures: jittered exponential backoff, or Retry-After when sent
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "0.5"))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "20"))
+LLM_RETRY_AFTER_MAX = float(os.getenv("LLM_RETRY_AFTER_MAX", "60"))
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+_provider_slots = {}
+_provider_slots_lock = threading.Lock()
+
+def provider_semaphore(url: str) -> threading.BoundedSemaphore:
+    """Return the concurrency-cap semaphore for the provider serving url."""
+    host = urlparse(url or "").netloc or "default"
+    with _provider_slots_lock:
+        sem = _provider_slots.get(host)
+        if sem is None:
+            sem = threading.BoundedSemaphore(max(1, LLM_MAX_CONCURRENCY))
+            _provider_slots[host] = sem
+        return sem
+
+_session = None
+_session_lock = threading.Lock()
+
+def get_session() -> requests.Session:
+    """Process-wide session, so calls reuse pooled keep-alive connections instead of a new TLS handshake each."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(1, LLM_POOL_SIZE))
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date), or None."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def backoff_delay(attempt: int) -> float:
+    """Full-jitter exponential backoff for retry number attempt (0-based)."""
+    return random.uniform(0, min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * (2 ** attempt)))
+
+def raise_for_backend(response: requests.Response, backend: Backend):
+    """raise_for_status, with the backend that answered attached to the HTTPError as .backend."""
+    try:
+        response.raise_for_status()
+    except requests.HTTPError as e:
+        e.backend = backend
+        raise
+
+def post_with_retries(payload: dict, tokens: int, backend: Backend = None, flow: str = None) -> requests.Response:
+    """
+    POST a completion request through the pooled session, starting on backend
+    (default: the router's pick). Each attempt waits for a fair-scheduler slot
+    charged to flow and the shared RPM/TPM budget (llm_scheduler.py), then for
+    that backend's own rate limiter. Retries 429, 5xx and connection failures
+    up to LLM_MAX_RETRIES times. A retry goes straight to another healthy
+    backend when there is one, otherwise it backs off on the same backend; a
+    429 Retry-After pauses every caller of that backend, not just this one.
+    Returns the successful response or raises the last error.
+    """
+    router = get_router()
+    scheduler = get_scheduler()
+    backend = backend or router.pick()
+    session = get_session()
+    tried = set()
+    attempt = 0
+    while True:
+        body = dict(payload, model=backend.model)
+        if not backend.json_mode:
+            body.pop("response_format", None)
+
+        response = None
+        with scheduler.slot(flow, tokens):
+            with STAGE_SECONDS.time(stage="llm_rate_limit_wait"):
+                backend.limiter.acquire(tokens)
+            waited = time.perf_counter()
+            with provider_semaphore(backend.url):
+                STAGE_SECONDS.observe(time.perf_counter() - waited, stage="llm_slot_wait")
+                backend.started()
+                started = time.perf_counter()
+                try:
+                    with STAGE_SECONDS.time(stage="llm_call"):
+                        response = session.post(backend.url, headers=backend.headers(), json=body,
+                                                timeout=backend.timeout)
+                    error = None
+                except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError) as e:
+                    error = e
+                except Exception:
+                    # Not retryable (e.g. an invalid URL), but the attempt still has to leave inflight
+                    backend.finished(time.perf_counter() - started, ok=False)
+                    LLM_REQUESTS.inc(backend=backend.name, outcome="error")
+                    raise
+                elapsed = time.perf_counter() - started
+
+        if response is not None and response.status_code not in RETRY_STATUSES:
+            # A 400 is about the request, not the backend's health
+            backend.finished(elapsed, ok=response.ok or response.status_code == 400)
+            LLM_REQUESTS.inc(backend=backend.name, outcome="ok" if response.ok else "error")
+            if not response.ok:
+                LLM_ERRORS.inc(type="http")
+                raise_for_backend(response, backend)
+            return response
+
+        LLM_REQUESTS.inc(backend=backend.name, outcome="error")
+        retry_after = None
+        if error is not None:
+            reason, delay = "connection", backoff_delay(attempt)
+        else:
+            reason = "rate_limited" if response.status_code == 429 else "server_error"
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            if retry_after is not None:
+                # Small jitter so the callers released together do not all retry at the same instant
+                delay = min(retry_after, LLM_RETRY_AFTER_MAX) + random.uniform(0, LLM_BACKOFF_BASE)
+            else:
+                delay = backoff_delay(attempt)
+            if response.status_code == 429:
+                backend.limiter.pause(delay)
+        # A throttled backend sits out its Retry-After, so the router sends new work elsewhere
+        backend.finished(elapsed, ok=False, cooldown=delay if reason == "rate_limited" else None)
+
+        if attempt >= LLM_MAX_RETRIES:
+            LLM_ERRORS.inc(type="http")
+            if error is not None:
+                raise error
+            raise_for_backend(response, backend)
+
+        LLM_RETRIES.inc(reason=reason)
+        attempt += 1
+        tried.add(backend)
+        alternative = router.pick(exclude=tried)
+        if alternative is not None and alternative.healthy():
+            logger.info("LLM backend %s failed (%s), retrying on %s", backend.name, reason, alternative.name)
+            backend = alternative
+            continue
+        time.sleep(delay)
+
+def send_completion(backend: Backend, payload: dict, tokens: int, flow: str = None) -> requests.Response:
     """
-    Build a prompt for Groq LLM using candidate Skills section + Job Description.
-    LLM should return JSON: score (0.0-1.0), justification, matches, recommendation
+    post_with_retries starting on backend. A backend that answers 400 to JSON
+    mode (possibly one failed over to, not backend itself) is called without
+    it from then on.
     """
-    prompt = (
+    try:
+        return post_with_retries(payload, tokens, backend, flow)
+    except requests.HTTPError as e:
+        rejected = e.response is not None and e.response.status_code == 400
+        rejecting = getattr(e, "backend", backend)
+        if "response_format" not in payload or not rejected or not rejecting.json_mode:
+            raise
+        logger.warning("LLM backend %s rejected JSON mode, continuing without it: %s", rejecting.name, e)
+        rejecting.json_mode = False
+        return post_with_retries(payload, tokens, rejecting, flow)
+
+def build_prompt(resume_skills_text: str, job_desc: str, score_only: bool = False) -> list:
+    """
+    Build the chat messages scoring one candidate's Skills section against a job.
+    job_desc is the job description or its requirements digest (see jd_digest.py).
+    The instructions and job text are identical for every candidate of a job, so
+    they go first, in the system message, where provider prefix caches can reuse
+    them; only the user message carries the candidate.
+    LLM should return JSON: score (0.0-1.0), justification, matches, recommendation;
+    with score_only, just the score.
+    """
+    if score_only:
+        output_format = '{"score": <float between 0.0 and 1.0>}\n\nDo not explain the score.\n\n'
+    else:
+        output_format = '{"score": <float between 0.0 and 1.0>, "justification": <string>, "matches": [<skills>], "recommendation": <string>}\n\n'
+    system = (
         "You are a technical recruiter. Compare the candidate's Skills section "
         "with the Job Description and evaluate fit.\n\n"
         "Return ONLY JSON in the following format:\n"
-        '{"score": <float between 0.0 and 1.0>, "justification": <string>, "matches": [<skills>], "recommendation": <string>}\n\n'
+        + output_format +
         "IMPORTANT: The score must be a float between 0.0 (no match) and 1.0 (perfect match).\n"
         "For example: 0.85 means 85% match, 0.5 means 50% match.\n\n"
-        "Job Description:\n" + job_desc + "\n\n" +
-        "Candidate Skills Section:\n" + resume_skills_text
+        "Job Description:\n" + job_desc
     )
+    return [
+        {"role": "system", "content": system},
+        {"role": "user", "content": "Candidate Skills Section:\n" + resume_skills_text}
+    ]
+
+def prompt_messages(prompt) -> list:
+    """Chat messages for a prompt given either as plain text or as a message list."""
+    if isinstance(prompt, str):
+        return [
+            {"role": "system", "content": "You are a helpful AI assistant."},
+            {"role": "user", "content": prompt}
+        ]
     return prompt
 
-def call_llm_groq(prompt: str, max_tokens: int = 300) -> str:
+def call_llm_groq(prompt, max_tokens: int = 300, json_mode: bool = False) -> str:
     """
-    Call Groq API (OpenAI-compatible Chat Completions) and return LLM output text.
+    Call an OpenAI-compatible Chat Completions backend (see llm_router.py) and
+    return the LLM output text. prompt is a user message string or a full list
+    of chat messages. json_mode requests a JSON object reply (LLM_JSON_MODE)
+    from backends that accept it. A request still unanswered after the
+    backend's p95 latency is hedged onto a second backend.
     """
-    if not GROQ_API_KEY:
+    if not LLM_BACKENDS and not GROQ_API_KEY:
         raise RuntimeError("GROQ_API_KEY environment variable not set.")
 
-    headers = {
-        "Authorization": f"Bearer {GROQ_API_KEY}",
-        "Content-Type": "application/json"
-    }
-
+    messages = prompt_messages(prompt)
     payload = {
         "model": GROQ_MODEL,
-        "messages": [
-            {"role": "system", "content": "You are a helpful AI assistant."},
-            {"role": "user", "content": prompt}
-        ],
+        "messages": messages,
         "temperature": 0.0,
         "max_tokens": max_tokens
     }
 
-    response = requests.post(GROQ_API_URL, headers=headers, json=payload, timeout=60)
-    response.raise_for_status()
+    if json_mode and LLM_JSON_MODE:
+        payload["response_format"] = {"type": "json_object"}
+
+    tokens = estimate_prompt_tokens(messages) + max_tokens
+    # Hedged attempts run on other threads; they are charged to the caller's flow
+    flow = current_flow()
+    response = get_router().call(lambda backend: send_completion(backend, payload, tokens, flow))
     data = response.json()
 
     # Extract output text
@@ -58,27 +283,197 @@ def call_llm_groq(prompt: str, max_tokens: int = 300) -> str:
     except (KeyError, IndexError):
         return json.dumps(data)
 
-def rate_candidate(skills_section_text: str, job_desc: str) -> dict:
+def score_result(parsed: dict, score_only: bool = False) -> dict:
+    """
+    Validate one parsed scoring object: normalized score, and for full scoring
+    justification, matches and recommendation. Raises ValueError without a usable score.
+    """
+    if not isinstance(parsed, dict) or "score" not in parsed:
+        raise ValueError("LLM output has no score")
+    score = normalize_score(parsed["score"])
+    if score_only:
+        return {"score": score}
+    matches = parsed.get("matches") or []
+    if isinstance(matches, str):
+        matches = [m.strip() for m in matches.split(",") if m.strip()]
+    return dict(
+        parsed,
+        score=score,
+        justification=str(parsed.get("justification") or ""),
+        matches=matches,
+        recommendation=str(parsed.get("recommendation") or "")
+    )
+
+def parse_score_output(llm_output: str, score_only: bool = False) -> dict:
+    """Single-candidate scoring reply -> score_result(). Raises ValueError if unusable."""
+    parsed = extract_json(llm_output)
+    if isinstance(parsed, list) and len(parsed) == 1:
+        parsed = parsed[0]
+    return score_result(parsed, score_only)
+
+def repair_messages(prompt: list, llm_output: str) -> list:
+    """Follow-up turn asking the model to restate an unparseable reply as the requested JSON."""
+    return prompt + [
+        {"role": "assistant", "content": llm_output},
+        {"role": "user", "content": "Your reply could not be parsed. Answer again with ONLY the JSON described above and no other text."}
+    ]
+
+@timed("rate_candidate")
+def rate_candidate(skills_section_text: str, job_desc: str, score_only: bool = False) -> dict:
     """
     Rates candidate against job description using Groq LLM.
     Returns structured dict with score, justification, matches, recommendation.
+    With score_only the LLM is asked for the score alone, within a few output
+    tokens, and the dict holds only "score". Replies are parsed tolerantly;
+    only one that still cannot be read is sent back for a repair (LLM_PARSE_RETRIES).
     """
-    prompt = build_prompt(skills_section_text, job_desc)
-    llm_output = call_llm_groq(prompt)
+    prompt = build_prompt(skills_section_text, job_desc, score_only)
+    max_tokens = LLM_SCORE_ONLY_MAX_TOKENS if score_only else LLM_SCORE_MAX_TOKENS
+    llm_output = call_llm_groq(prompt, max_tokens, json_mode=True)
 
-    # Attempt to parse JSON returned by LLM
-    try:
-        parsed = json.loads(llm_output)
-        # Ensure required keys exist
-        for key in ["score", "justification", "matches", "recommendation"]:
-            if key not in parsed:
-                parsed[key] = "" if key != "score" else 0.0
-        return parsed
-    except Exception:
-        # If parsing fails, return raw text with score=0
-        return {
-            "score": 0.0,
-            "justification": llm_output,
-            "matches": [],
-            "recommendation": ""
-        }
+    for attempt in range(LLM_PARSE_RETRIES + 1):
+        try:
+            return parse_score_output(llm_output, score_only)
+        except ValueError:
+            LLM_ERRORS.inc(type="parse")
+            if attempt == LLM_PARSE_RETRIES:
+                break
+        LLM_RETRIES.inc(reason="parse")
+        llm_output = call_llm_groq(repair_messages(prompt, llm_output), max_tokens, json_mode=True)
+
+    # Still unparseable: return raw text with score=0
+    if score_only:
+        return {"score": 0.0, "raw": llm_output, "parse_error": True}
+    return {
+        "score": 0.0,
+        "justification": llm_output,
+        "matches": [],
+        "recommendation": "",
+        "parse_error": True
+    }
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about 4 characters per token) used for batch budgeting."""
+    return len(text or "") // 4 + 1
+
+def estimate_prompt_tokens(prompt) -> int:
+    """estimate_tokens() over a plain prompt or every message of a message list."""
+    return sum(estimate_tokens(m["content"]) for m in prompt_messages(prompt))
+
+def build_batch_prompt(batch: list, job_desc: str, score_only: bool = False) -> list:
+    """
+    Build the chat messages scoring several candidates against the same job.
+    batch is a list of (candidate_id, skills_text) pairs. As in build_prompt(),
+    the shared instructions and job text form the system message and the
+    candidates follow in the user message.
+    LLM should return a JSON object whose "results" array holds one result
+    per candidate id (only id and score with score_only). The array is wrapped
+    in an object so the request can use JSON mode.
+    """
+    sections = "".join(
+        f"Candidate ID: {cid}\nCandidate Skills Section:\n{skills_text}\n\n"
+        for cid, skills_text in batch
+    )
+    if score_only:
+        output_format = '{"results": [{"id": <candidate id>, "score": <float between 0.0 and 1.0>}]}\n\nDo not explain the scores.\n\n'
+    else:
+        output_format = '{"results": [{"id": <candidate id>, "score": <float between 0.0 and 1.0>, "justification": <string>, "matches": [<skills>], "recommendation": <string>}]}\n\n'
+    system = (
+        "You are a technical recruiter. Compare each candidate's Skills section "
+        "with the Job Description and evaluate fit. Score every candidate independently.\n\n"
+        "Return ONLY a JSON object with one entry per candidate in \"results\", in the following format:\n"
+        + output_format +
+        "IMPORTANT: The score must be a float between 0.0 (no match) and 1.0 (perfect match).\n"
+        "For example: 0.85 means 85% match, 0.5 means 50% match.\n\n"
+        "Job Description:\n" + job_desc
+    )
+    return [
+        {"role": "system", "content": system},
+        {"role": "user", "content": sections.rstrip("\n")}
+    ]
+
+def batch_output_tokens(score_only: bool = False) -> int:
+    """Output tokens reserved per candidate in a batched prompt."""
+    return LLM_SCORE_ONLY_BATCH_OUTPUT_TOKENS if score_only else LLM_BATCH_OUTPUT_TOKENS
+
+def split_batches(batch: list, job_desc: str, token_budget: int = None, score_only: bool = False) -> list:
+    """
+    Greedily pack (candidate_id, skills_text) pairs into sub-batches whose
+    estimated prompt plus reserved output tokens fit within token_budget.
+    A single oversized candidate still gets a batch of its own.
+    """
+    token_budget = token_budget or LLM_BATCH_TOKEN_BUDGET
+    base = estimate_prompt_tokens(build_batch_prompt([], job_desc, score_only))
+    output_tokens = batch_output_tokens(score_only)
+    batches = []
+    current = []
+    used = base
+    for cid, skills_text in batch:
+        cost = estimate_tokens(skills_text) + 20 + output_tokens
+        if current and used + cost > token_budget:
+            batches.append(current)
+            current = []
+            used = base
+        current.append((cid, skills_text))
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
+
+def parse_batch_output(llm_output: str, score_only: bool = False) -> dict:
+    """
+    Map candidate id -> result dict from a batched response ({"results": [...]}
+    or a bare array). Items without an id or a usable score are left out, so
+    the caller re-scores just those candidates.
+    """
+    parsed = extract_json(llm_output)
+    if isinstance(parsed, dict):
+        parsed = parsed.get("results", [])
+    if not isinstance(parsed, list):
+        raise ValueError("Batched LLM output has no results array")
+    results = {}
+    for item in parsed:
+        if not isinstance(item, dict) or "id" not in item:
+            continue
+        try:
+            results[str(item["id"])] = score_result({k: v for k, v in item.items() if k != "id"}, score_only)
+        except ValueError:
+            continue
+    return results
+
+def rate_candidates(batch: list, job_desc: str, score_only: bool = False) -> dict:
+    """
+    Rates several candidates against one job description with as few LLM calls
+    as the token budget allows. batch is a list of (candidate_id, skills_text).
+    Returns dict candidate_id -> result dict. Entries the batched response does
+    not cover are re-scored with rate_candidate(); if that call fails too, the
+    entry carries an "error" key instead of a score. score_only asks for
+    scores alone, as in rate_candidate().
+    """
+    results = {}
+    for sub_batch in split_batches(batch, job_desc, score_only=score_only):
+        parsed = {}
+        if len(sub_batch) > 1:
+            max_tokens = batch_output_tokens(score_only) * len(sub_batch)
+            try:
+                llm_output = call_llm_groq(build_batch_prompt(sub_batch, job_desc, score_only), max_tokens,
+                                           json_mode=True)
+                try:
+                    parsed = parse_batch_output(llm_output, score_only)
+                except Exception:
+                    LLM_ERRORS.inc(type="batch_parse")
+                    raise
+            except Exception:
+                parsed = {}
+
+        for cid, skills_text in sub_batch:
+            key = str(cid)
+            if key in parsed:
+                results[cid] = parsed[key]
+                continue
+            # Per-candidate fallback for anything missing or unparseable
+            try:
+                results[cid] = rate_candidate(skills_text, job_desc, score_only)
+            except Exception as e:
+                results[cid] = {"error": str(e)}
+    return results
@@ -0,0 +1,117 @@
+# llm_output.py - Tolerant parsing of JSON replies and score normalization
+import re
+import json
+import math
+
+FENCE_RE = re.compile(r"```(?:json|JSON)?\s*\n?(.*?)```", re.S)
+TRAILING_COMMA_RE = re.compile(r",(\s*[}\]])")
+FRACTION_RE = re.compile(r"^\s*(-?\d+(?:\.\d+)?)\s*/\s*(\d+(?:\.\d+)?)\s*$")
+
+# Bare scores below this are an overshoot of 1.0, not a score out of 10
+OUT_OF_10_MIN = 2.0
+# Bare scores up to this factor above 10 are an overshoot of 10, not a score out of 100
+SCALE_OVERSHOOT = 1.1
+
+
+def _balanced(text: str, start: int):
+    """The bracketed span opening at text[start], skipping brackets inside strings, or None."""
+    closing = {"{": "}", "[": "]"}
+    stack = []
+    in_string = False
+    escaped = False
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in closing:
+            stack.append(closing[ch])
+        elif ch in "}]":
+            if not stack or stack.pop() != ch:
+                return None
+            if not stack:
+                return text[start:i + 1]
+    return None
+
+
+def _loads(candidate: str):
+    try:
+        return json.loads(candidate)
+    except ValueError:
+        # Trailing commas are the most common near-miss
+        return json.loads(TRAILING_COMMA_RE.sub(r"\1", candidate))
+
+
+def extract_json(text: str):
+    """
+    Parse the JSON value in an LLM reply. Accepts bare JSON, code-fenced JSON,
+    JSON surrounded by prose and trailing commas. Raises ValueError when no
+    complete JSON object or array can be recovered.
+    """
+    if not isinstance(text, str) or not text.strip():
+        raise ValueError("Empty LLM output")
+    text = text.strip()
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+
+    candidates = [block.strip() for block in FENCE_RE.findall(text)] + [text]
+    for candidate in candidates:
+        for start, ch in enumerate(candidate):
+            if ch not in "{[":
+                continue
+            span = _balanced(candidate, start)
+            if span is None:
+                continue
+            try:
+                return _loads(span)
+            except ValueError:
+                continue
+    raise ValueError(f"No JSON found in LLM output: {text[:80]!r}")
+
+
+def normalize_score(value) -> float:
+    """
+    Coerce a model-reported score to a float in [0.0, 1.0]. Accepts numbers and
+    strings such as "0.85", "85%", "8.5/10", "8.5" (read as out of 10) and "85"
+    (read as a percentage). Slight overshoots such as 1.05 or 10.5 mean a top
+    score; results are clamped to the range.
+    Raises ValueError for anything that is not a number.
+    """
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise ValueError(f"Invalid score: {value!r}")
+    # scaled: the value already says what it is out of ("85%", "8.5/10")
+    scaled = False
+    if isinstance(value, str):
+        raw = value.strip()
+        fraction = FRACTION_RE.match(raw)
+        if raw.endswith("%"):
+            score, scaled = float(raw[:-1]) / 100.0, True
+        elif fraction:
+            denominator = float(fraction.group(2))
+            if denominator <= 0:
+                raise ValueError(f"Invalid score: {value!r}")
+            score, scaled = float(fraction.group(1)) / denominator, True
+        else:
+            score = float(raw)
+    else:
+        score = float(value)
+    if math.isnan(score) or math.isinf(score):
+        raise ValueError(f"Invalid score: {value!r}")
+    # The prompt asks for 0.0-1.0; a slight overshoot of a scale's top is clamped to it,
+    # otherwise larger bare numbers are read as out of 10, then out of 100
+    if score > 1.0 and not scaled:
+        if score < OUT_OF_10_MIN:
+            score = 1.0
+        elif score <= 10.0 * SCALE_OVERSHOOT:
+            score = min(score, 10.0) / 10.0
+        else:
+            score /= 100.0
+    return round(min(1.0, max(0.0, score)), 4)
@@ -0,0 +1,239 @@
+# llm_router.py - Routing over several OpenAI-compatible LLM backends, with health tracking and hedging
+import os
+import json
+import math
+import time
+import random
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from ratelimit import RateLimiter
+from metrics import LLM_HEDGES
+
+logger = logging.getLogger(__name__)
+
+# JSON list of backends: [{"name", "url", "model", "api_key" or "api_key_env", "timeout", "rpm", "tpm"}].
+# Unset: a single "primary" backend from LLM_API_URL / LLM_MODEL / LLM_API_KEY. rpm/tpm are per
+# backend; LLM_RPM_LIMIT / LLM_TPM_LIMIT budget all backends together (see llm_scheduler.py).
+LLM_BACKENDS = os.getenv("LLM_BACKENDS", "")
+
+# Health tracking: EWMA smoothing, consecutive failures before a cooldown, and its length
+LLM_ROUTER_EWMA_ALPHA = float(os.getenv("LLM_ROUTER_EWMA_ALPHA", "0.3"))
+LLM_ROUTER_FAILURE_THRESHOLD = int(os.getenv("LLM_ROUTER_FAILURE_THRESHOLD", "3"))
+LLM_ROUTER_COOLDOWN = float(os.getenv("LLM_ROUTER_COOLDOWN", "30"))
+# Latency assumed for a backend before its first reply, so untried backends are neither favoured nor avoided
+LLM_ROUTER_INITIAL_LATENCY = float(os.getenv("LLM_ROUTER_INITIAL_LATENCY", "1.0"))
+# Share of calls sent to a random healthy backend, so one that was slow gets measured again once it recovers
+LLM_ROUTER_EXPLORE = float(os.getenv("LLM_ROUTER_EXPLORE", "0.05"))
+
+# Hedging: after the primary backend's p95 latency (at least LLM_HEDGE_MIN_DELAY seconds),
+# send the same request to the next best backend and take whichever answers first
+LLM_HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "1").lower() not in ("0", "false", "no")
+LLM_HEDGE_QUANTILE = float(os.getenv("LLM_HEDGE_QUANTILE", "0.95"))
+LLM_HEDGE_MIN_DELAY = float(os.getenv("LLM_HEDGE_MIN_DELAY", "0.2"))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+LLM_HEDGE_WORKERS = int(os.getenv("LLM_HEDGE_WORKERS", "64"))
+
+LATENCY_WINDOW = 200
+
+
+class Backend:
+    """One OpenAI-compatible chat-completions endpoint and its health statistics."""
+
+    def __init__(self, name: str, url: str, model: str, api_key: str = None, timeout: float = None,
+                 limiter: RateLimiter = None):
+        self.name = name
+        self.url = url
+        self.model = model
+        self.api_key = api_key
+        self.timeout = timeout
+        self.limiter = limiter or RateLimiter(0, 0)
+        # Cleared when the backend rejects response_format
+        self.json_mode = True
+
+        self._lock = threading.Lock()
+        self.ewma_latency = LLM_ROUTER_INITIAL_LATENCY
+        self.error_rate = 0.0
+        self.inflight = 0
+        self.consecutive_failures = 0
+        self.cooldown_until = 0.0
+        self.requests = 0
+        self.failures = 0
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+
+    def headers(self) -> dict:
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        return headers
+
+    def healthy(self, now: float = None) -> bool:
+        return (now or time.monotonic()) >= self.cooldown_until
+
+    def cost(self) -> float:
+        """Expected seconds to an answer: EWMA latency, inflated by recent errors and queued work."""
+        with self._lock:
+            return self.ewma_latency * (1.0 + 4.0 * self.error_rate) * (1.0 + 0.25 * self.inflight)
+
+    def latency_quantile(self, q: float):
+        """Observed latency quantile in seconds, or None with too few samples."""
+        with self._lock:
+            samples = sorted(self._latencies)
+        if len(samples) < LLM_HEDGE_MIN_SAMPLES:
+            return None
+        return samples[min(len(samples) - 1, max(0, math.ceil(q * len(samples)) - 1))]
+
+    def started(self):
+        with self._lock:
+            self.inflight += 1
+
+    def finished(self, elapsed: float, ok: bool, cooldown: float = None):
+        """Record one attempt. A failure streak (or an explicit cooldown, e.g. Retry-After) benches the backend."""
+        alpha = LLM_ROUTER_EWMA_ALPHA
+        with self._lock:
+            self.inflight = max(0, self.inflight - 1)
+            self.requests += 1
+            self.error_rate = (1 - alpha) * self.error_rate + alpha * (0.0 if ok else 1.0)
+            if ok:
+                self.consecutive_failures = 0
+                self.ewma_latency = (1 - alpha) * self.ewma_latency + alpha * elapsed
+                self._latencies.append(elapsed)
+                return
+            self.failures += 1
+            self.consecutive_failures += 1
+            # A slow failure (e.g. a timeout) also says something about latency
+            self.ewma_latency = max(self.ewma_latency, (1 - alpha) * self.ewma_latency + alpha * elapsed)
+            if self.consecutive_failures >= LLM_ROUTER_FAILURE_THRESHOLD:
+                cooldown = max(cooldown or 0.0, LLM_ROUTER_COOLDOWN)
+            if cooldown:
+                self.cooldown_until = max(self.cooldown_until, time.monotonic() + cooldown)
+                logger.warning("LLM backend %s cooling down for %.1fs", self.name, cooldown)
+
+    def snapshot(self) -> dict:
+        p95 = self.latency_quantile(0.95)
+        with self._lock:
+            return {
+                "name": self.name,
+                "url": self.url,
+                "model": self.model,
+                "healthy": self.healthy(),
+                "cooldown_remaining_s": round(max(0.0, self.cooldown_until - time.monotonic()), 3),
+                "ewma_latency_ms": round(self.ewma_latency * 1000, 1),
+                "p95_latency_ms": round(p95 * 1000, 1) if p95 is not None else None,
+                "error_rate": round(self.error_rate, 4),
+                "inflight": self.inflight,
+                "requests": self.requests,
+                "failures": self.failures,
+                "json_mode": self.json_mode,
+            }
+
+
+class LLMRouter:
+    """
+    Picks the backend with the lowest expected latency among those not cooling
+    down, and hedges slow requests onto a second backend.
+    """
+
+    def __init__(self, backends: list):
+        if not backends:
+            raise ValueError("At least one LLM backend is required")
+        self.backends = backends
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def pick(self, exclude=()):
+        """Best backend not in exclude; cooling-down ones only if nothing else is left. None if all excluded."""
+        candidates = [b for b in self.backends if b not in exclude]
+        if not candidates:
+            return None
+        now = time.monotonic()
+        healthy = [b for b in candidates if b.healthy(now)]
+        if len(healthy) > 1 and random.random() < LLM_ROUTER_EXPLORE:
+            return random.choice(healthy)
+        if healthy:
+            # min() keeps list order on ties, so the first configured backend wins until data says otherwise
+            return min(healthy, key=lambda b: b.cost())
+        return min(candidates, key=lambda b: b.cooldown_until)
+
+    def hedge_delay(self, backend: Backend):
+        """Seconds to wait on backend before hedging, or None while its latency profile is unknown."""
+        quantile = backend.latency_quantile(LLM_HEDGE_QUANTILE)
+        return None if quantile is None else max(LLM_HEDGE_MIN_DELAY, quantile)
+
+    def _hedge_pool(self) -> ThreadPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=max(2, LLM_HEDGE_WORKERS), thread_name_prefix="llm-hedge")
+            return self._pool
+
+    def call(self, send):
+        """
+        Run send(backend) -> result on the best backend. If it has not answered
+        within hedge_delay(), run send on the next best healthy backend as well
+        and return the first success. The loser's reply is discarded; with every
+        attempt failing, the primary's exception is raised.
+        """
+        primary = self.pick()
+        if not LLM_HEDGE_ENABLED or len(self.backends) < 2:
+            return send(primary)
+        delay = self.hedge_delay(primary)
+        secondary = self.pick(exclude=(primary,))
+        if delay is None or secondary is None or not secondary.healthy():
+            return send(primary)
+
+        pool = self._hedge_pool()
+        first = pool.submit(send, primary)
+        done, _ = wait([first], timeout=delay)
+        if done:
+            return first.result()
+
+        hedge = pool.submit(send, secondary)
+        pending = {first, hedge}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    LLM_HEDGES.inc(outcome="primary_won" if future is first else "hedge_won")
+                    return future.result()
+        LLM_HEDGES.inc(outcome="both_failed")
+        return first.result()
+
+    def snapshot(self) -> list:
+        return [backend.snapshot() for backend in self.backends]
+
+
+def load_backends(spec: str = LLM_BACKENDS) -> list:
+    """Backends from LLM_BACKENDS, or the single primary backend from LLM_API_URL / LLM_MODEL / LLM_API_KEY."""
+    timeout = float(os.getenv("LLM_TIMEOUT", "60"))
+    if not spec.strip():
+        return [Backend(
+            "primary", os.getenv("LLM_API_URL"), os.getenv("LLM_MODEL", "llama-3.1-8b-instant"),
+            os.getenv("LLM_API_KEY"), timeout
+        )]
+
+    backends = []
+    for i, entry in enumerate(json.loads(spec)):
+        if not entry.get("url") or not entry.get("model"):
+            raise ValueError(f"LLM_BACKENDS entry {i} needs url and model")
+        api_key = entry.get("api_key") or (os.getenv(entry["api_key_env"]) if entry.get("api_key_env") else None)
+        limiter = RateLimiter(int(entry.get("rpm", 0)), int(entry.get("tpm", 0)))
+        backends.append(Backend(
+            entry.get("name") or f"backend{i}", entry["url"], entry["model"], api_key,
+            float(entry.get("timeout", timeout)), limiter
+        ))
+    return backends
+
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def get_router() -> LLMRouter:
+    """Return the process-wide router over the configured backends."""
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                _router = LLMRouter(load_backends())
+    return _router
@@ -0,0 +1,169 @@
+# llm_scheduler.py - Process-wide fair scheduling of LLM calls across concurrent match requests
+import os
+import time
+import itertools
+import threading
+from collections import deque
+from contextlib import contextmanager
+from urllib.parse import urlparse
+from llm_router import get_router
+from ratelimit import get_rate_limiter
+from metrics import STAGE_SECONDS, LLM_QUEUE_DEPTH, LLM_SLOTS_IN_USE
+
+# Concurrent LLM calls across the process (0 = LLM_MAX_CONCURRENCY per distinct backend host)
+LLM_SCHEDULER_SLOTS = int(os.getenv("LLM_SCHEDULER_SLOTS", "0"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+
+# Calls made outside any flow (digests, ad-hoc calls) share this one
+DEFAULT_FLOW = "default"
+
+WAIT_WINDOW = 1000
+
+_local = threading.local()
+_flow_ids = itertools.count(1)
+
+
+def current_flow() -> str:
+    """The flow LLM calls on this thread are charged to, or None."""
+    return getattr(_local, "flow", None)
+
+
+def new_flow(prefix: str) -> str:
+    return f"{prefix}-{next(_flow_ids)}"
+
+
+@contextmanager
+def llm_flow(flow: str):
+    """Charge LLM calls made on this thread inside the with-block to flow."""
+    previous = current_flow()
+    _local.flow = flow
+    try:
+        yield flow
+    finally:
+        _local.flow = previous
+
+
+class _Ticket:
+    __slots__ = ("flow", "granted", "queued_at")
+
+    def __init__(self, flow: str):
+        self.flow = flow
+        self.granted = threading.Event()
+        self.queued_at = time.monotonic()
+
+
+class FairScheduler:
+    """
+    A fixed number of LLM call slots granted round-robin across flows (one
+    flow per /match request or requisition run), so a large run queues behind
+    its own calls instead of everyone else's. A granted call then draws on the
+    process-wide RPM/TPM budget (ratelimit.get_rate_limiter), so the budget is
+    spent in fair order too.
+    """
+
+    def __init__(self, slots: int):
+        self.slots = max(1, slots)
+        self._free = self.slots
+        self._queues = {}
+        self._ring = deque()
+        self._held = {}
+        self._granted = 0
+        self._waits = deque(maxlen=WAIT_WINDOW)
+        self._max_wait = 0.0
+        self._lock = threading.Lock()
+
+    def _dispatch(self):
+        while self._free > 0 and self._ring:
+            flow = self._ring.popleft()
+            queue = self._queues[flow]
+            ticket = queue.popleft()
+            if queue:
+                self._ring.append(flow)
+            else:
+                del self._queues[flow]
+            self._free -= 1
+            self._held[flow] = self._held.get(flow, 0) + 1
+            self._granted += 1
+            ticket.granted.set()
+        LLM_QUEUE_DEPTH.set(sum(len(queue) for queue in self._queues.values()))
+        LLM_SLOTS_IN_USE.set(self.slots - self._free)
+
+    def acquire(self, flow: str = None) -> float:
+        """Block until flow is granted a slot. Returns the seconds waited."""
+        ticket = _Ticket(flow or DEFAULT_FLOW)
+        with self._lock:
+            queue = self._queues.get(ticket.flow)
+            if queue is None:
+                queue = self._queues[ticket.flow] = deque()
+                self._ring.append(ticket.flow)
+            queue.append(ticket)
+            self._dispatch()
+        ticket.granted.wait()
+        waited = time.monotonic() - ticket.queued_at
+        STAGE_SECONDS.observe(waited, stage="llm_queue_wait")
+        with self._lock:
+            self._waits.append(waited)
+            self._max_wait = max(self._max_wait, waited)
+        return waited
+
+    def release(self, flow: str = None):
+        flow = flow or DEFAULT_FLOW
+        with self._lock:
+            held = self._held.get(flow, 0) - 1
+            if held > 0:
+                self._held[flow] = held
+            else:
+                self._held.pop(flow, None)
+            self._free = min(self.slots, self._free + 1)
+            self._dispatch()
+
+    @contextmanager
+    def slot(self, flow: str = None, tokens: int = 0):
+        """Hold a slot for one LLM call of about tokens tokens, after the shared RPM/TPM budget allows it."""
+        flow = flow or DEFAULT_FLOW
+        self.acquire(flow)
+        try:
+            with STAGE_SECONDS.time(stage="llm_rate_limit_wait"):
+                get_rate_limiter().acquire(tokens)
+            yield
+        finally:
+            self.release(flow)
+
+    def stats(self) -> dict:
+        with self._lock:
+            waits = sorted(self._waits)
+            flows = {}
+            for flow in set(self._queues) | set(self._held):
+                flows[flow] = {"queued": len(self._queues.get(flow, ())), "in_flight": self._held.get(flow, 0)}
+            stats = {
+                "slots": self.slots,
+                "in_use": self.slots - self._free,
+                "queued": sum(len(queue) for queue in self._queues.values()),
+                "granted": self._granted,
+                "max_wait_ms": round(self._max_wait * 1000, 1),
+                "flows": flows,
+            }
+        if waits:
+            stats["mean_wait_ms"] = round(sum(waits) / len(waits) * 1000, 1)
+            stats["p95_wait_ms"] = round(waits[min(len(waits) - 1, int(0.95 * len(waits)))] * 1000, 1)
+        else:
+            stats["mean_wait_ms"] = stats["p95_wait_ms"] = 0.0
+        return stats
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> FairScheduler:
+    """Return the process-wide scheduler every LLM call goes through."""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                slots = LLM_SCHEDULER_SLOTS
+                if slots <= 0:
+                    hosts = {urlparse(backend.url or "").netloc for backend in get_router().backends}
+                    slots = LLM_MAX_CONCURRENCY * max(1, len(hosts))
+                _scheduler = FairScheduler(slots)
+    return _scheduler
@@ -0,0 +1,228 @@
+# match_runs.py - /match runs shared by identical requests, finished in the background past a deadline
+import os
+import re
+import json
+import time
+import uuid
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from matcher import iter_scored, rank_results, explain_results, expand_results, resolve_batch_size
+from prefilter import resolve_top_k
+from metrics import STAGE_SECONDS, CACHE_LOOKUPS
+
+logger = logging.getLogger(__name__)
+
+# Default /match deadline in milliseconds (0 = wait for every candidate); request field "deadline_ms" overrides
+MATCH_DEADLINE_MS = int(os.getenv("MATCH_DEADLINE_MS", "0"))
+# Seconds a run's results stay fetchable after it finishes, and most runs kept in memory
+MATCH_RUN_TTL = float(os.getenv("MATCH_RUN_TTL", "900"))
+MATCH_RUN_MAX = int(os.getenv("MATCH_RUN_MAX", "200"))
+
+RUN_RUNNING = "running"
+RUN_DONE = "done"
+RUN_FAILED = "failed"
+
+WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_job_description(job_desc: str) -> str:
+    return WHITESPACE_RE.sub(" ", job_desc).strip()
+
+
+def match_key(job_desc: str, options: dict, corpus_version: str) -> str:
+    """
+    Identity of a scoring run: normalized JD, corpus version and the options
+    that change what it computes, as resolved values, so "50", 50 and an omitted
+    top_k that defaults to 50 share a run. min_score, include, concurrency and
+    deadline_ms only change how the shared result is filtered, shown or waited for.
+    """
+    rank = options["mode"] == "rank"
+    identity = {
+        "job_description": normalize_job_description(job_desc),
+        "corpus_version": corpus_version,
+        "top_k": resolve_top_k(options.get("top_k")),
+        "batch_size": resolve_batch_size(options.get("batch_size")),
+        "mode": options["mode"],
+        # Only rank mode explains anything
+        "explain_top": options["explain_top"] if rank else 0,
+    }
+    return hashlib.sha256(json.dumps(identity, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class MatchRun:
+    """
+    One scoring run over a shortlist, on its own thread. Every /match with the
+    same key while it runs waits on it instead of scoring again, and a request
+    whose deadline passes can answer early while the run keeps going.
+    Callers apply their own min_score and include to the shared rows.
+    """
+
+    def __init__(self, job_desc: str, shortlisted: list, options: dict, total_candidates: int, pruned: list,
+                 key: str = None):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.job_desc = job_desc
+        self.shortlisted = shortlisted
+        self.shortlisted_by_id = {rec["id"]: rec for rec in shortlisted}
+        self.options = options
+        self.total_candidates = total_candidates
+        self.pruned = pruned
+        self.status = RUN_RUNNING
+        self.error = None
+        self.created_at = datetime.now().isoformat()
+        self.finished_at = None
+        self._finished = None
+        self._scored = []
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+
+    def start(self) -> "MatchRun":
+        threading.Thread(target=self._run, name=f"match-run-{self.id[:8]}", daemon=True).start()
+        return self
+
+    def _run(self):
+        options = self.options
+        score_only = options["mode"] == "rank"
+        try:
+            with STAGE_SECONDS.time(stage="match_scoring"):
+                for result in iter_scored(self.shortlisted, self.job_desc, options.get("concurrency"),
+                                          options.get("batch_size"), score_only):
+                    with self._lock:
+                        self._scored.append(result)
+            if score_only and options["explain_top"]:
+                # The overall best rows: every caller's min_score only cuts from the bottom,
+                # so each caller's own top explain_top is among these (errors are never explained)
+                with self._lock:
+                    top = [dict(result) for result in rank_results(list(self._scored))[:options["explain_top"]]]
+                # Explained on copies and swapped in whole, so a concurrent snapshot never sees a half-filled row
+                with STAGE_SECONDS.time(stage="match_explain"):
+                    explain_results(top, self.shortlisted_by_id, self.job_desc, options.get("concurrency"))
+                explained = {result["candidate_id"]: result for result in top}
+                with self._lock:
+                    self._scored = [explained.get(result["candidate_id"], result) for result in self._scored]
+            self.status = RUN_DONE
+        except Exception as e:
+            logger.exception("Match run %s failed", self.id)
+            self.error = str(e)
+            self.status = RUN_FAILED
+        finally:
+            self._finished = time.monotonic()
+            self.finished_at = datetime.now().isoformat()
+            self._done.set()
+
+    def wait(self, timeout: float = None) -> bool:
+        """Block until the run finishes or timeout seconds pass. True if it finished."""
+        return self._done.wait(timeout)
+
+    def expired(self, now: float) -> bool:
+        return self._finished is not None and now - self._finished > MATCH_RUN_TTL
+
+    def snapshot(self, min_score: float = None, include=None) -> dict:
+        """
+        The /match response body for what is scored so far, filtered by
+        min_score and expanded with include. None falls back to the starting
+        request's values, for continuation-token polls; a coalesced /match
+        passes its own (() for compact rows). Rows are copies, so callers can
+        filter and expand them independently.
+        """
+        with self._lock:
+            # Status first: once it reads done, every row has been appended
+            status = self.status
+            scored = [dict(result) for result in self._scored]
+        if min_score is None:
+            min_score = self.options["min_score"]
+        results = rank_results(scored, min_score)
+        expand_results(results, self.shortlisted_by_id, include if include is not None else self.options["include"])
+        partial = status == RUN_RUNNING
+        data = {
+            "job_description": self.job_desc,
+            "results": results,
+            "total_candidates": self.total_candidates,
+            "scored_candidates": len(self.shortlisted),
+            "matched_candidates": len(results),
+            "pruned_count": self.total_candidates - len(self.shortlisted),
+            "pruned_candidates": self.pruned,
+            "min_score": min_score,
+            "mode": self.options["mode"],
+            "partial": partial,
+            "completed_candidates": len(scored),
+            "pending_candidates": len(self.shortlisted) - len(scored),
+            "status": status,
+            "timestamp": datetime.now().isoformat()
+        }
+        if partial:
+            data["continuation_token"] = self.id
+        if self.error:
+            data["error"] = self.error
+        return data
+
+
+class MatchRunRegistry:
+    """
+    In-memory runs by continuation token, and running ones by key for
+    coalescing. Finished runs expire after MATCH_RUN_TTL.
+    """
+
+    def __init__(self, max_runs: int = MATCH_RUN_MAX):
+        self.max_runs = max_runs
+        self._runs = OrderedDict()
+        self._running = {}
+        self._lock = threading.Lock()
+
+    def find(self, key: str):
+        """The run with this key that is still scoring, or None."""
+        with self._lock:
+            run = self._running.get(key)
+            if run is not None and run.status != RUN_RUNNING:
+                del self._running[key]
+                run = None
+        CACHE_LOOKUPS.inc(cache="match_coalesce", result="hit" if run is not None else "miss")
+        return run
+
+    def add(self, run: MatchRun):
+        """
+        Register and start run, unless a running run with the same key got
+        there first. Returns (run to wait on, True if it was already running).
+        """
+        with self._lock:
+            self._prune()
+            existing = self._running.get(run.key) if run.key else None
+            if existing is not None and existing.status == RUN_RUNNING:
+                return existing, True
+            self._runs[run.id] = run
+            if run.key:
+                self._running[run.key] = run
+        return run.start(), False
+
+    def get(self, run_id: str):
+        with self._lock:
+            self._prune()
+            return self._runs.get(run_id)
+
+    def _prune(self):
+        now = time.monotonic()
+        for run_id in [run_id for run_id, run in self._runs.items() if run.expired(now)]:
+            del self._runs[run_id]
+        for key in [key for key, run in self._running.items() if run.status != RUN_RUNNING]:
+            del self._running[key]
+        # Over the cap, forget the oldest finished runs; running ones are never dropped
+        finished = [run_id for run_id, run in self._runs.items() if run.status != RUN_RUNNING]
+        while len(self._runs) > self.max_runs and finished:
+            del self._runs[finished.pop(0)]
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_match_runs() -> MatchRunRegistry:
+    """Return the process-wide registry of background match runs."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = MatchRunRegistry()
+    return _registry
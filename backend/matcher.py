@@ -0,0 +1,294 @@
+# matcher.py - Candidate scoring for /match
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from llm_client import rate_candidate, rate_candidates, GROQ_MODEL, PROMPT_VERSION
+from score_cache import get_score_cache, make_key
+from jd_digest import job_requirements, DIGEST_VERSION
+from llm_scheduler import current_flow, new_flow, llm_flow
+
+# Worker threads used to fan out rate_candidate() calls for a single /match request
+MATCH_WORKERS = int(os.getenv("MATCH_WORKERS", "8"))
+MATCH_MAX_WORKERS = int(os.getenv("MATCH_MAX_WORKERS", "32"))
+
+# Candidates packed into one batched prompt (1 = one call per candidate)
+MATCH_BATCH_SIZE = int(os.getenv("MATCH_BATCH_SIZE", "1"))
+
+# Record fields copied into every result row; the full record is only sent on request
+SUMMARY_FIELDS = ("filename", "email", "skills")
+
+# "full" asks the LLM for score and justification per candidate; "rank" asks for
+# the score alone and leaves justifications to explain_results()
+MATCH_MODES = ("full", "rank")
+MATCH_MODE = os.getenv("MATCH_MODE", "full")
+# Top ranked rows a rank-mode /match explains before answering (0 = none)
+MATCH_EXPLAIN_TOP = int(os.getenv("MATCH_EXPLAIN_TOP", "0"))
+
+
+def candidate_text(rec: dict) -> str:
+    """Text sent to the LLM for a candidate: skills section, else the start of the resume."""
+    return rec.get("skills_section", "") or rec.get("text", "")[:2000]
+
+
+def score_key(skills_text: str, job_desc: str, score_only: bool = False, requirements: str = None) -> str:
+    """
+    Score cache key. Prompts carry requirements, the digest of a long job
+    description, so the key covers the digest version, or marks the prompt as
+    raw when it had the job description itself (short JD or failed digest).
+    """
+    source = DIGEST_VERSION if requirements not in (None, job_desc) else "raw"
+    version = f"{PROMPT_VERSION}.{source}" + (".score" if score_only else "")
+    return make_key(skills_text, job_desc, GROQ_MODEL, version)
+
+
+def cached_response(cache, skills_text: str, job_desc: str, score_only: bool = False, requirements: str = None):
+    """Cached LLM response or None. A score-only lookup also accepts a full result, which carries a score too."""
+    if score_only:
+        full = cache.get(score_key(skills_text, job_desc, requirements=requirements))
+        if full is not None:
+            return full
+    return cache.get(score_key(skills_text, job_desc, score_only, requirements))
+
+
+def cached_rate_candidate(skills_text: str, job_desc: str, requirements: str = None,
+                          score_only: bool = False) -> dict:
+    """
+    rate_candidate() behind the persistent score cache. Scoring runs at
+    temperature 0.0, so an identical (skills, job description, model, prompt)
+    tuple can reuse the stored result. Unparseable LLM output is not cached.
+    requirements is the job text put in the prompt (see jd_digest.job_requirements).
+    """
+    requirements = requirements or job_desc
+    cache = get_score_cache()
+    if cache is None:
+        return rate_candidate(skills_text, requirements, score_only)
+
+    cached = cached_response(cache, skills_text, job_desc, score_only, requirements)
+    if cached is not None:
+        return cached
+
+    key = score_key(skills_text, job_desc, score_only, requirements)
+    resp = rate_candidate(skills_text, requirements, score_only)
+    if not resp.get("parse_error"):
+        cache.put(key, resp)
+    return resp
+
+
+def candidate_summary(rec: dict) -> dict:
+    """Small projection of a record carried by every result row."""
+    return {field: rec.get(field, "") for field in SUMMARY_FIELDS}
+
+
+def build_result(rec: dict, resp: dict) -> dict:
+    """
+    Shape an LLM response into a /match result row. explained is False for
+    score-only responses, whose justification is left for explain_results().
+    Replies that could not be parsed keep a parse_error flag.
+    """
+    result = {
+        "candidate_id": rec["id"],
+        "candidate_name": rec.get("name") or rec.get("filename"),
+        "score": float(resp.get("score", 0.0)),
+        "justification": resp.get("justification", resp.get("raw", "")),
+        "matches": resp.get("matches", []),
+        "recommendation": resp.get("recommendation", ""),
+        "explained": "justification" in resp,
+        "candidate": candidate_summary(rec)
+    }
+    if resp.get("parse_error"):
+        result["parse_error"] = True
+    return result
+
+
+def error_result(rec: dict, error) -> dict:
+    """Score-0 result row for a candidate whose LLM call failed."""
+    return {
+        "candidate_id": rec["id"],
+        "candidate_name": rec.get("name") or rec.get("filename"),
+        "score": 0.0,
+        "justification": f"LLM error: {str(error)}",
+        "matches": [],
+        "recommendation": "",
+        "explained": False,
+        "candidate": candidate_summary(rec),
+        "error": str(error)
+    }
+
+
+def expand_results(results: list, recs_by_id: dict, fields) -> list:
+    """
+    Attach candidate_data (the listed record fields) to each result row, in place.
+    fields=None leaves the rows compact.
+    """
+    if fields:
+        for result in results:
+            rec = recs_by_id.get(result["candidate_id"], {})
+            result["candidate_data"] = {field: rec.get(field, "") for field in fields}
+    return results
+
+
+def score_record(rec: dict, job_desc: str, requirements: str = None, score_only: bool = False) -> dict:
+    """
+    Score one candidate record against the job description.
+    LLM failures are returned as score-0 results carrying an "error" key.
+    """
+    try:
+        return build_result(rec, cached_rate_candidate(candidate_text(rec), job_desc, requirements, score_only))
+    except Exception as e:
+        return error_result(rec, e)
+
+
+def score_batch(recs: list, job_desc: str, requirements: str = None, score_only: bool = False) -> list:
+    """
+    Score several records with one batched prompt (see llm_client.rate_candidates).
+    Cached scores are served first; only the misses are sent to the LLM.
+    Results come back in the same order as recs.
+    """
+    cache = get_score_cache()
+    texts = [candidate_text(rec) for rec in recs]
+    keys = [score_key(text, job_desc, score_only, requirements) for text in texts] if cache else []
+    if cache:
+        responses = [cached_response(cache, text, job_desc, score_only, requirements) for text in texts]
+    else:
+        responses = [None] * len(recs)
+
+    misses = [i for i, resp in enumerate(responses) if resp is None]
+    if misses:
+        try:
+            fresh = rate_candidates([(i, texts[i]) for i in misses], requirements or job_desc, score_only)
+        except Exception as e:
+            fresh = {i: {"error": str(e)} for i in misses}
+        for i in misses:
+            resp = fresh.get(i, {"error": "No result returned"})
+            responses[i] = resp
+            if cache and "error" not in resp and not resp.get("parse_error"):
+                cache.put(keys[i], resp)
+
+    return [
+        error_result(rec, resp["error"]) if "error" in resp else build_result(rec, resp)
+        for rec, resp in zip(recs, responses)
+    ]
+
+
+def resolve_workers(requested=None) -> int:
+    """Clamp a requested worker count to [1, MATCH_MAX_WORKERS]."""
+    try:
+        workers = int(requested) if requested is not None else MATCH_WORKERS
+    except (TypeError, ValueError):
+        workers = MATCH_WORKERS
+    return max(1, min(workers, MATCH_MAX_WORKERS))
+
+
+def resolve_batch_size(requested=None) -> int:
+    """Candidates per batched prompt; 1 means one LLM call per candidate."""
+    try:
+        batch_size = int(requested) if requested is not None else MATCH_BATCH_SIZE
+    except (TypeError, ValueError):
+        batch_size = MATCH_BATCH_SIZE
+    return max(1, batch_size)
+
+
+def resolve_mode(requested=None) -> str:
+    """Scoring mode for a request: "full" or "rank". Raises ValueError for anything else."""
+    mode = str(requested).strip().lower() if requested else MATCH_MODE
+    if mode not in MATCH_MODES:
+        raise ValueError(f"Unknown mode: {mode}. Choose from {', '.join(MATCH_MODES)}")
+    return mode
+
+
+def _chunk_scorer(job_desc: str, batch_size: int, score_only: bool = False):
+    # One scheduler flow per scoring run (unless the caller set one), so concurrent
+    # runs share LLM slots round-robin; worker threads do not inherit it by themselves
+    flow = current_flow() or new_flow("match")
+    with llm_flow(flow):
+        # The digest is computed (or fetched from its cache) once, before the fan-out
+        requirements = job_requirements(job_desc)
+
+    def score_chunk(chunk):
+        with llm_flow(flow):
+            if batch_size == 1:
+                return [score_record(chunk[0], job_desc, requirements, score_only)]
+            return score_batch(chunk, job_desc, requirements, score_only)
+    return score_chunk
+
+
+def score_records(recs: list, job_desc: str, workers=None, batch_size=None, score_only: bool = False) -> list:
+    """
+    Score records concurrently through a bounded thread pool, either one
+    candidate per call or batch_size candidates per batched prompt.
+    Results come back in the same order as recs, whatever order calls finish in.
+    The per-provider cap in llm_client still bounds in-flight API calls.
+    score_only asks the LLM for scores alone (ranking pass, see explain_results).
+    """
+    if not recs:
+        return []
+    batch_size = resolve_batch_size(batch_size)
+    chunks = [recs[i:i + batch_size] for i in range(0, len(recs), batch_size)]
+    score_chunk = _chunk_scorer(job_desc, batch_size, score_only)
+
+    workers = min(resolve_workers(workers), len(chunks))
+    if workers == 1:
+        scored = [score_chunk(chunk) for chunk in chunks]
+    else:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="match") as pool:
+            scored = list(pool.map(score_chunk, chunks))
+    return [result for chunk_results in scored for result in chunk_results]
+
+
+def iter_scored(recs: list, job_desc: str, workers=None, batch_size=None, score_only: bool = False):
+    """
+    Like score_records(), but yields each result row as soon as its candidate
+    (or batch) is scored, in completion order. Closing the generator early
+    cancels work that has not started yet.
+    """
+    if not recs:
+        return
+    batch_size = resolve_batch_size(batch_size)
+    chunks = [recs[i:i + batch_size] for i in range(0, len(recs), batch_size)]
+    score_chunk = _chunk_scorer(job_desc, batch_size, score_only)
+
+    pool = ThreadPoolExecutor(max_workers=min(resolve_workers(workers), len(chunks)), thread_name_prefix="match")
+    try:
+        futures = [pool.submit(score_chunk, chunk) for chunk in chunks]
+        for future in as_completed(futures):
+            yield from future.result()
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def passes_min_score(result: dict, min_score: float) -> bool:
+    """Errors are always reported (as score 0); scored rows must reach min_score."""
+    return "error" in result or result["score"] >= min_score
+
+
+def rank_results(results: list, min_score: float = 0.0) -> list:
+    """
+    Keep results at or above min_score (errors are always kept, as score 0)
+    and sort by score descending. The sort is stable, so ties keep storage order.
+    """
+    kept = [r for r in results if passes_min_score(r, min_score)]
+    kept.sort(key=lambda x: x["score"], reverse=True)
+    return kept
+
+
+def explain_results(results: list, recs_by_id: dict, job_desc: str, workers=None) -> list:
+    """
+    Second phase of rank mode: fill in justification, matches and recommendation
+    for result rows scored without them, in place. Each row keeps its ranking
+    score so the order does not shift; the full responses go through the score
+    cache, so explaining the same candidate again is free. A failed explanation
+    leaves the row unexplained with an "explain_error" key.
+    """
+    pending = [r for r in results if not r.get("explained") and "error" not in r]
+    recs = [recs_by_id[r["candidate_id"]] for r in pending if r["candidate_id"] in recs_by_id]
+    explained = {r["candidate_id"]: r for r in score_records(recs, job_desc, workers)}
+    for result in pending:
+        full = explained.get(result["candidate_id"])
+        if full is None:
+            continue
+        if "error" in full:
+            result["explain_error"] = full["error"]
+            continue
+        for key in ("justification", "matches", "recommendation"):
+            result[key] = full[key]
+        result["explained"] = True
+    return results
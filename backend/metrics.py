@@ -0,0 +1,213 @@
+# metrics.py - In-process request metrics in the Prometheus text format
+import os
+import time
+import threading
+import functools
+from contextlib import contextmanager
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1").lower() not in ("0", "false", "no")
+
+# Latency buckets in seconds, from sub-millisecond storage reads up to slow LLM calls
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(pairs) -> str:
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def _key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            series = sorted(self._series.items())
+            for key, value in series:
+                lines.extend(self._render_series(list(zip(self.labelnames, key)), value))
+        return lines
+
+    def _render_series(self, pairs, value) -> list:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonic counter, one series per label combination."""
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        if not METRICS_ENABLED:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._series.get(self._key(labels), 0)
+
+    def _render_series(self, pairs, value) -> list:
+        return [f"{self.name}{_format_labels(pairs)} {_format_value(value)}"]
+
+
+class Gauge(_Metric):
+    """Current value that goes up and down, e.g. a queue depth."""
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        if not METRICS_ENABLED:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = value
+
+    def _render_series(self, pairs, value) -> list:
+        return [f"{self.name}{_format_labels(pairs)} {_format_value(value)}"]
+
+
+class Histogram(_Metric):
+    """Latency histogram with fixed buckets; each series keeps bucket counts, sum and count."""
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        if not METRICS_ENABLED:
+            return
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["buckets"][i] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the wall time of the with-block, including when it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _render_series(self, pairs, series) -> list:
+        lines = []
+        for bound, count in zip(self.buckets, series["buckets"]):
+            lines.append(f"{self.name}_bucket{_format_labels(pairs + [('le', _format_value(bound))])} {count}")
+        lines.append(f"{self.name}_bucket{_format_labels(pairs + [('le', '+Inf')])} {series['count']}")
+        lines.append(f"{self.name}_sum{_format_labels(pairs)} {_format_value(series['sum'])}")
+        lines.append(f"{self.name}_count{_format_labels(pairs)} {series['count']}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "resume_screener_stage_duration_seconds",
+    "Time spent per processing stage (file_save, parse_resume, storage_read, storage_write, llm_queue_wait, llm_call, ...)",
+    ("stage",),
+))
+HTTP_REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "resume_screener_http_request_duration_seconds",
+    "HTTP request latency by route, until the response (or the first streamed byte) is returned",
+    ("method", "endpoint", "status"),
+))
+LLM_REQUESTS = REGISTRY.register(Counter(
+    "resume_screener_llm_requests_total",
+    "LLM API calls by backend and outcome (ok, error)",
+    ("backend", "outcome"),
+))
+LLM_HEDGES = REGISTRY.register(Counter(
+    "resume_screener_llm_hedges_total",
+    "Hedged LLM calls by outcome (primary_won, hedge_won, both_failed)",
+    ("outcome",),
+))
+LLM_ERRORS = REGISTRY.register(Counter(
+    "resume_screener_llm_errors_total",
+    "LLM failures by type (http: request failed, parse/batch_parse: no usable JSON even after tolerant parsing)",
+    ("type",),
+))
+LLM_RETRIES = REGISTRY.register(Counter(
+    "resume_screener_llm_retries_total",
+    "LLM calls retried, by reason (rate_limited, server_error, connection, parse)",
+    ("reason",),
+))
+LLM_QUEUE_DEPTH = REGISTRY.register(Gauge(
+    "resume_screener_llm_queue_depth",
+    "LLM calls waiting in the fair scheduler for a slot",
+))
+LLM_SLOTS_IN_USE = REGISTRY.register(Gauge(
+    "resume_screener_llm_slots_in_use",
+    "LLM call slots currently granted by the fair scheduler",
+))
+CACHE_LOOKUPS = REGISTRY.register(Counter(
+    "resume_screener_cache_lookups_total",
+    "Score and parse cache lookups by result",
+    ("cache", "result"),
+))
+
+
+def timed(stage: str):
+    """Decorator recording every call of the wrapped function under STAGE_SECONDS{stage}."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with STAGE_SECONDS.time(stage=stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def render() -> str:
+    """All registered metrics in the Prometheus text exposition format (version 0.0.4)."""
+    return REGISTRY.render()
@@ -5,6 +5,33 @@ from pdfminer.high_level import extract_text_to_fp
 from pdfminer.layout import LAParams
 from docx import Document
 
+# Bump whenever parsing output changes; cached parses from older versions are
+# then re-parsed on the next upload (or by `python backend/ingest.py --reparse`)
+PARSER_VERSION = "1"
+
+# Header names for each section parse_resume() returns
+SECTION_HEADERS = {
+    "skills_section": ["skills", "technical skills", "professional skills", "skills & tools", "technical expertise"],
+    "education": ["education", "academic background", "qualifications"],
+    "experience": ["experience", "work experience", "projects", "internships"],
+}
+
+# A line containing any of these ends the section being captured
+STOP_HEADERS = ["experience", "education", "projects", "certifications", "achievements", "summary", "profile", "contact"]
+
+def _substring_pattern(names: list):
+    """One compiled alternation that matches wherever any of names occurs as a substring."""
+    return re.compile("|".join(re.escape(name.lower()) for name in names))
+
+SECTION_PATTERNS = {key: _substring_pattern(names) for key, names in SECTION_HEADERS.items()}
+STOP_PATTERN = _substring_pattern(STOP_HEADERS)
+# Matches any header or stop name; most lines match nothing and skip the per-section checks
+ANY_HEADER_PATTERN = _substring_pattern(
+    sorted({name for names in SECTION_HEADERS.values() for name in names} | set(STOP_HEADERS))
+)
+EMAIL_RE = re.compile(r'[\w\.-]+@[\w\.-]+')
+PHONE_RE = re.compile(r'(\+?\d[\d\-\s\(\)]{6,}\d)')
+
 def extract_text_from_pdf(fileobj) -> str:
     """Extract text from PDF"""
     output = BytesIO()
@@ -42,7 +69,7 @@ def extract_section(text: str, section_names: list):
             capture = True
             continue
         # Stop capturing at next major header
-        if capture and any(h in l_clean for h in ["experience","education","projects","certifications","achievements","summary","profile","contact"]):
+        if capture and any(h in l_clean for h in STOP_HEADERS):
             last_section = current_lines  # save captured section
             capture = False
             current_lines = []
@@ -61,19 +88,78 @@ def basic_contact_extraction(text: str):
     email = None
     phone = None
     name = None
-    m = re.search(r'[\w\.-]+@[\w\.-]+', text)
+    m = EMAIL_RE.search(text)
     if m:
         email = m.group(0)
-    m2 = re.search(r'(\+?\d[\d\-\s\(\)]{6,}\d)', text)
+    m2 = PHONE_RE.search(text)
     if m2:
         phone = m2.group(0)
+    name = _name_from_lines(text.splitlines())
+    return {"email": email, "phone": phone, "name": name}
+
+def _name_from_lines(lines: list):
     # Attempt to extract name from top lines
-    for line in text.splitlines()[:5]:
+    for line in lines[:5]:
         line = line.strip()
         if line and len(line.split()) <= 4:
-            name = line
-            break
-    return {"email": email, "phone": phone, "name": name}
+            return line
+    return None
+
+def segment_resume(text: str) -> dict:
+    """
+    Single-pass segmenter: walks the lines once with precompiled header
+    patterns and returns every section in SECTION_HEADERS plus contact fields.
+    Produces exactly what extract_section() per section and
+    basic_contact_extraction() would, including "last occurrence wins".
+    """
+    lines = text.splitlines()
+    # Per-section capture state: [last_section, current_lines, capture]
+    state = {key: [[], [], False] for key in SECTION_PATTERNS}
+    capturing = []
+
+    for line in lines:
+        stripped = line.strip()
+        l_clean = stripped.lower().rstrip(":")
+        if not ANY_HEADER_PATTERN.search(l_clean):
+            # Plain content line: only matters to sections currently capturing
+            for st in capturing:
+                st[1].append(stripped)
+            continue
+
+        is_stop = None  # computed lazily, only when some section is capturing
+        for key, pattern in SECTION_PATTERNS.items():
+            st = state[key]
+            if pattern.search(l_clean):
+                # start capturing new section
+                if st[1]:
+                    st[0] = st[1]  # save previous captured section
+                st[1] = []
+                st[2] = True
+            elif st[2]:
+                if is_stop is None:
+                    is_stop = STOP_PATTERN.search(l_clean) is not None
+                if is_stop:
+                    # Stop capturing at next major header
+                    st[0] = st[1]
+                    st[1] = []
+                    st[2] = False
+                else:
+                    st[1].append(stripped)
+        capturing = [st for st in state.values() if st[2]]
+
+    sections = {}
+    for key, (last_section, current_lines, capture) in state.items():
+        # If capture was active at EOF, save it
+        if capture and current_lines:
+            last_section = current_lines
+        sections[key] = "\n".join(last_section)
+
+    email = EMAIL_RE.search(text)
+    phone = PHONE_RE.search(text)
+    sections["email"] = email.group(0) if email else None
+    sections["phone"] = phone.group(0) if phone else None
+    sections["name"] = _name_from_lines(lines)
+    return sections
 
 def parse_resume(path: str, ext: str):
     """Parse resume and extract key sections"""
@@ -88,20 +174,15 @@ def parse_resume(path: str, ext: str):
     else:
         raise ValueError(f"Unsupported file type: {ext}. Only PDF, DOCX, or TXT allowed.")
 
-    contact = basic_contact_extraction(text)
-
-    # Robust skills section extraction
-    skills_section = extract_section(text, ["skills", "technical skills", "professional skills", "skills & tools", "technical expertise"])
-
-    education = extract_section(text, ["education", "academic background", "qualifications"])
-    experience = extract_section(text, ["experience","work experience","projects","internships"])
+    # Sections and contact fields in one pass over the text
+    sections = segment_resume(text)
 
     return {
         "text": text,
-        "name": contact.get("name"),
-        "email": contact.get("email"),
-        "phone": contact.get("phone"),
-        "skills_section": skills_section,
-        "education": education,
-        "experience": experience
+        "name": sections["name"],
+        "email": sections["email"],
+        "phone": sections["phone"],
+        "skills_section": sections["skills_section"],
+        "education": sections["education"],
+        "experience": sections["experience"]
     }
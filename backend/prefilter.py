@@ -0,0 +1,116 @@
+# prefilter.py - Local lexical first stage for /match
+import os
+import re
+import math
+from collections import Counter
+
+# Candidates forwarded to the LLM after the lexical ranking; 0 disables the prefilter
+MATCH_PREFILTER_TOP_K = int(os.getenv("MATCH_PREFILTER_TOP_K", "50"))
+# Pruned candidates listed in a response (the nearest misses); the rest are only counted
+MATCH_PRUNED_LIST_MAX = int(os.getenv("MATCH_PRUNED_LIST_MAX", "20"))
+
+# BM25 parameters and per-field weights (skills count more than free text)
+BM25_K1 = 1.5
+BM25_B = 0.75
+FIELD_WEIGHTS = {"skills": 3.0, "experience": 1.5, "text": 1.0}
+
+# Keeps tech tokens like c++, c#, node.js and ci/cd-style fragments intact
+TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#.]*")
+
+STOPWORDS = frozenset("""
+a an and are as at be but by for from has have in is it its of on or our that the this to
+we with you your will who what which should must can able experience years year work working
+job role team strong knowledge skills skill using use including etc plus
+""".split())
+
+
+def tokenize(text: str) -> list:
+    """Lowercase word tokens with trailing punctuation dots stripped."""
+    tokens = []
+    for tok in TOKEN_RE.findall((text or "").lower()):
+        tok = tok.rstrip(".")
+        if tok:
+            tokens.append(tok)
+    return tokens
+
+
+def query_terms(job_desc: str) -> list:
+    """Distinct, non-stopword terms of the job description in first-seen order."""
+    seen = {}
+    for tok in tokenize(job_desc):
+        if tok not in STOPWORDS and len(tok) > 1:
+            seen.setdefault(tok, None)
+    return list(seen)
+
+
+def bm25_scores(recs: list, job_desc: str) -> list:
+    """
+    BM25 score of every record against the job description, in record order.
+    Term frequencies are weighted per field (skills, experience, text).
+    """
+    terms = query_terms(job_desc)
+    if not recs or not terms:
+        return [0.0] * len(recs)
+
+    term_set = set(terms)
+    doc_tfs = []
+    doc_lens = []
+    df = Counter()
+    for rec in recs:
+        tf = Counter()
+        length = 0.0
+        for field, weight in FIELD_WEIGHTS.items():
+            toks = tokenize(rec.get(field) or "")
+            length += weight * len(toks)
+            for tok in toks:
+                if tok in term_set:
+                    tf[tok] += weight
+        doc_tfs.append(tf)
+        doc_lens.append(length)
+        df.update(tf.keys())
+
+    n_docs = len(recs)
+    avg_len = (sum(doc_lens) / n_docs) or 1.0
+    idf = {t: math.log(1 + (n_docs - df[t] + 0.5) / (df[t] + 0.5)) for t in terms}
+
+    scores = []
+    for tf, length in zip(doc_tfs, doc_lens):
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * length / avg_len)
+        scores.append(sum(idf[t] * tf[t] * (BM25_K1 + 1) / (tf[t] + norm) for t in tf))
+    return scores
+
+
+def resolve_top_k(requested=None) -> int:
+    try:
+        top_k = int(requested) if requested is not None else MATCH_PREFILTER_TOP_K
+    except (TypeError, ValueError):
+        top_k = MATCH_PREFILTER_TOP_K
+    return max(0, top_k)
+
+
+def prefilter(recs: list, job_desc: str, top_k=None):
+    """
+    Rank all records lexically and keep the top_k for LLM scoring.
+    Returns (kept, pruned): kept records in storage order, and a summary of
+    the MATCH_PRUNED_LIST_MAX best-scoring pruned candidates (the nearest
+    misses) with their prefilter scores. len(recs) - len(kept) were pruned.
+    """
+    top_k = resolve_top_k(top_k)
+    if top_k == 0 or len(recs) <= top_k:
+        return list(recs), []
+
+    scores = bm25_scores(recs, job_desc)
+    # Stable sort, so equal scores keep storage order
+    order = sorted(range(len(recs)), key=lambda i: scores[i], reverse=True)
+    keep = set(order[:top_k])
+
+    kept = [rec for i, rec in enumerate(recs) if i in keep]
+    pruned = [
+        {
+            "candidate_id": recs[i]["id"],
+            "candidate_name": recs[i].get("name") or recs[i].get("filename"),
+            "prefilter_score": round(scores[i], 4)
+        }
+        for i in order[top_k:top_k + MATCH_PRUNED_LIST_MAX]
+    ]
+    return kept, pruned
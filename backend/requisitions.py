@@ -0,0 +1,347 @@
+# requisitions.py - Saved job requisitions with persisted, incrementally updated match results
+import os
+import json
+import uuid
+import hashlib
+import logging
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from storage import DB_PATH, get_storage, open_sqlite
+from prefilter import prefilter
+from matcher import score_records, candidate_text, candidate_summary
+from llm_client import GROQ_MODEL, PROMPT_VERSION
+from jd_digest import DIGEST_VERSION
+from llm_scheduler import llm_flow
+from metrics import STAGE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+REQUISITIONS_DB_PATH = os.getenv("REQUISITIONS_DB_PATH", DB_PATH)
+# Score newly ingested candidates that make an open requisition's shortlist, in the background
+REQUISITION_AUTO_SCORE = os.getenv("REQUISITION_AUTO_SCORE", "1").lower() not in ("0", "false", "no")
+REQUISITION_WORKERS = int(os.getenv("REQUISITION_WORKERS", "1"))
+
+STATUS_OPEN = "open"
+STATUS_CLOSED = "closed"
+STATUSES = (STATUS_OPEN, STATUS_CLOSED)
+
+# Stored results are reused while the candidate text and this scoring setup are unchanged
+SCORE_VERSION = f"{GROQ_MODEL}:{PROMPT_VERSION}.{DIGEST_VERSION}"
+
+
+def candidate_fingerprint(rec: dict) -> str:
+    """Hash of what the LLM is shown for a candidate, plus the scoring version."""
+    return hashlib.sha256(f"{SCORE_VERSION}\x00{candidate_text(rec)}".encode("utf-8")).hexdigest()
+
+
+class RequisitionStore:
+    """SQLite tables holding requisitions and the latest result row per (requisition, candidate)."""
+
+    def __init__(self, path: str = REQUISITIONS_DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS requisitions (
+                    id TEXT PRIMARY KEY,
+                    title TEXT NOT NULL,
+                    job_description TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    min_score REAL NOT NULL,
+                    top_k INTEGER,
+                    created_at TEXT NOT NULL,
+                    updated_at TEXT NOT NULL,
+                    last_matched_at TEXT
+                )
+                """
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS requisition_results (
+                    requisition_id TEXT NOT NULL,
+                    candidate_id TEXT NOT NULL,
+                    fingerprint TEXT NOT NULL,
+                    score REAL NOT NULL,
+                    result TEXT NOT NULL,
+                    scored_at TEXT NOT NULL,
+                    PRIMARY KEY (requisition_id, candidate_id)
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_requisition_results_score "
+                "ON requisition_results(requisition_id, score DESC)"
+            )
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = open_sqlite(self.path)
+            self._local.conn = conn
+        return conn
+
+    def create(self, title: str, job_description: str, min_score: float = 0.0, top_k: int = None) -> dict:
+        now = datetime.now().isoformat()
+        req = {
+            "id": uuid.uuid4().hex,
+            "title": title,
+            "job_description": job_description,
+            "status": STATUS_OPEN,
+            "min_score": min_score,
+            "top_k": top_k,
+            "created_at": now,
+            "updated_at": now,
+            "last_matched_at": None
+        }
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT INTO requisitions (id, title, job_description, status, min_score, top_k, created_at, updated_at, last_matched_at) "
+                "VALUES (:id, :title, :job_description, :status, :min_score, :top_k, :created_at, :updated_at, :last_matched_at)",
+                req,
+            )
+        return req
+
+    def get(self, req_id: str):
+        row = self._conn().execute("SELECT * FROM requisitions WHERE id = ?", (req_id,)).fetchone()
+        return dict(row) if row else None
+
+    def list(self, status: str = None) -> list:
+        if status:
+            rows = self._conn().execute(
+                "SELECT * FROM requisitions WHERE status = ? ORDER BY created_at", (status,)
+            ).fetchall()
+        else:
+            rows = self._conn().execute("SELECT * FROM requisitions ORDER BY created_at").fetchall()
+        return [dict(row) for row in rows]
+
+    def update(self, req_id: str, **fields) -> dict:
+        """Change title, job_description, status, min_score or top_k. A new job description drops stored results."""
+        req = self.get(req_id)
+        if req is None:
+            return None
+        jd_changed = "job_description" in fields and fields["job_description"] != req["job_description"]
+        req.update(fields, updated_at=datetime.now().isoformat())
+        with self._conn() as conn:
+            conn.execute(
+                "UPDATE requisitions SET title = :title, job_description = :job_description, status = :status, "
+                "min_score = :min_score, top_k = :top_k, updated_at = :updated_at WHERE id = :id",
+                req,
+            )
+            if jd_changed:
+                conn.execute("DELETE FROM requisition_results WHERE requisition_id = ?", (req_id,))
+        return req
+
+    def delete(self, req_id: str) -> bool:
+        with self._conn() as conn:
+            conn.execute("DELETE FROM requisition_results WHERE requisition_id = ?", (req_id,))
+            return conn.execute("DELETE FROM requisitions WHERE id = ?", (req_id,)).rowcount > 0
+
+    def mark_matched(self, req_id: str):
+        with self._conn() as conn:
+            conn.execute(
+                "UPDATE requisitions SET last_matched_at = ? WHERE id = ?", (datetime.now().isoformat(), req_id)
+            )
+
+    def fingerprints(self, req_id: str) -> dict:
+        """candidate id -> fingerprint of the stored result."""
+        rows = self._conn().execute(
+            "SELECT candidate_id, fingerprint FROM requisition_results WHERE requisition_id = ?", (req_id,)
+        ).fetchall()
+        return {row["candidate_id"]: row["fingerprint"] for row in rows}
+
+    def save_results(self, req_id: str, scored: list):
+        """Upsert (result row, fingerprint) pairs in one transaction."""
+        now = datetime.now().isoformat()
+        with self._conn() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO requisition_results "
+                "(requisition_id, candidate_id, fingerprint, score, result, scored_at) VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (req_id, result["candidate_id"], fingerprint, result["score"], json.dumps(result), now)
+                    for result, fingerprint in scored
+                ],
+            )
+
+    def prune_results(self, req_id: str, live_ids: set) -> int:
+        """Drop results of candidates that no longer exist. Returns rows removed."""
+        stale = [cid for cid in self.fingerprints(req_id) if cid not in live_ids]
+        if stale:
+            with self._conn() as conn:
+                conn.executemany(
+                    "DELETE FROM requisition_results WHERE requisition_id = ? AND candidate_id = ?",
+                    [(req_id, cid) for cid in stale],
+                )
+        return len(stale)
+
+    def results(self, req_id: str, min_score: float = 0.0) -> list:
+        """Stored result rows at or above min_score, best first."""
+        rows = self._conn().execute(
+            "SELECT result FROM requisition_results WHERE requisition_id = ? AND score >= ? "
+            "ORDER BY score DESC, CAST(candidate_id AS INTEGER), candidate_id",
+            (req_id, min_score),
+        ).fetchall()
+        return [json.loads(row["result"]) for row in rows]
+
+    def result_count(self, req_id: str) -> int:
+        return self._conn().execute(
+            "SELECT COUNT(*) FROM requisition_results WHERE requisition_id = ?", (req_id,)
+        ).fetchone()[0]
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_requisition_store() -> RequisitionStore:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = RequisitionStore()
+    return _store
+
+
+# One scoring run per requisition at a time, so concurrent triggers do not score the same candidates twice
+_run_locks = {}
+_run_locks_lock = threading.Lock()
+
+
+def _run_lock(req_id: str) -> threading.Lock:
+    with _run_locks_lock:
+        return _run_locks.setdefault(req_id, threading.Lock())
+
+
+def failed(result: dict) -> bool:
+    return "error" in result or result.get("parse_error", False)
+
+
+def score_requisition(req: dict, recs: list, workers=None, batch_size=None) -> dict:
+    """
+    Score the records in recs whose stored result for req is missing or out of
+    date (candidate text or scoring version changed) and persist the new rows.
+    Failed or unparseable candidates are returned but not stored, so the next
+    run retries them.
+    Returns {"scored": n, "reused": n, "errors": [error rows]}.
+    """
+    store = get_requisition_store()
+    with _run_lock(req["id"]):
+        stored = store.fingerprints(req["id"])
+        todo = [(rec, candidate_fingerprint(rec)) for rec in recs]
+        todo = [(rec, fp) for rec, fp in todo if stored.get(rec["id"]) != fp]
+        if not todo:
+            return {"scored": 0, "reused": len(recs), "errors": []}
+
+        with STAGE_SECONDS.time(stage="requisition_scoring"), llm_flow(f"requisition-{req['id']}"):
+            scored = score_records([rec for rec, _ in todo], req["job_description"], workers, batch_size)
+        fingerprints = {rec["id"]: fp for rec, fp in todo}
+        # The requisition may have been deleted while its candidates were being scored
+        if store.get(req["id"]) is None:
+            return {"scored": 0, "reused": 0, "errors": []}
+        store.save_results(req["id"], [
+            (result, fingerprints[result["candidate_id"]]) for result in scored if not failed(result)
+        ])
+    errors = [result for result in scored if failed(result)]
+    return {"scored": len(todo) - len(errors), "reused": len(recs) - len(todo), "errors": errors}
+
+
+def match_requisition(req: dict, workers=None, batch_size=None) -> dict:
+    """
+    Bring a requisition's stored results up to date with the corpus: prefilter
+    the current candidates, score only new or changed ones, and drop results of
+    deleted candidates. Returns score_requisition() counts plus corpus sizes.
+    """
+    recs = get_storage().read_all()
+    with STAGE_SECONDS.time(stage="prefilter"):
+        shortlisted, pruned = prefilter(recs, req["job_description"], req.get("top_k"))
+    run = score_requisition(req, shortlisted, workers, batch_size)
+
+    store = get_requisition_store()
+    store.prune_results(req["id"], {rec["id"] for rec in recs})
+    store.mark_matched(req["id"])
+    run.update(total_candidates=len(recs), shortlisted_candidates=len(shortlisted),
+               pruned_count=len(recs) - len(shortlisted), pruned_candidates=pruned)
+    return run
+
+
+def requisition_results(req: dict, min_score: float = None) -> list:
+    """Stored rows for req, best first, with each candidate summary refreshed from storage."""
+    min_score = req["min_score"] if min_score is None else min_score
+    results = get_requisition_store().results(req["id"], min_score)
+    storage = get_storage()
+    for result in results:
+        rec = storage.get_by_id(result["candidate_id"])
+        if rec is not None:
+            result["candidate_name"] = rec.get("name") or rec.get("filename")
+            result["candidate"] = candidate_summary(rec)
+    return results
+
+
+class RequisitionWorker:
+    """
+    Background scoring for requisitions: full runs for newly created ones, and
+    for every open one the newly ingested candidates that make its prefilter
+    shortlist, as its /match would pick them. Candidate ids submitted while a
+    pass is running are coalesced into the next pass.
+    """
+
+    def __init__(self, workers: int = REQUISITION_WORKERS):
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="requisition")
+        self._pending = set()
+        self._lock = threading.Lock()
+
+    def submit_requisition(self, req_id: str):
+        self._pool.submit(self._match, req_id)
+
+    def submit_candidates(self, candidate_ids):
+        with self._lock:
+            schedule = not self._pending
+            self._pending.update(str(cid) for cid in candidate_ids)
+        if schedule:
+            self._pool.submit(self._score_pending)
+
+    def _match(self, req_id: str):
+        req = get_requisition_store().get(req_id)
+        if req is None or req["status"] != STATUS_OPEN:
+            return
+        try:
+            run = match_requisition(req)
+            logger.info("Requisition %s: scored %d, reused %d", req_id, run["scored"], run["reused"])
+        except Exception:
+            logger.exception("Background match of requisition %s failed", req_id)
+
+    def _score_pending(self):
+        with self._lock:
+            candidate_ids, self._pending = self._pending, set()
+        if not candidate_ids:
+            return
+        reqs = get_requisition_store().list(STATUS_OPEN)
+        if not reqs:
+            return
+        # The shortlist is ranked against the whole corpus, so new candidates compete with
+        # everyone else for the requisition's top_k instead of all going to the LLM
+        recs = get_storage().read_all()
+        for req in reqs:
+            try:
+                with STAGE_SECONDS.time(stage="prefilter"):
+                    shortlisted, _ = prefilter(recs, req["job_description"], req.get("top_k"))
+                new = [rec for rec in shortlisted if str(rec["id"]) in candidate_ids]
+                run = score_requisition(req, new)
+                logger.info("Requisition %s: scored %d of %d new candidates (%d shortlisted)",
+                            req["id"], run["scored"], len(candidate_ids), len(new))
+            except Exception:
+                logger.exception("Background scoring for requisition %s failed", req["id"])
+
+
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def get_requisition_worker() -> RequisitionWorker:
+    global _worker
+    if _worker is None:
+        with _worker_lock:
+            if _worker is None:
+                _worker = RequisitionWorker()
+    return _worker
@@ -0,0 +1,157 @@
+# score_cache.py - Persistent cache for LLM match scores
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from storage import PROJECT_ROOT, open_sqlite
+from metrics import CACHE_LOOKUPS
+
+logger = logging.getLogger(__name__)
+
+SCORE_CACHE_ENABLED = os.getenv("SCORE_CACHE_ENABLED", "1").lower() not in ("0", "false", "no")
+SCORE_CACHE_PATH = os.getenv("SCORE_CACHE_PATH", os.path.join(PROJECT_ROOT, "score_cache.db"))
+SCORE_CACHE_MAX_BYTES = int(os.getenv("SCORE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+SCORE_CACHE_TTL = int(os.getenv("SCORE_CACHE_TTL", str(7 * 24 * 3600)))
+
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+
+def make_key(skills_text: str, job_desc: str, model: str, prompt_version: str) -> str:
+    """Content address for a score: hash(skills) + hash(job description) + model + prompt version."""
+    return f"{_sha256(skills_text)}:{_sha256(job_desc)}:{model}:{prompt_version}"
+
+
+class ScoreCache:
+    """
+    Disk-backed score cache with TTL expiry and size-based LRU eviction.
+    Entries are evicted least-recently-used first once the stored JSON
+    exceeds max_bytes.
+    """
+
+    def __init__(self, path: str = SCORE_CACHE_PATH, max_bytes: int = SCORE_CACHE_MAX_BYTES,
+                 ttl: int = SCORE_CACHE_TTL):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS score_cache (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_score_cache_accessed ON score_cache(accessed_at)")
+        self._total_bytes = conn.execute("SELECT COALESCE(SUM(size), 0) FROM score_cache").fetchone()[0]
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = open_sqlite(self.path)
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str):
+        """Return the cached result dict, or None on miss or expiry."""
+        now = time.time()
+        conn = self._conn()
+        row = conn.execute("SELECT value, size, created_at FROM score_cache WHERE key = ?", (key,)).fetchone()
+        if row is not None and self.ttl > 0 and now - row["created_at"] > self.ttl:
+            with self._lock, conn:
+                if conn.execute("DELETE FROM score_cache WHERE key = ?", (key,)).rowcount:
+                    self._total_bytes -= row["size"]
+            row = None
+
+        if row is None:
+            with self._lock:
+                self.misses += 1
+            CACHE_LOOKUPS.inc(cache="score", result="miss")
+            return None
+
+        with conn:
+            conn.execute("UPDATE score_cache SET accessed_at = ? WHERE key = ?", (now, key))
+        with self._lock:
+            self.hits += 1
+        CACHE_LOOKUPS.inc(cache="score", result="hit")
+        return json.loads(row["value"])
+
+    def put(self, key: str, value: dict):
+        payload = json.dumps(value)
+        size = len(payload.encode("utf-8"))
+        now = time.time()
+        conn = self._conn()
+        with self._lock, conn:
+            old = conn.execute("SELECT size FROM score_cache WHERE key = ?", (key,)).fetchone()
+            conn.execute(
+                "INSERT OR REPLACE INTO score_cache (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, payload, size, now, now),
+            )
+            self._total_bytes += size - (old["size"] if old else 0)
+            self._evict(conn)
+
+    def _evict(self, conn):
+        # Caller holds self._lock and an open transaction
+        while self._total_bytes > self.max_bytes:
+            victims = conn.execute(
+                "SELECT key, size FROM score_cache ORDER BY accessed_at LIMIT 64"
+            ).fetchall()
+            if not victims:
+                self._total_bytes = 0
+                break
+            for victim in victims:
+                if self._total_bytes <= self.max_bytes:
+                    break
+                conn.execute("DELETE FROM score_cache WHERE key = ?", (victim["key"],))
+                self._total_bytes -= victim["size"]
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock, self._conn() as conn:
+            conn.execute("DELETE FROM score_cache")
+            self._total_bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": True,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": self._conn().execute("SELECT COUNT(*) FROM score_cache").fetchone()[0],
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl,
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_score_cache():
+    """Return the process-wide score cache, or None when SCORE_CACHE_ENABLED is off."""
+    global _cache
+    if not SCORE_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ScoreCache()
+    return _cache
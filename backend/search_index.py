@@ -0,0 +1,383 @@
+# search_index.py - Persistent inverted index and boolean full-text search over candidates
+import os
+import re
+import json
+import math
+import time
+import hashlib
+import logging
+import threading
+from storage import DB_PATH, get_storage, open_sqlite
+from prefilter import tokenize, BM25_K1, BM25_B
+from metrics import STAGE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+SEARCH_INDEX_DB_PATH = os.getenv("SEARCH_INDEX_DB_PATH", DB_PATH)
+
+# Indexed fields and their weight in hit ranking
+SEARCH_FIELDS = {"skills": 3.0, "experience": 1.5, "education": 1.0, "text": 1.0}
+
+# Bump whenever tokenization or the stored layout changes; a mismatch rebuilds the index
+INDEX_VERSION = "1"
+
+QUERY_TOKEN_RE = re.compile(r'\s*(?:(?P<lparen>\()|(?P<rparen>\))|(?P<field>\w+):(?=\S)|"(?P<phrase>[^"]*)"?|'
+                            r'(?P<neg>-)(?=[^\s)])|(?P<word>[^\s()"]+))')
+OPERATORS = {"AND": "and", "OR": "or", "NOT": "not"}
+
+
+def parse_query(query: str):
+    """
+    Parse a search query into a tree of ("and", [nodes]), ("or", [nodes]),
+    ("not", node) and ("match", field or None, [tokens]) nodes. Supports
+    AND / OR / NOT (or a leading -), parentheses, "quoted phrases" and field
+    filters (skills:go, experience:"team lead", education:(mit OR stanford)).
+    Adjacent terms are ANDed. Raises ValueError for malformed queries.
+    """
+    tokens = []
+    pos = 0
+    query = query or ""
+    while pos < len(query):
+        m = QUERY_TOKEN_RE.match(query, pos)
+        if m is None or m.end() == pos:
+            break
+        pos = m.end()
+        kind = m.lastgroup
+        value = m.group(kind)
+        if kind == "word" and value in OPERATORS:
+            kind = OPERATORS[value]
+        elif kind == "field":
+            value = value.lower()
+            if value not in SEARCH_FIELDS:
+                raise ValueError(f"Unknown field: {value}. Searchable fields: {', '.join(SEARCH_FIELDS)}")
+        tokens.append((kind, value))
+
+    def peek():
+        return tokens[0][0] if tokens else None
+
+    def parse_or(field):
+        parts = [parse_and(field)]
+        while peek() == "or":
+            tokens.pop(0)
+            parts.append(parse_and(field))
+        parts = [p for p in parts if p is not None]
+        return parts[0] if len(parts) == 1 else ("or", parts) if parts else None
+
+    def parse_and(field):
+        parts = [parse_unary(field)]
+        while peek() not in (None, "rparen", "or"):
+            if peek() == "and":
+                tokens.pop(0)
+            parts.append(parse_unary(field))
+        parts = [p for p in parts if p is not None]
+        return parts[0] if len(parts) == 1 else ("and", parts) if parts else None
+
+    def parse_unary(field):
+        if peek() in ("not", "neg"):
+            tokens.pop(0)
+            node = parse_unary(field)
+            return ("not", node) if node is not None else None
+        return parse_primary(field)
+
+    def parse_primary(field):
+        if not tokens:
+            raise ValueError("Query ends unexpectedly")
+        kind, value = tokens.pop(0)
+        if kind == "field":
+            if field is not None:
+                raise ValueError("Field filters cannot be nested")
+            return parse_primary(value)
+        if kind == "lparen":
+            node = parse_or(field)
+            if peek() != "rparen":
+                raise ValueError("Missing closing parenthesis")
+            tokens.pop(0)
+            return node
+        if kind in ("phrase", "word"):
+            # A word such as ci/cd tokenizes into several terms and is matched as a phrase
+            terms = tokenize(value)
+            return ("match", field, terms) if terms else None
+        raise ValueError(f"Unexpected {value!r} in query")
+
+    tree = parse_or(None)
+    if tokens:
+        raise ValueError(f"Unexpected {tokens[0][1]!r} in query")
+    if tree is None:
+        raise ValueError("Query has no searchable terms")
+    return tree
+
+
+def document_terms(rec: dict) -> dict:
+    """{field: {term: [positions]}} for the indexed fields of a record."""
+    fields = {}
+    for field in SEARCH_FIELDS:
+        terms = {}
+        for position, term in enumerate(tokenize(rec.get(field) or "")):
+            terms.setdefault(term, []).append(position)
+        fields[field] = terms
+    return fields
+
+
+def document_fingerprint(rec: dict) -> str:
+    text = "\x1f".join(rec.get(field) or "" for field in SEARCH_FIELDS)
+    return hashlib.sha256(f"{INDEX_VERSION}\x1e{text}".encode("utf-8")).hexdigest()
+
+
+class SearchIndex:
+    """
+    Positional inverted index over SEARCH_FIELDS, kept in memory and persisted
+    per candidate in SQLite, so a restart loads the postings instead of
+    re-tokenizing every resume. Ingestion updates it incrementally; writes made
+    outside ingestion are picked up by sync() when the corpus version moves.
+    """
+
+    def __init__(self, path: str = SEARCH_INDEX_DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._lock = threading.RLock()
+        self._postings = {field: {} for field in SEARCH_FIELDS}
+        self._docs = {}
+        self._lengths = {field: {} for field in SEARCH_FIELDS}
+        self._total_lengths = dict.fromkeys(SEARCH_FIELDS, 0)
+        self._fingerprints = {}
+        self.version = None
+        with self._conn() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS search_docs (
+                    candidate_id TEXT PRIMARY KEY,
+                    fingerprint TEXT NOT NULL,
+                    terms TEXT NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE TABLE IF NOT EXISTS search_meta (key TEXT PRIMARY KEY, value TEXT)")
+        self._load()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = open_sqlite(self.path)
+            self._local.conn = conn
+        return conn
+
+    def _get_meta(self, key: str):
+        row = self._conn().execute("SELECT value FROM search_meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key: str, value: str):
+        with self._conn() as conn:
+            conn.execute("INSERT OR REPLACE INTO search_meta (key, value) VALUES (?, ?)", (key, value))
+
+    def _load(self):
+        conn = self._conn()
+        if self._get_meta("index_version") != INDEX_VERSION:
+            with conn:
+                conn.execute("DELETE FROM search_docs")
+                conn.execute("DELETE FROM search_meta")
+            self._set_meta("index_version", INDEX_VERSION)
+            return
+        with STAGE_SECONDS.time(stage="search_index_load"):
+            for row in conn.execute("SELECT candidate_id, fingerprint, terms FROM search_docs"):
+                self._add(row["candidate_id"], json.loads(row["terms"]), row["fingerprint"])
+        self.version = self._get_meta("corpus_version")
+        logger.info("Loaded search index with %d candidates", len(self._docs))
+
+    def _add(self, doc_id: str, terms: dict, fingerprint: str):
+        self._remove(doc_id)
+        self._docs[doc_id] = terms
+        self._fingerprints[doc_id] = fingerprint
+        for field, field_terms in terms.items():
+            postings = self._postings[field]
+            for term, positions in field_terms.items():
+                postings.setdefault(term, {})[doc_id] = positions
+            length = sum(len(positions) for positions in field_terms.values())
+            self._lengths[field][doc_id] = length
+            self._total_lengths[field] += length
+
+    def _remove(self, doc_id: str):
+        terms = self._docs.pop(doc_id, None)
+        if terms is None:
+            return
+        self._fingerprints.pop(doc_id, None)
+        for field, field_terms in terms.items():
+            postings = self._postings[field]
+            for term in field_terms:
+                docs = postings.get(term)
+                if docs is not None:
+                    docs.pop(doc_id, None)
+                    if not docs:
+                        del postings[term]
+            self._total_lengths[field] -= self._lengths[field].pop(doc_id, 0)
+
+    def index_records(self, recs: list):
+        """Add or refresh records whose indexed text changed; unchanged ones are skipped."""
+        rows = []
+        with self._lock:
+            for rec in recs:
+                doc_id = str(rec["id"])
+                fingerprint = document_fingerprint(rec)
+                if self._fingerprints.get(doc_id) == fingerprint:
+                    continue
+                terms = document_terms(rec)
+                self._add(doc_id, terms, fingerprint)
+                rows.append((doc_id, fingerprint, json.dumps(terms, separators=(",", ":"))))
+            if rows:
+                with self._conn() as conn:
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO search_docs (candidate_id, fingerprint, terms) VALUES (?, ?, ?)", rows
+                    )
+        return len(rows)
+
+    def remove_records(self, doc_ids):
+        with self._lock:
+            doc_ids = [doc_id for doc_id in doc_ids if doc_id in self._docs]
+            for doc_id in doc_ids:
+                self._remove(doc_id)
+            if doc_ids:
+                with self._conn() as conn:
+                    conn.executemany("DELETE FROM search_docs WHERE candidate_id = ?", [(d,) for d in doc_ids])
+
+    def update_candidates(self, candidate_ids: list):
+        """Ingest listener: re-index the given candidates as stored now."""
+        storage = get_storage()
+        recs = []
+        gone = []
+        for candidate_id in candidate_ids:
+            rec = storage.get_by_id(str(candidate_id))
+            if rec is None:
+                gone.append(str(candidate_id))
+            else:
+                recs.append(rec)
+        with STAGE_SECONDS.time(stage="search_index_update"):
+            self.index_records(recs)
+            self.remove_records(gone)
+
+    def sync(self, full: bool = False):
+        """
+        Catch up with writes made outside ingestion once the corpus version has
+        moved. The quick pass only compares candidate ids; full=True (used at
+        startup) also re-checks every record's text.
+        """
+        storage = get_storage()
+        version = storage.version()
+        if version == self.version:
+            return
+        with self._lock, STAGE_SECONDS.time(stage="search_index_update"):
+            if full:
+                recs = storage.read_all()
+                live = {str(rec["id"]) for rec in recs}
+            else:
+                live = {str(rec["id"]) for rec in storage.list_records(fields=["id"])}
+                recs = [rec for rec in map(storage.get_by_id, live - set(self._docs)) if rec is not None]
+            self.index_records(recs)
+            self.remove_records([doc_id for doc_id in self._docs if doc_id not in live])
+            self.version = version
+            self._set_meta("corpus_version", version)
+
+    def _match(self, field, terms: list) -> dict:
+        """{field: {doc_id: occurrences}} of a term or phrase, in one field or all of them."""
+        matches = {}
+        for name in ([field] if field else SEARCH_FIELDS):
+            postings = self._postings[name]
+            lists = [postings.get(term) for term in terms]
+            if not all(lists):
+                continue
+            if len(terms) == 1:
+                matches[name] = {doc_id: len(positions) for doc_id, positions in lists[0].items()}
+                continue
+            found = {}
+            for doc_id in set.intersection(*(set(docs) for docs in lists)):
+                following = [set(docs[doc_id]) for docs in lists[1:]]
+                count = sum(
+                    1 for start in lists[0][doc_id]
+                    if all(start + offset + 1 in positions for offset, positions in enumerate(following))
+                )
+                if count:
+                    found[doc_id] = count
+            if found:
+                matches[name] = found
+        return matches
+
+    def _evaluate(self, node, leaves: list) -> set:
+        """Matching doc ids of node; positive leaves are collected for ranking."""
+        kind = node[0]
+        if kind == "match":
+            matches = self._match(node[1], node[2])
+            leaves.append(matches)
+            return set().union(*(docs.keys() for docs in matches.values()))
+        if kind == "or":
+            return set().union(*(self._evaluate(child, leaves) for child in node[1]))
+        if kind == "not":
+            return set(self._docs) - self._evaluate(node[1], [])
+        positive = [child for child in node[1] if child[0] != "not"]
+        negative = [child for child in node[1] if child[0] == "not"]
+        docs = set(self._docs)
+        for child in positive:
+            docs &= self._evaluate(child, leaves)
+        for child in negative:
+            docs -= self._evaluate(child[1], [])
+        return docs
+
+    def _score(self, doc_ids: set, leaves: list) -> dict:
+        """BM25 per field over the positive leaves, weighted by SEARCH_FIELDS."""
+        n_docs = len(self._docs) or 1
+        scores = dict.fromkeys(doc_ids, 0.0)
+        fields = {doc_id: set() for doc_id in doc_ids}
+        for matches in leaves:
+            for field, docs in matches.items():
+                weight = SEARCH_FIELDS[field]
+                avg_len = (self._total_lengths[field] / n_docs) or 1.0
+                idf = math.log(1 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+                lengths = self._lengths[field]
+                for doc_id, tf in docs.items():
+                    if doc_id not in scores:
+                        continue
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths.get(doc_id, 0) / avg_len)
+                    scores[doc_id] += weight * idf * tf * (BM25_K1 + 1) / (tf + norm)
+                    fields[doc_id].add(field)
+        return {doc_id: (score, fields[doc_id]) for doc_id, score in scores.items()}
+
+    def search(self, query: str, limit: int = 20, offset: int = 0) -> dict:
+        """
+        Ranked hits for a query (see parse_query). Returns {"hits": [{candidate_id,
+        score, matched_fields}], "total": n, "took_ms": ms}. Raises ValueError for bad queries.
+        """
+        tree = parse_query(query)
+        started = time.perf_counter()
+        self.sync()
+        with self._lock, STAGE_SECONDS.time(stage="search"):
+            leaves = []
+            scored = self._score(self._evaluate(tree, leaves), leaves)
+        # Ties keep storage order: numeric ids sort shorter-first
+        ranked = sorted(scored.items(), key=lambda item: (-item[1][0], len(item[0]), item[0]))
+        hits = [
+            {"candidate_id": doc_id, "score": round(score, 4),
+             "matched_fields": [field for field in SEARCH_FIELDS if field in fields]}
+            for doc_id, (score, fields) in ranked[offset:offset + limit]
+        ]
+        return {"hits": hits, "total": len(ranked), "took_ms": round((time.perf_counter() - started) * 1000, 2)}
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "documents": len(self._docs),
+                "terms": {field: len(postings) for field, postings in self._postings.items()},
+                "corpus_version": self.version,
+            }
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_search_index() -> SearchIndex:
+    """Return the process-wide search index, loaded from disk and synced with storage."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                index = SearchIndex()
+                index.sync(full=True)
+                _index = index
+    return _index
@@ -0,0 +1,327 @@
+# storage.py - Candidate storage engines for Resume Screener
+import os
+import csv
+import sqlite3
+import logging
+import threading
+from metrics import timed
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Legacy flat-file store and the default SQLite database, both in the project root
+CSV_PATH = os.path.join(PROJECT_ROOT, "resumes.csv")
+DB_PATH = os.getenv("STORAGE_DB_PATH", os.path.join(PROJECT_ROOT, "resumes.db"))
+STORAGE_ENGINE = os.getenv("STORAGE_ENGINE", "sqlite").lower()
+
+FIELDNAMES = ["id", "filename", "name", "email", "phone", "skills", "education", "experience", "text"]
+
+
+def open_sqlite(path: str) -> sqlite3.Connection:
+    """Open a SQLite connection in WAL mode with dict-friendly rows."""
+    conn = sqlite3.connect(path, timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class BaseStorage:
+    """Interface every candidate storage engine implements."""
+
+    # Serializes id assignment when several ingest workers add records at once
+    _id_lock = threading.Lock()
+
+    def write_record(self, rec: dict):
+        raise NotImplementedError
+
+    def read_all(self) -> list:
+        raise NotImplementedError
+
+    def get_by_id(self, rec_id: str):
+        raise NotImplementedError
+
+    def next_id(self) -> str:
+        raise NotImplementedError
+
+    def count(self) -> int:
+        return len(self.read_all())
+
+    def version(self) -> str:
+        """Opaque token that changes whenever any candidate is written."""
+        raise NotImplementedError
+
+    @timed("storage_read")
+    def list_records(self, limit: int = None, offset: int = 0, fields: list = None) -> list:
+        """One page of records in id order, optionally projected to fields (id is always kept)."""
+        recs = self.read_all()
+        page = recs[offset:offset + limit] if limit is not None else recs[offset:]
+        if fields is None:
+            return page
+        keep = ["id"] + [f for f in fields if f != "id"]
+        return [{f: rec.get(f, "") for f in keep} for rec in page]
+
+    def update_record(self, rec: dict):
+        """Replace the stored record that has rec["id"]."""
+        self.write_record(rec)
+
+    def add_record(self, rec: dict) -> str:
+        """Assign the next id to rec and write it, atomically within this process."""
+        with self._id_lock:
+            rec["id"] = self.next_id()
+            self.write_record(rec)
+        return rec["id"]
+
+    def add_records(self, recs: list) -> list:
+        """Assign consecutive ids to recs and write them all. Returns the ids."""
+        with self._id_lock:
+            next_id = int(self.next_id())
+            for offset, rec in enumerate(recs):
+                rec["id"] = str(next_id + offset)
+            self.write_records(recs)
+        return [rec["id"] for rec in recs]
+
+    def write_records(self, recs: list):
+        for rec in recs:
+            self.write_record(rec)
+
+
+class CSVStorage(BaseStorage):
+    """Flat-file engine kept for compatibility with existing resumes.csv setups."""
+
+    def __init__(self, path: str = CSV_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+    @timed("storage_write")
+    def write_record(self, rec: dict):
+        """Append record dict to the CSV file (create header if not exists)."""
+        with self._lock:
+            write_header = not os.path.exists(self.path)
+            with open(self.path, "a", newline="", encoding="utf-8") as f:
+                writer = csv.DictWriter(f, fieldnames=FIELDNAMES, extrasaction="ignore")
+                if write_header:
+                    writer.writeheader()
+                writer.writerow(rec)
+
+    @timed("storage_write")
+    def write_records(self, recs: list):
+        """Append several records with a single open of the CSV file."""
+        with self._lock:
+            write_header = not os.path.exists(self.path)
+            with open(self.path, "a", newline="", encoding="utf-8") as f:
+                writer = csv.DictWriter(f, fieldnames=FIELDNAMES, extrasaction="ignore")
+                if write_header:
+                    writer.writeheader()
+                writer.writerows(recs)
+
+    @timed("storage_write")
+    def update_record(self, rec: dict):
+        """Rewrite the CSV file with rec replacing the row that has the same id."""
+        with self._lock:
+            rows = [rec if row["id"] == rec["id"] else row for row in self.read_all()]
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", newline="", encoding="utf-8") as f:
+                writer = csv.DictWriter(f, fieldnames=FIELDNAMES, extrasaction="ignore")
+                writer.writeheader()
+                writer.writerows(rows)
+            os.replace(tmp_path, self.path)
+
+    @timed("storage_read")
+    def read_all(self) -> list:
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path, newline="", encoding="utf-8") as f:
+            return list(csv.DictReader(f))
+
+    @timed("storage_read")
+    def get_by_id(self, rec_id: str):
+        for rec in self.read_all():
+            if rec["id"] == rec_id:
+                return rec
+        return None
+
+    def version(self) -> str:
+        if not os.path.exists(self.path):
+            return "0"
+        st = os.stat(self.path)
+        return f"{st.st_mtime_ns}-{st.st_size}"
+
+    def next_id(self) -> str:
+        ids = [int(r["id"]) for r in self.read_all() if str(r.get("id", "")).isdigit()]
+        return str(max(ids, default=0) + 1)
+
+
+class SQLiteStorage(BaseStorage):
+    """
+    SQLite engine (WAL mode). Candidates are keyed by primary key and
+    email/filename are indexed, so single lookups no longer scan the corpus.
+    """
+
+    COLUMNS = FIELDNAMES + ["created_at"]
+
+    def __init__(self, path: str = DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._init_schema()
+
+    def _conn(self) -> sqlite3.Connection:
+        # One connection per thread; Flask serves requests from a thread pool
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = open_sqlite(self.path)
+            self._local.conn = conn
+        return conn
+
+    def _init_schema(self):
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS candidates (
+                    id TEXT PRIMARY KEY,
+                    filename TEXT,
+                    name TEXT,
+                    email TEXT,
+                    phone TEXT,
+                    skills TEXT,
+                    education TEXT,
+                    experience TEXT,
+                    text TEXT,
+                    created_at TEXT
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_candidates_email ON candidates(email)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_candidates_filename ON candidates(filename)")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+    def _row_values(self, rec: dict) -> tuple:
+        return tuple(rec.get(col) or "" for col in self.COLUMNS)
+
+    @timed("storage_write")
+    def write_record(self, rec: dict):
+        placeholders = ", ".join("?" for _ in self.COLUMNS)
+        with self._write_lock, self._conn() as conn:
+            conn.execute(
+                f"INSERT OR REPLACE INTO candidates ({', '.join(self.COLUMNS)}) VALUES ({placeholders})",
+                self._row_values(rec),
+            )
+            self._bump_version(conn)
+
+    @timed("storage_write")
+    def write_records(self, recs: list):
+        """Insert several records in one transaction."""
+        placeholders = ", ".join("?" for _ in self.COLUMNS)
+        with self._write_lock, self._conn() as conn:
+            conn.executemany(
+                f"INSERT OR REPLACE INTO candidates ({', '.join(self.COLUMNS)}) VALUES ({placeholders})",
+                [self._row_values(rec) for rec in recs],
+            )
+            self._bump_version(conn)
+
+    def _bump_version(self, conn):
+        # Runs inside the writing transaction, so readers never see data without its version
+        conn.execute(
+            "INSERT INTO meta (key, value) VALUES ('corpus_version', '1') "
+            "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1"
+        )
+
+    def version(self) -> str:
+        return self.get_meta("corpus_version") or "0"
+
+    @timed("storage_read")
+    def read_all(self) -> list:
+        rows = self._conn().execute(
+            "SELECT * FROM candidates ORDER BY CAST(id AS INTEGER), id"
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    @timed("storage_read")
+    def list_records(self, limit: int = None, offset: int = 0, fields: list = None) -> list:
+        columns = ["id"] + [f for f in fields if f != "id"] if fields is not None else self.COLUMNS
+        unknown = [c for c in columns if c not in self.COLUMNS]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        rows = self._conn().execute(
+            f"SELECT {', '.join(columns)} FROM candidates ORDER BY CAST(id AS INTEGER), id LIMIT ? OFFSET ?",
+            (-1 if limit is None else limit, offset),
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    @timed("storage_read")
+    def get_by_id(self, rec_id: str):
+        row = self._conn().execute("SELECT * FROM candidates WHERE id = ?", (rec_id,)).fetchone()
+        return dict(row) if row else None
+
+    def next_id(self) -> str:
+        row = self._conn().execute(
+            "SELECT COALESCE(MAX(CAST(id AS INTEGER)), 0) + 1 FROM candidates"
+        ).fetchone()
+        return str(row[0])
+
+    def count(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM candidates").fetchone()[0]
+
+    def get_meta(self, key: str):
+        row = self._conn().execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: str):
+        with self._conn() as conn:
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def migrate_from_csv(self, csv_path: str = CSV_PATH, force: bool = False) -> int:
+        """
+        One-shot import of an existing resumes.csv. Runs once per database
+        (tracked in the meta table) unless force=True. Returns rows imported.
+        """
+        if not os.path.exists(csv_path):
+            return 0
+        if not force and self.get_meta("csv_migrated"):
+            return 0
+
+        rows = CSVStorage(csv_path).read_all()
+        placeholders = ", ".join("?" for _ in self.COLUMNS)
+        with self._write_lock, self._conn() as conn:
+            conn.executemany(
+                f"INSERT OR IGNORE INTO candidates ({', '.join(self.COLUMNS)}) VALUES ({placeholders})",
+                [self._row_values(r) for r in rows],
+            )
+            self._bump_version(conn)
+            conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('csv_migrated', ?)",
+                (os.path.abspath(csv_path),),
+            )
+        logger.info("Imported %d candidates from %s", len(rows), csv_path)
+        return len(rows)
+
+
+_storage = None
+_storage_lock = threading.Lock()
+
+
+def get_storage() -> BaseStorage:
+    """Return the process-wide storage engine selected by STORAGE_ENGINE."""
+    global _storage
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                if STORAGE_ENGINE == "csv":
+                    _storage = CSVStorage()
+                elif STORAGE_ENGINE == "sqlite":
+                    engine = SQLiteStorage()
+                    engine.migrate_from_csv()
+                    _storage = engine
+                else:
+                    raise ValueError(f"Unknown STORAGE_ENGINE: {STORAGE_ENGINE}. Use 'sqlite' or 'csv'.")
+    return _storage
+
+
+if __name__ == "__main__":
+    # Re-run the CSV import by hand: python backend/storage.py
+    logging.basicConfig(level=logging.INFO)
+    imported = SQLiteStorage().migrate_from_csv(force=True)
+    print(f"Imported {imported} candidates into {DB_PATH}")
@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+"""
+Benchmark the single-pass segmenter against the per-section extractor.
+
+Checks that segment_resume() returns exactly what the previous
+parse_resume() path produced (three extract_section() calls plus
+basic_contact_extraction()) on a synthetic corpus, then times both.
+
+    python benchmarks/bench_parser.py --resumes 500 --repeat 5
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
+
+from parser import SECTION_HEADERS, extract_section, basic_contact_extraction, segment_resume
+
+HEADERS = [
+    "Skills", "Technical Skills:", "SKILLS & TOOLS", "Education", "Academic Background",
+    "Work Experience", "Experience:", "Projects", "Internships", "Certifications",
+    "Achievements", "Summary", "Profile", "Contact", "Qualifications", "Technical Expertise",
+]
+WORDS = (
+    "python java go kubernetes docker aws azure sql react node.js led built designed "
+    "improved scalable systems team data pipelines machine learning university bachelor "
+    "master degree certified engineer developer analyst"
+).split()
+
+
+def synthetic_resume(rng: random.Random) -> str:
+    lines = [f"{rng.choice(['Jane', 'John', 'Ana', 'Wei'])} {rng.choice(['Doe', 'Smith', 'Li', 'Khan'])}",
+             f"user{rng.randint(1, 9999)}@example.com", f"+1-{rng.randint(100, 999)}-555-{rng.randint(1000, 9999)}", ""]
+    for _ in range(rng.randint(4, 12)):
+        lines.append(rng.choice(HEADERS))
+        for _ in range(rng.randint(0, 12)):
+            lines.append(" ".join(rng.choice(WORDS) for _ in range(rng.randint(0, 14))))
+    return "\n".join(lines)
+
+
+def legacy_sections(text: str) -> dict:
+    contact = basic_contact_extraction(text)
+    result = {key: extract_section(text, names) for key, names in SECTION_HEADERS.items()}
+    result.update(contact)
+    return result
+
+
+def time_it(fn, texts, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in texts:
+            fn(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    cli = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    cli.add_argument("--resumes", type=int, default=500)
+    cli.add_argument("--repeat", type=int, default=5)
+    cli.add_argument("--seed", type=int, default=42)
+    args = cli.parse_args()
+
+    rng = random.Random(args.seed)
+    texts = [synthetic_resume(rng) for _ in range(args.resumes)]
+
+    mismatches = sum(1 for text in texts if legacy_sections(text) != segment_resume(text))
+    if mismatches:
+        print(f"ERROR: segment_resume differs from the legacy path on {mismatches} resumes")
+        sys.exit(1)
+
+    legacy = time_it(legacy_sections, texts, args.repeat)
+    single = time_it(segment_resume, texts, args.repeat)
+    print(f"{args.resumes} resumes, best of {args.repeat}")
+    print(f"  legacy (3x extract_section + contact): {legacy * 1000:8.1f} ms")
+    print(f"  segment_resume (single pass):          {single * 1000:8.1f} ms")
+    print(f"  speedup: {legacy / single:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
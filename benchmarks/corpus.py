@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+"""
+Generate a synthetic resume corpus as TXT, DOCX and PDF files.
+
+Resumes are deterministic for a given seed, so two benchmark runs over the
+same --count and --seed parse exactly the same documents.
+
+    python benchmarks/corpus.py --out /tmp/corpus --count 200 --formats txt,docx,pdf
+"""
+import os
+import random
+import argparse
+
+FORMATS = ("txt", "docx", "pdf")
+
+FIRST_NAMES = ["Jane", "John", "Ana", "Wei", "Priya", "Omar", "Lena", "Diego", "Aiko", "Samuel"]
+LAST_NAMES = ["Doe", "Smith", "Li", "Khan", "Garcia", "Okafor", "Novak", "Tanaka", "Rossi", "Brown"]
+SKILLS = [
+    "Python", "Java", "Go", "Rust", "C++", "TypeScript", "React", "Node.js", "Django", "Flask",
+    "Kubernetes", "Docker", "Terraform", "AWS", "Azure", "GCP", "PostgreSQL", "MongoDB", "Redis",
+    "Kafka", "Spark", "Airflow", "PyTorch", "TensorFlow", "scikit-learn", "Pandas", "SQL", "CI/CD",
+]
+TITLES = ["Software Engineer", "Data Scientist", "Backend Developer", "DevOps Engineer",
+          "ML Engineer", "Product Manager", "Data Engineer", "Frontend Developer"]
+COMPANIES = ["XYZ Corp", "ABC Inc.", "DEF Ltd.", "Initech", "Globex", "Umbrella Labs", "Acme Cloud"]
+DEGREES = ["Bachelor of Science in Computer Science", "Master of Science in Data Science",
+           "Bachelor of Engineering in Information Technology", "Diploma in Software Engineering"]
+WORDS = (
+    "led built designed improved scalable systems team data pipelines reduced latency migrated "
+    "services automated deployments mentored engineers delivered features customers reliability "
+    "monitoring analytics platform architecture performance cost"
+).split()
+
+
+def synthetic_resume(rng: random.Random) -> str:
+    """One plain-text resume with contact details and the usual sections."""
+    name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+    lines = [
+        name,
+        f"{name.lower().replace(' ', '.')}{rng.randint(1, 999)}@example.com",
+        f"+1-{rng.randint(200, 999)}-555-{rng.randint(1000, 9999)}",
+        "",
+        "Summary",
+        " ".join(rng.choice(WORDS) for _ in range(rng.randint(15, 35))),
+        "",
+        "Skills",
+    ]
+    for skill in rng.sample(SKILLS, rng.randint(5, 12)):
+        lines.append(f"{skill} - {' '.join(rng.choice(WORDS) for _ in range(rng.randint(3, 10)))}")
+    lines += ["", "Work Experience"]
+    for _ in range(rng.randint(1, 4)):
+        start = rng.randint(2008, 2020)
+        lines.append(f"{rng.choice(TITLES)} at {rng.choice(COMPANIES)} ({start}-{start + rng.randint(1, 5)})")
+        for _ in range(rng.randint(1, 4)):
+            lines.append(" ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 20))))
+    lines += ["", "Education"]
+    for _ in range(rng.randint(1, 2)):
+        start = rng.randint(2000, 2016)
+        lines.append(f"{rng.choice(DEGREES)} ({start}-{start + 4})")
+    lines += ["", "Certifications", f"AWS Certified {rng.choice(['Developer', 'Solutions Architect'])}"]
+    return "\n".join(lines) + "\n"
+
+
+def write_txt(path: str, text: str):
+    with open(path, "w", encoding="utf-8") as fh:
+        fh.write(text)
+
+
+def write_docx(path: str, text: str):
+    from docx import Document
+    doc = Document()
+    for line in text.splitlines():
+        doc.add_paragraph(line)
+    doc.save(path)
+
+
+def _pdf_escape(line: str) -> str:
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_pdf(path: str, text: str, lines_per_page: int = 60):
+    """
+    Minimal text-only PDF (Helvetica, one text object per page) written by hand,
+    so generating a corpus needs no PDF library. pdfminer extracts it line by line.
+    """
+    lines = [line.encode("latin-1", "replace").decode("latin-1") for line in text.splitlines()]
+    pages = [lines[i:i + lines_per_page] for i in range(0, len(lines), lines_per_page)] or [[]]
+
+    # Object ids: 1 catalog, 2 page tree, 3 font, then a (page, content) pair per page
+    objects = {}
+    page_ids = []
+    for n, page_lines in enumerate(pages):
+        page_id, content_id = 4 + 2 * n, 5 + 2 * n
+        page_ids.append(page_id)
+        body = ["BT", "/F1 10 Tf", "12 TL", "72 770 Td"]
+        body += [f"({_pdf_escape(line)}) Tj T*" for line in page_lines]
+        body.append("ET")
+        stream = "\n".join(body).encode("latin-1")
+        objects[content_id] = b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream"
+        objects[page_id] = (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_id} 0 R >>"
+        ).encode("latin-1")
+    objects[1] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    kids = " ".join(f"{pid} 0 R" for pid in page_ids)
+    objects[2] = f"<< /Type /Pages /Kids [{kids}] /Count {len(page_ids)} >>".encode("latin-1")
+    objects[3] = b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>"
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = {}
+    for obj_id in sorted(objects):
+        offsets[obj_id] = len(out)
+        out += b"%d 0 obj\n" % obj_id + objects[obj_id] + b"\nendobj\n"
+    xref_at = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for obj_id in sorted(objects):
+        out += b"%010d 00000 n \n" % offsets[obj_id]
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref_at)
+    with open(path, "wb") as fh:
+        fh.write(bytes(out))
+
+
+WRITERS = {"txt": write_txt, "docx": write_docx, "pdf": write_pdf}
+
+
+def generate_corpus(out_dir: str, count: int, formats=FORMATS, seed: int = 42) -> list:
+    """
+    Write count resumes per format into out_dir. Returns a list of
+    (path, ext) tuples, ready for parse_resume(path, ext).
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    rng = random.Random(seed)
+    texts = [synthetic_resume(rng) for _ in range(count)]
+    files = []
+    for ext in formats:
+        if ext not in WRITERS:
+            raise ValueError(f"Unsupported format: {ext}. Choose from {', '.join(FORMATS)}")
+        for i, text in enumerate(texts):
+            path = os.path.join(out_dir, f"resume_{i:05d}.{ext}")
+            WRITERS[ext](path, text)
+            files.append((path, ext))
+    return files
+
+
+def main():
+    cli = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    cli.add_argument("--out", required=True, help="Directory to write the corpus into")
+    cli.add_argument("--count", type=int, default=100, help="Resumes per format")
+    cli.add_argument("--formats", default=",".join(FORMATS))
+    cli.add_argument("--seed", type=int, default=42)
+    args = cli.parse_args()
+
+    files = generate_corpus(args.out, args.count, args.formats.split(","), args.seed)
+    print(f"Wrote {len(files)} resumes to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+#!/usr/bin/env python
+"""
+Load-test /match against the mock LLM server across concurrency levels and corpus sizes.
+
+Starts benchmarks/mock_llm.py and the backend in-process on free ports, seeds a
+throwaway database with synthetic candidates, then fires --requests /match calls
+at each concurrency level. Reports throughput and p50/p95/p99 latency, and saves
+a JSON report (benchmarks/results/load-<timestamp>.json by default).
+
+    python benchmarks/load_match.py --sizes 50,200 --concurrency 1,4,16 --requests 32 --latency-ms 300
+    python benchmarks/load_match.py --llm-url http://127.0.0.1:8090/v1/chat/completions
+    python benchmarks/load_match.py --latency-ms 300 --latency-dist lognormal --error-rate 0.2 --fallback-latency-ms 400
+"""
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import logging
+import tempfile
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(BENCH_DIR), "backend"))
+sys.path.insert(0, BENCH_DIR)
+
+from mock_llm import MockLLMServer, MockConfig, add_config_arguments, config_from_args
+from run_benchmarks import DEFAULT_RESULTS_DIR, percentile, synthetic_records, git_commit
+
+JOB_DESCRIPTION = (
+    "Senior backend engineer with Python, Flask and PostgreSQL experience. "
+    "Kubernetes, Docker and AWS in production; Kafka or Spark a plus. "
+    "Must have built scalable services and CI/CD pipelines."
+)
+
+
+def start_backend():
+    """Serve the Flask app on a free local port. Returns (server, base_url)."""
+    from werkzeug.serving import make_server
+    import app as backend
+
+    server = make_server("127.0.0.1", 0, backend.app, threaded=True)
+    threading.Thread(target=server.serve_forever, name="backend", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.port}"
+
+
+def seed_corpus(size: int, seed: int):
+    """Top the candidate store up to size records."""
+    from storage import get_storage
+
+    storage = get_storage()
+    missing = size - storage.count()
+    if missing > 0:
+        storage.add_records(synthetic_records(missing, seed + size))
+
+
+def mock_stats(llm_url: str) -> dict:
+    try:
+        return requests.get(llm_url.split("/v1/")[0].split("/openai/")[0] + "/stats", timeout=5).json()
+    except (requests.RequestException, ValueError):
+        return {}
+
+
+def run_level(base_url: str, size: int, concurrency: int, n_requests: int, body: dict) -> dict:
+    def one(i: int):
+        payload = dict(body, job_description=f"{JOB_DESCRIPTION} (load run {size}/{concurrency}/{i})")
+        start = time.perf_counter()
+        try:
+            response = requests.post(f"{base_url}/match", json=payload, timeout=600)
+            elapsed = time.perf_counter() - start
+            if response.status_code != 200:
+                return elapsed, False, 0, 0
+            results = response.json()["data"]["results"]
+            return (elapsed, True, sum(1 for r in results if "error" in r),
+                    sum(1 for r in results if r.get("parse_error")))
+        except requests.RequestException:
+            return time.perf_counter() - start, False, 0, 0
+
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="load") as pool:
+        outcomes = list(pool.map(one, range(n_requests)))
+    wall = time.perf_counter() - wall_start
+
+    latencies = sorted(outcome[0] for outcome in outcomes)
+    return {
+        "size": size,
+        "concurrency": concurrency,
+        "requests": n_requests,
+        "failed_requests": sum(1 for outcome in outcomes if not outcome[1]),
+        "candidate_errors": sum(outcome[2] for outcome in outcomes),
+        "parse_errors": sum(outcome[3] for outcome in outcomes),
+        "wall_s": round(wall, 3),
+        "throughput_rps": round(n_requests / wall, 3) if wall else 0.0,
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+    }
+
+
+def main():
+    cli = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    cli.add_argument("--sizes", default="50", help="Comma-separated corpus sizes")
+    cli.add_argument("--concurrency", default="1,4,16", help="Comma-separated concurrent /match clients")
+    cli.add_argument("--requests", type=int, default=16, help="/match requests per level")
+    cli.add_argument("--top-k", type=int, default=0, help="Prefilter top_k per request (0 = score every candidate)")
+    cli.add_argument("--batch-size", type=int, default=None, help="Candidates per prompt (default MATCH_BATCH_SIZE)")
+    cli.add_argument("--workers", type=int, default=None, help="Scoring threads per request (default MATCH_WORKERS)")
+    cli.add_argument("--score-cache", action="store_true", help="Keep the score cache on (off by default)")
+    cli.add_argument("--mode", choices=("full", "rank"), default=None,
+                     help="/match scoring mode (default MATCH_MODE); rank asks for scores only")
+    cli.add_argument("--explain-top", type=int, default=None, help="Rows a rank-mode /match explains")
+    cli.add_argument("--llm-url", help="Use an already running LLM endpoint instead of starting the mock")
+    cli.add_argument("--fallback-latency-ms", type=float, default=None,
+                     help="Also start a fault-free second mock backend with this latency (LLM router failover and hedging)")
+    cli.add_argument("--output", help="Report path (default: benchmarks/results/load-<timestamp>.json)")
+    add_config_arguments(cli)
+    args = cli.parse_args()
+
+    # The access log of two local servers would drown the report
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+
+    sizes = sorted(int(s) for s in args.sizes.split(",") if s)
+    levels = [int(c) for c in args.concurrency.split(",") if c]
+
+    mock = None
+    fallback = None
+    llm_url = args.llm_url
+    if not llm_url:
+        mock = MockLLMServer(config_from_args(args)).start()
+        llm_url = mock.url
+    if args.fallback_latency_ms is not None:
+        fallback = MockLLMServer(MockConfig(latency_ms=args.fallback_latency_ms, seed=args.seed)).start()
+        os.environ["LLM_BACKENDS"] = json.dumps([
+            {"name": "primary", "url": llm_url, "model": os.getenv("LLM_MODEL", "mock"), "api_key": "mock-key"},
+            {"name": "fallback", "url": fallback.url, "model": os.getenv("LLM_MODEL", "mock"), "api_key": "mock-key"},
+        ])
+
+    work_dir = tempfile.mkdtemp(prefix="resume-load-")
+    # Must be in place before the backend modules read their configuration on import
+    os.environ.update({
+        "LLM_API_URL": llm_url,
+        "LLM_API_KEY": os.getenv("LLM_API_KEY", "mock-key"),
+        "STORAGE_ENGINE": "sqlite",
+        "STORAGE_DB_PATH": os.path.join(work_dir, "resumes.db"),
+        "SCORE_CACHE_PATH": os.path.join(work_dir, "score_cache.db"),
+        "SCORE_CACHE_ENABLED": "1" if args.score_cache else "0",
+        "UPLOAD_FOLDER": os.path.join(work_dir, "uploads"),
+        "LOG_LEVEL": os.getenv("LOG_LEVEL", "WARNING"),
+    })
+    server, base_url = start_backend()
+
+    body = {"min_score": 0.0, "top_k": args.top_k}
+    if args.batch_size is not None:
+        body["batch_size"] = args.batch_size
+    if args.workers is not None:
+        body["concurrency"] = args.workers
+    if args.mode is not None:
+        body["mode"] = args.mode
+    if args.explain_top is not None:
+        body["explain_top"] = args.explain_top
+
+    print(f"{'size':>6} {'clients':>8} {'reqs':>6} {'fail':>5} {'rps':>8} {'p50':>9} {'p95':>9} {'p99':>9}")
+    results = []
+    try:
+        for size in sizes:
+            seed_corpus(size, args.seed or 0)
+            for concurrency in levels:
+                before = mock_stats(llm_url)
+                fallback_before = mock_stats(fallback.url) if fallback else {}
+                row = run_level(base_url, size, concurrency, args.requests, body)
+                after = mock_stats(llm_url)
+                row["llm"] = {key: after.get(key, 0) - before.get(key, 0) for key in after}
+                if fallback:
+                    fallback_after = mock_stats(fallback.url)
+                    row["llm_fallback"] = {key: fallback_after.get(key, 0) - fallback_before.get(key, 0)
+                                           for key in fallback_after}
+                results.append(row)
+                print(f"{size:>6} {concurrency:>8} {row['requests']:>6} {row['failed_requests']:>5} "
+                      f"{row['throughput_rps']:>8.2f} {row['p50_ms']:>7.0f}ms {row['p95_ms']:>7.0f}ms "
+                      f"{row['p99_ms']:>7.0f}ms")
+    finally:
+        server.shutdown()
+        if mock:
+            mock.stop()
+        if fallback:
+            fallback.stop()
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "llm_url": llm_url if args.llm_url else "mock",
+            "mock": None if args.llm_url else {
+                key: getattr(args, key) for key in (
+                    "latency_ms", "latency_dist", "jitter_ms", "per_token_ms", "error_rate",
+                    "rate_limit_rate", "retry_after", "max_rpm", "malformed_rate", "fenced_rate",
+                    "reject_json_mode", "seed",
+                )
+            },
+            "fallback_latency_ms": args.fallback_latency_ms,
+            "request_body": body,
+            "score_cache": args.score_cache,
+            "env": {key: os.getenv(key) for key in ("MATCH_WORKERS", "MATCH_BATCH_SIZE", "MATCH_MODE", "LLM_MAX_CONCURRENCY", "LLM_SCHEDULER_SLOTS", "LLM_HEDGE_ENABLED")},
+        },
+        "results": results,
+    }
+    output = args.output or os.path.join(DEFAULT_RESULTS_DIR, f"load-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as fh:
+        json.dump(report, fh, indent=2)
+    print(f"\nSaved report to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,301 @@
+#!/usr/bin/env python
+"""
+Local OpenAI-compatible chat-completions server for offline /match testing.
+
+Answers the single-candidate and batched scoring prompts from llm_client with
+deterministic JSON scores, after a configurable latency. It can inject 5xx
+errors, 429 rate limiting (with Retry-After), code-fenced and malformed output,
+and reject JSON mode like a provider without response_format support.
+
+    python benchmarks/mock_llm.py --port 8090 --latency-ms 400 --latency-dist lognormal --rate-limit-rate 0.05
+    LLM_API_URL=http://127.0.0.1:8090/v1/chat/completions LLM_API_KEY=mock python backend/app.py
+"""
+import re
+import json
+import math
+import time
+import random
+import hashlib
+import argparse
+import threading
+from collections import Counter, deque
+from flask import Flask, jsonify, request
+from werkzeug.serving import make_server
+
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "normal", "lognormal", "exponential")
+
+JOB_RE = re.compile(r"Job Description:\n(.*?)(?:\n\nCandidate ID:|\n\nCandidate Skills Section:|\Z)", re.S)
+CANDIDATE_RE = re.compile(r"Candidate ID: (\S+)\nCandidate Skills Section:\n(.*?)(?=\n\nCandidate ID: |\Z)", re.S)
+SINGLE_RE = re.compile(r"Candidate Skills Section:\n(.*)\Z", re.S)
+WORD_RE = re.compile(r"[a-z0-9][a-z0-9+#.]*")
+DIGEST_MARKER = "requirements digest"
+SCORE_ONLY_MARKER = "Do not explain"
+FILLER_WORDS = frozenset("""
+and the with for our you your are will have has who must plus including experience years team
+strong knowledge ability work working using build built in of to on as a an or be is we
+""".split())
+
+
+class MockConfig:
+    """Behaviour knobs; every rate is a probability per request."""
+
+    def __init__(self, latency_ms: float = 200.0, latency_dist: str = "fixed", jitter_ms: float = 50.0,
+                 per_token_ms: float = 0.0, error_rate: float = 0.0, rate_limit_rate: float = 0.0,
+                 retry_after: float = 1.0, max_rpm: int = 0, malformed_rate: float = 0.0,
+                 fenced_rate: float = 0.0, reject_json_mode: bool = False, seed: int = None):
+        if latency_dist not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"Unknown latency distribution: {latency_dist}. Choose from {', '.join(LATENCY_DISTRIBUTIONS)}")
+        self.latency_ms = latency_ms
+        self.latency_dist = latency_dist
+        self.jitter_ms = jitter_ms
+        self.per_token_ms = per_token_ms
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.max_rpm = max_rpm
+        self.malformed_rate = malformed_rate
+        self.fenced_rate = fenced_rate
+        self.reject_json_mode = reject_json_mode
+        self.rng = random.Random(seed)
+        self.rng_lock = threading.Lock()
+
+    def sample_latency(self) -> float:
+        """One response delay in seconds drawn from the configured distribution."""
+        mean, spread = self.latency_ms, self.jitter_ms
+        with self.rng_lock:
+            if self.latency_dist == "uniform":
+                ms = self.rng.uniform(mean - spread, mean + spread)
+            elif self.latency_dist == "normal":
+                ms = self.rng.gauss(mean, spread)
+            elif self.latency_dist == "lognormal":
+                # Parameterised so the median is latency_ms and jitter_ms sets the spread
+                sigma = math.log1p(spread / mean) if mean > 0 else 0.0
+                ms = mean * math.exp(self.rng.gauss(0.0, sigma))
+            elif self.latency_dist == "exponential":
+                ms = self.rng.expovariate(1.0 / mean) if mean > 0 else 0.0
+            else:
+                ms = mean
+        return max(0.0, ms) / 1000.0
+
+    def roll(self, rate: float) -> bool:
+        if rate <= 0:
+            return False
+        with self.rng_lock:
+            return self.rng.random() < rate
+
+
+def deterministic_score(job_desc: str, skills_text: str) -> float:
+    """
+    Same inputs, same score: mostly the share of job-description terms found in
+    the candidate text, plus a small hash-based spread so ties are rare.
+    """
+    job_terms = {w for w in WORD_RE.findall(job_desc.lower()) if len(w) > 2}
+    cand_terms = set(WORD_RE.findall(skills_text.lower()))
+    overlap = len(job_terms & cand_terms) / len(job_terms) if job_terms else 0.0
+    digest = hashlib.sha256(f"{job_desc}\x00{skills_text}".encode("utf-8")).digest()
+    jitter = int.from_bytes(digest[:4], "big") / 0xFFFFFFFF
+    return round(min(1.0, 0.7 * overlap + 0.3 * jitter), 2)
+
+
+def score_entry(job_desc: str, skills_text: str) -> dict:
+    score = deterministic_score(job_desc, skills_text)
+    job_terms = {w for w in WORD_RE.findall(job_desc.lower()) if len(w) > 2}
+    matches = sorted(job_terms & set(WORD_RE.findall(skills_text.lower())))[:5]
+    return {
+        "score": score,
+        "justification": f"Mock score from {len(matches)} overlapping terms",
+        "matches": matches,
+        "recommendation": "Interview" if score >= 0.6 else "Hold" if score >= 0.3 else "Reject",
+    }
+
+
+def digest_entry(job_desc: str) -> dict:
+    """Requirements digest for the job-description digest prompt (see backend/jd_digest.py)."""
+    terms = []
+    for word in WORD_RE.findall(job_desc.lower()):
+        word = word.rstrip(".")
+        if len(word) > 2 and word not in FILLER_WORDS and word not in terms:
+            terms.append(word)
+    years = re.search(r"(\d+)\+?\s*years", job_desc)
+    return {
+        "title": job_desc.strip().splitlines()[0][:60] if job_desc.strip() else "",
+        "must_have": terms[:12],
+        "nice_to_have": terms[12:20],
+        "min_years": int(years.group(1)) if years else None,
+        "responsibilities": [],
+    }
+
+
+def answer(prompt: str) -> str:
+    """
+    Completion text for a prompt: a scoring object, an array for batched prompts,
+    or a JD digest. Score-only (ranking) prompts get the score alone.
+    """
+    job_match = JOB_RE.search(prompt)
+    job_desc = job_match.group(1).strip() if job_match else prompt
+    if DIGEST_MARKER in prompt:
+        return json.dumps(digest_entry(job_desc))
+
+    def entry(text: str) -> dict:
+        if SCORE_ONLY_MARKER in prompt:
+            return {"score": deterministic_score(job_desc, text)}
+        return score_entry(job_desc, text)
+
+    candidates = CANDIDATE_RE.findall(prompt)
+    if candidates:
+        return json.dumps({"results": [dict(id=cid, **entry(text)) for cid, text in candidates]})
+    single = SINGLE_RE.search(prompt)
+    return json.dumps(entry(single.group(1) if single else prompt))
+
+
+def create_app(config: MockConfig) -> Flask:
+    app = Flask(__name__)
+    stats = Counter()
+    stats_lock = threading.Lock()
+    recent = deque()
+
+    def count(key: str):
+        with stats_lock:
+            stats[key] += 1
+
+    def over_rpm() -> bool:
+        if config.max_rpm <= 0:
+            return False
+        now = time.monotonic()
+        with stats_lock:
+            while recent and now - recent[0] > 60:
+                recent.popleft()
+            if len(recent) >= config.max_rpm:
+                return True
+            recent.append(now)
+        return False
+
+    def rate_limited():
+        count("rate_limited")
+        response = jsonify({"error": {"message": "Rate limit reached", "type": "rate_limit_exceeded"}})
+        response.headers["Retry-After"] = f"{config.retry_after:g}"
+        return response, 429
+
+    @app.route("/v1/chat/completions", methods=["POST"])
+    @app.route("/openai/v1/chat/completions", methods=["POST"])
+    def chat_completions():
+        count("requests")
+        body = request.get_json(silent=True) or {}
+        messages = body.get("messages") or []
+        if not messages:
+            count("bad_requests")
+            return jsonify({"error": {"message": "messages is required", "type": "invalid_request_error"}}), 400
+
+        if body.get("response_format"):
+            count("json_mode")
+            if config.reject_json_mode:
+                count("bad_requests")
+                return jsonify({"error": {"message": "response_format is not supported", "type": "invalid_request_error"}}), 400
+
+        if over_rpm() or config.roll(config.rate_limit_rate):
+            return rate_limited()
+
+        # Scoring prompts keep instructions and job text in the system message, candidates in the user message.
+        # Turns from the first assistant message on are a repair request for the same prompt.
+        turns = []
+        for m in messages:
+            if m.get("role") == "assistant":
+                count("repairs")
+                break
+            turns.append(m.get("content", ""))
+        prompt = "\n\n".join(turns)
+        content = answer(prompt)
+        completion_tokens = len(content) // 4 + 1
+        time.sleep(config.sample_latency() + completion_tokens * config.per_token_ms / 1000.0)
+
+        if config.roll(config.error_rate):
+            count("errors")
+            return jsonify({"error": {"message": "Injected server error", "type": "server_error"}}), 500
+        if config.roll(config.malformed_rate):
+            count("malformed")
+            content = "Sure! Here is my evaluation: " + content[: len(content) // 2]
+        elif config.roll(config.fenced_rate):
+            count("fenced")
+            content = f"Here is the evaluation:\n```json\n{content}\n```\nLet me know if you need more detail."
+
+        count("completed")
+        prompt_tokens = sum(len(m.get("content", "")) for m in messages) // 4 + 1
+        return jsonify({
+            "id": f"chatcmpl-mock-{hashlib.md5(prompt.encode('utf-8')).hexdigest()[:12]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "mock"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens},
+        })
+
+    @app.route("/stats")
+    def mock_stats():
+        with stats_lock:
+            return jsonify(dict(stats))
+
+    return app
+
+
+class MockLLMServer:
+    """Threaded mock server that can run in the background of a load test."""
+
+    def __init__(self, config: MockConfig, host: str = "127.0.0.1", port: int = 0):
+        self.server = make_server(host, port, create_app(config), threaded=True)
+        self.thread = threading.Thread(target=self.server.serve_forever, name="mock-llm", daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.server.host}:{self.server.port}/v1/chat/completions"
+
+    def start(self) -> "MockLLMServer":
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+
+
+def add_config_arguments(cli: argparse.ArgumentParser):
+    cli.add_argument("--latency-ms", type=float, default=200.0, help="Mean (median for lognormal) response latency")
+    cli.add_argument("--latency-dist", choices=LATENCY_DISTRIBUTIONS, default="fixed")
+    cli.add_argument("--jitter-ms", type=float, default=50.0, help="Spread: +/- for uniform, stddev for normal")
+    cli.add_argument("--per-token-ms", type=float, default=0.0, help="Extra latency per completion token")
+    cli.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with HTTP 500")
+    cli.add_argument("--rate-limit-rate", type=float, default=0.0, help="Share of requests answered with HTTP 429")
+    cli.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds sent with 429s")
+    cli.add_argument("--max-rpm", type=int, default=0, help="Answer 429 beyond this many requests per minute")
+    cli.add_argument("--malformed-rate", type=float, default=0.0, help="Share of completions that are not valid JSON")
+    cli.add_argument("--fenced-rate", type=float, default=0.0,
+                     help="Share of completions wrapped in a code fence and prose (recoverable)")
+    cli.add_argument("--reject-json-mode", action="store_true", help="Answer 400 to requests using response_format")
+    cli.add_argument("--seed", type=int, default=None)
+
+
+def config_from_args(args) -> MockConfig:
+    return MockConfig(
+        latency_ms=args.latency_ms, latency_dist=args.latency_dist, jitter_ms=args.jitter_ms,
+        per_token_ms=args.per_token_ms, error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate,
+        retry_after=args.retry_after, max_rpm=args.max_rpm, malformed_rate=args.malformed_rate,
+        fenced_rate=args.fenced_rate, reject_json_mode=args.reject_json_mode, seed=args.seed,
+    )
+
+
+def main():
+    cli = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    cli.add_argument("--host", default="127.0.0.1")
+    cli.add_argument("--port", type=int, default=8090)
+    add_config_arguments(cli)
+    args = cli.parse_args()
+
+    server = MockLLMServer(config_from_args(args), args.host, args.port)
+    print(f"Mock LLM listening on {server.url} (request counters at /stats)")
+    try:
+        server.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
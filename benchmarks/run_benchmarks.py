@@ -0,0 +1,297 @@
+#!/usr/bin/env python
+"""
+Time the parser, storage engines and end-to-end /upload on a synthetic corpus.
+
+Every run writes a JSON report (benchmarks/results/bench-<timestamp>.json by
+default); pass an earlier report to --compare to print the change per benchmark.
+The backend runs against a throwaway database and upload folder, so the
+project's resumes.db and backend/uploads are never touched.
+
+    python benchmarks/run_benchmarks.py --sizes 50,200 --formats txt,docx,pdf --repeat 3
+    python benchmarks/run_benchmarks.py --compare benchmarks/results/bench-20250115-103000.json
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import platform
+import argparse
+import tempfile
+import subprocess
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, os.path.join(PROJECT_ROOT, "backend"))
+sys.path.insert(0, BENCH_DIR)
+
+from corpus import FORMATS, generate_corpus
+
+DEFAULT_RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+UPLOAD_JOB_TIMEOUT = 300
+
+
+def percentile(sorted_samples: list, pct: float) -> float:
+    if not sorted_samples:
+        return 0.0
+    idx = min(len(sorted_samples) - 1, max(0, int(round(pct / 100 * len(sorted_samples))) - 1))
+    return sorted_samples[idx]
+
+
+def summarize(benchmark: str, size: int, variant: str, samples: list) -> dict:
+    """Latency summary of per-operation samples (seconds) as one result row."""
+    ordered = sorted(samples)
+    total = sum(ordered)
+    return {
+        "benchmark": benchmark,
+        "size": size,
+        "variant": variant,
+        "n": len(ordered),
+        "mean_ms": round(total / len(ordered) * 1000, 4) if ordered else 0.0,
+        "p50_ms": round(percentile(ordered, 50) * 1000, 4),
+        "p95_ms": round(percentile(ordered, 95) * 1000, 4),
+        "min_ms": round(ordered[0] * 1000, 4) if ordered else 0.0,
+        "max_ms": round(ordered[-1] * 1000, 4) if ordered else 0.0,
+        "total_s": round(total, 4),
+        "ops_per_s": round(len(ordered) / total, 2) if total else 0.0,
+    }
+
+
+def timed_call(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def bench_parser(files: list, size: int, repeat: int) -> list:
+    from parser import parse_resume, extract_section, segment_resume, SECTION_HEADERS
+
+    results = []
+    texts = []
+    for ext in sorted({ext for _, ext in files}):
+        samples = []
+        for _ in range(repeat):
+            for path, file_ext in files:
+                if file_ext == ext:
+                    parsed, elapsed = timed_call(parse_resume, path, ext)
+                    samples.append(elapsed)
+                    if ext == "txt" and len(texts) < size:
+                        texts.append(parsed["text"])
+        results.append(summarize("parse_resume", size, ext, samples))
+
+    if not texts:
+        texts = [parse_resume(path, ext)["text"] for path, ext in files[:size]]
+
+    section_samples, segment_samples = [], []
+    for _ in range(repeat):
+        for text in texts:
+            start = time.perf_counter()
+            for names in SECTION_HEADERS.values():
+                extract_section(text, names)
+            section_samples.append(time.perf_counter() - start)
+            segment_samples.append(timed_call(segment_resume, text)[1])
+    results.append(summarize("extract_section", size, "all_sections", section_samples))
+    results.append(summarize("segment_resume", size, "single_pass", segment_samples))
+    return results
+
+
+def synthetic_records(size: int, seed: int) -> list:
+    from corpus import synthetic_resume
+    from parser import segment_resume
+    from ingest import build_record
+
+    rng = random.Random(seed)
+    recs = []
+    for i in range(size):
+        text = synthetic_resume(rng)
+        # Built the way ingestion builds them, so field formats match production records
+        recs.append(build_record(dict(segment_resume(text), text=text), f"resume_{i:05d}.txt"))
+    return recs
+
+
+def bench_storage(work_dir: str, size: int, repeat: int, seed: int) -> list:
+    from storage import CSVStorage, SQLiteStorage
+
+    engines = {
+        "sqlite": lambda n: SQLiteStorage(os.path.join(work_dir, f"bench_{size}_{n}.db")),
+        "csv": lambda n: CSVStorage(os.path.join(work_dir, f"bench_{size}_{n}.csv")),
+    }
+    results = []
+    for engine, make in engines.items():
+        samples = {"add_record": [], "add_records": [], "read_all": [], "get_by_id": [], "list_records": []}
+        for n in range(repeat):
+            rng = random.Random(seed + n)
+            recs = synthetic_records(size, seed + n)
+
+            store = make(f"single_{n}")
+            for rec in recs:
+                samples["add_record"].append(timed_call(store.add_record, dict(rec))[1])
+
+            batch_store = make(f"batch_{n}")
+            samples["add_records"].append(timed_call(batch_store.add_records, [dict(rec) for rec in recs])[1])
+
+            samples["read_all"].append(timed_call(store.read_all)[1])
+            for _ in range(min(size, 200)):
+                samples["get_by_id"].append(timed_call(store.get_by_id, str(rng.randint(1, size)))[1])
+            for offset in range(0, size, 100):
+                samples["list_records"].append(timed_call(store.list_records, 100, offset, ["id", "name", "email"])[1])
+
+        for op, op_samples in samples.items():
+            results.append(summarize(f"storage.{op}", size, engine, op_samples))
+    return results
+
+
+def bench_upload(files: list, size: int, repeat: int) -> list:
+    """
+    POST every file to /upload through Flask's test client, then wait for the
+    ingest workers. The first pass measures new uploads; later passes send the
+    same bytes again and measure the duplicate fast path.
+    """
+    import app as backend
+
+    client = backend.app.test_client()
+    results = []
+    for ext in sorted({ext for _, ext in files}):
+        paths = [path for path, file_ext in files if file_ext == ext]
+        new_samples, dup_samples = [], []
+        for n in range(repeat):
+            job_ids = []
+            batch_start = time.perf_counter()
+            for path in paths:
+                with open(path, "rb") as fh:
+                    payload = {"resume": (fh, os.path.basename(path))}
+                    start = time.perf_counter()
+                    response = client.post("/upload", data=payload, content_type="multipart/form-data")
+                    elapsed = time.perf_counter() - start
+                body = response.get_json()
+                if response.status_code == 202:
+                    job_ids.append(body["data"]["job_id"])
+                    new_samples.append(elapsed)
+                elif response.status_code == 200:
+                    dup_samples.append(elapsed)
+                else:
+                    raise RuntimeError(f"/upload failed for {path}: {body}")
+
+            pending = set(job_ids)
+            deadline = time.monotonic() + UPLOAD_JOB_TIMEOUT
+            while pending and time.monotonic() < deadline:
+                for job_id in list(pending):
+                    if backend.ingest_queue.jobs.get(job_id)["status"] in ("done", "failed"):
+                        pending.discard(job_id)
+                time.sleep(0.01)
+            if pending:
+                raise RuntimeError(f"{len(pending)} ingest jobs did not finish in {UPLOAD_JOB_TIMEOUT}s")
+            if job_ids:
+                row = summarize("upload.end_to_end", size, ext, [time.perf_counter() - batch_start])
+                row["files"] = len(job_ids)
+                row["files_per_s"] = round(len(job_ids) / row["total_s"], 2) if row["total_s"] else 0.0
+                results.append(row)
+
+        if new_samples:
+            results.append(summarize("upload.request", size, ext, new_samples))
+        if dup_samples:
+            results.append(summarize("upload.duplicate_request", size, ext, dup_samples))
+    return results
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def compare(report: dict, baseline_path: str):
+    with open(baseline_path, encoding="utf-8") as fh:
+        baseline = json.load(fh)
+    previous = {(r["benchmark"], r["size"], r["variant"]): r for r in baseline["results"]}
+    print(f"\nComparison with {baseline_path} ({baseline['meta'].get('git_commit') or 'unknown commit'})")
+    print(f"{'benchmark':<28} {'size':>6} {'variant':<14} {'p50 before':>11} {'p50 now':>10} {'change':>8}")
+    for row in report["results"]:
+        old = previous.get((row["benchmark"], row["size"], row["variant"]))
+        if old is None or not old["p50_ms"]:
+            continue
+        change = (row["p50_ms"] - old["p50_ms"]) / old["p50_ms"] * 100
+        print(f"{row['benchmark']:<28} {row['size']:>6} {row['variant']:<14} "
+              f"{old['p50_ms']:>9.3f}ms {row['p50_ms']:>8.3f}ms {change:>+7.1f}%")
+
+
+def main():
+    cli = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    cli.add_argument("--sizes", default="50", help="Comma-separated corpus sizes (resumes per format)")
+    cli.add_argument("--formats", default=",".join(FORMATS))
+    cli.add_argument("--repeat", type=int, default=3)
+    cli.add_argument("--seed", type=int, default=42)
+    cli.add_argument("--skip", default="", help="Comma-separated suites to skip: parser,storage,upload")
+    cli.add_argument("--output", help="Report path (default: benchmarks/results/bench-<timestamp>.json)")
+    cli.add_argument("--compare", help="Earlier report to compare this run against")
+    cli.add_argument("--keep-corpus", action="store_true", help="Leave the generated files in the work dir")
+    args = cli.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    formats = [f for f in args.formats.split(",") if f]
+    skip = set(filter(None, args.skip.split(",")))
+
+    work_dir = tempfile.mkdtemp(prefix="resume-bench-")
+    # Point the backend at throwaway state before any backend module is imported by a suite
+    os.environ.update({
+        "STORAGE_ENGINE": "sqlite",
+        "STORAGE_DB_PATH": os.path.join(work_dir, "resumes.db"),
+        "SCORE_CACHE_PATH": os.path.join(work_dir, "score_cache.db"),
+        "UPLOAD_FOLDER": os.path.join(work_dir, "uploads"),
+        "LOG_LEVEL": os.getenv("LOG_LEVEL", "WARNING"),
+    })
+
+    results = []
+    try:
+        for size in sizes:
+            # A distinct seed per size keeps /upload from treating larger corpora as duplicates
+            files = generate_corpus(os.path.join(work_dir, f"corpus_{size}"), size, formats, args.seed + size)
+            print(f"Corpus of {size} resumes x {len(formats)} formats")
+            if "parser" not in skip:
+                results += bench_parser(files, size, args.repeat)
+            if "storage" not in skip:
+                results += bench_storage(work_dir, size, args.repeat, args.seed)
+            if "upload" not in skip:
+                results += bench_upload(files, size, args.repeat)
+    finally:
+        if not args.keep_corpus:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "sizes": sizes,
+            "formats": formats,
+            "repeat": args.repeat,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+
+    print(f"\n{'benchmark':<28} {'size':>6} {'variant':<14} {'n':>6} {'mean':>10} {'p50':>10} {'p95':>10}")
+    for row in results:
+        print(f"{row['benchmark']:<28} {row['size']:>6} {row['variant']:<14} {row['n']:>6} "
+              f"{row['mean_ms']:>8.3f}ms {row['p50_ms']:>8.3f}ms {row['p95_ms']:>8.3f}ms")
+
+    output = args.output or os.path.join(DEFAULT_RESULTS_DIR, f"bench-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as fh:
+        json.dump(report, fh, indent=2)
+    print(f"\nSaved report to {output}")
+
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,10 @@
 import requests
 import json
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Iterator, Callable
 import os
 from pathlib import Path
 import logging
+import time
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -22,6 +23,10 @@ class ResumeScreenerAPI:
 
         self.session = requests.Session()
         self.session.timeout = 30  # 30 second timeout
+        self.stream_read_timeout = float(os.getenv('MATCH_STREAM_READ_TIMEOUT', '120'))
+        self.batch_upload_timeout = float(os.getenv('BATCH_UPLOAD_TIMEOUT', '600'))
+        # (query params) -> (ETag, response body) for conditional /candidates requests
+        self._candidates_cache = {}
 
     def _make_request(self, method: str, endpoint: str, **kwargs) -> requests.Response:
         """Make HTTP request with error handling"""
@@ -80,14 +85,80 @@ class ResumeScreenerAPI:
                 'message': 'Failed to upload resume'
             }
 
-    def get_candidates(self) -> Dict[str, Any]:
-        """Get all candidates from backend"""
+    def upload_resume_files(self, files: List[Any]) -> Dict[str, Any]:
+        """Upload several resume files (or zip archives) in one /upload/batch request"""
         try:
-            response = self._make_request('GET', '/candidates')
-            result = response.json()
-            
-            # Backend returns: {"success": True, "message": "...", "data": [candidates]}
+            multipart = [('resumes', file) for file in files]
+            # Batches are parsed synchronously, so allow well beyond the default timeout
+            response = self._make_request('POST', '/upload/batch', files=multipart,
+                                          timeout=self.batch_upload_timeout)
+            return response.json()
+
+        except Exception as e:
+            logger.error(f"Batch upload failed: {str(e)}")
+            return {
+                'success': False,
+                'error': str(e),
+                'data': None,
+                'message': 'Failed to upload resumes'
+            }
+
+    def get_job(self, job_id: str) -> Dict[str, Any]:
+        """Get the status of an ingestion job"""
+        try:
+            response = self._make_request('GET', f'/jobs/{job_id}')
+            # Backend returns: {"success": True, "message": "...", "data": job_dict}
+            return response.json()
+
+        except Exception as e:
+            logger.error(f"Failed to fetch job {job_id}: {str(e)}")
+            return {
+                'success': False,
+                'error': str(e),
+                'data': None,
+                'message': f'Failed to retrieve job {job_id}'
+            }
+
+    def wait_for_job(self, job_id: str, timeout: float = 120.0, interval: float = 0.5) -> Dict[str, Any]:
+        """Poll an ingestion job until it is done or failed, or timeout expires"""
+        deadline = time.monotonic() + timeout
+        while True:
+            result = self.get_job(job_id)
+            job = result.get('data') or {}
+            if not result.get('success') or job.get('status') in ('done', 'failed'):
+                return result
+            if time.monotonic() >= deadline:
+                return {
+                    'success': False,
+                    'error': 'timeout',
+                    'data': job,
+                    'message': f'Job {job_id} still {job.get("status")} after {timeout:.0f}s'
+                }
+            time.sleep(interval)
+
+    def get_candidates(self, limit: Optional[int] = None, offset: int = 0,
+                       fields: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Get one page of candidates; unchanged pages are revalidated with their ETag"""
+        try:
+            params = {'offset': offset}
+            if limit is not None:
+                params['limit'] = limit
+            if fields:
+                params['fields'] = ','.join(fields)
+            cache_key = tuple(sorted(params.items()))
+            cached = self._candidates_cache.get(cache_key)
+            headers = {'If-None-Match': cached[0]} if cached else {}
+
+            response = self._make_request('GET', '/candidates', params=params, headers=headers)
+            if response.status_code == 304 and cached:
+                return cached[1]
+
+            # Backend returns: {"success": True, "message": "...", "data": [candidates], "pagination": {...}}
             # Return it directly without wrapping again
+            result = response.json()
+            etag = response.headers.get('ETag')
+            if etag:
+                self._candidates_cache[cache_key] = (etag, result)
             return result
 
         except Exception as e:
@@ -119,20 +190,91 @@ class ResumeScreenerAPI:
                 'message': f'Failed to retrieve candidate {candidate_id}'
             }
 
-    def match_candidates(self, job_description: str, min_score: float = 0.0) -> Dict[str, Any]:
-        """Match candidates against job description"""
+    def search_candidates(self, query: str, limit: int = 20, offset: int = 0,
+                          include: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Full-text candidate search (no LLM): boolean operators, "phrases" and field:term filters"""
         try:
-            data = {
-                'job_description': job_description.strip(),
-                'min_score': min_score
+            params = {'q': query, 'limit': limit, 'offset': offset}
+            if include:
+                params['include'] = ','.join(include)
+            response = self._make_request('GET', '/search', params=params)
+            return response.json()
+        except Exception as e:
+            logger.error(f"Search failed: {str(e)}")
+            return {
+                'success': False,
+                'error': str(e),
+                'data': {'hits': [], 'total_hits': 0},
+                'message': 'Failed to search candidates'
             }
 
-            response = self._make_request('POST', '/match', json=data)
-            result = response.json()
-            
-            # Backend returns: {"success": True, "message": "...", "data": {results, total_candidates, ...}}
-            # Return it directly - no need to re-sort or re-filter, backend already does this
-            return result
+    def stream_match_candidates(self, job_description: str, min_score: float = 0.0,
+                                mode: Optional[str] = None, explain_top: int = 0) -> Iterator[Dict[str, Any]]:
+        """Yield /match/stream events (start, result..., summary, explanation...) as the backend emits them"""
+        data = {
+            'job_description': job_description.strip(),
+            'min_score': min_score
+        }
+        if mode:
+            data['mode'] = mode
+            data['explain_top'] = explain_top
+        # No overall deadline: the read timeout only bounds the gap between two events
+        response = self._make_request('POST', '/match/stream', json=data, stream=True,
+                                      timeout=(10, self.stream_read_timeout))
+        with response:
+            for line in response.iter_lines(decode_unicode=True):
+                if line:
+                    yield json.loads(line)
+
+    def match_candidates(self, job_description: str, min_score: float = 0.0,
+                         on_result: Optional[Callable[[Dict[str, Any]], None]] = None,
+                         mode: Optional[str] = None, explain_top: int = 0) -> Dict[str, Any]:
+        """
+        Match candidates against job description, calling on_result as each result streams in.
+        In "rank" mode only the explain_top best results come back with justifications;
+        on_result is called again with each of them once explained.
+        """
+        try:
+            start = {}
+            results = []
+            summary = None
+
+            for event in self.stream_match_candidates(job_description, min_score, mode, explain_top):
+                kind = event.get('event')
+                if kind == 'start':
+                    start = event
+                elif kind in ('result', 'explanation'):
+                    results.append(event['result'])
+                    if on_result:
+                        on_result(event['result'])
+                elif kind == 'summary':
+                    summary = event
+                elif kind == 'error':
+                    raise RuntimeError(event.get('message', 'Matching failed'))
+
+            if summary is None:
+                raise RuntimeError('Match stream ended before the summary event')
+
+            # Order results by the backend's final ranking; explanations replace their ranking-only rows
+            by_id = {r['candidate_id']: r for r in results}
+            ranked = [by_id[cid] for cid in summary.get('ranking', []) if cid in by_id]
+
+            return {
+                'success': True,
+                'message': f"Matched {len(ranked)} candidates against job description",
+                'data': {
+                    'job_description': job_description.strip(),
+                    'results': ranked,
+                    'total_candidates': summary.get('total_candidates', 0),
+                    'scored_candidates': summary.get('scored_candidates', 0),
+                    'matched_candidates': summary.get('matched_candidates', len(ranked)),
+                    'pruned_count': start.get('pruned_count', 0),
+                    'pruned_candidates': start.get('pruned_candidates', []),
+                    'min_score': summary.get('min_score', min_score),
+                    'mode': summary.get('mode', mode or 'full'),
+                    'timestamp': summary.get('timestamp')
+                }
+            }
 
         except Exception as e:
             logger.error(f"Matching failed: {str(e)}")
@@ -144,10 +286,118 @@ class ResumeScreenerAPI:
                 'message': 'Failed to perform candidate matching'
             }
 
+    def match_with_deadline(self, job_description: str, min_score: float = 0.0, deadline_ms: int = 25000,
+                            mode: Optional[str] = None, explain_top: int = 0) -> Dict[str, Any]:
+        """
+        One /match call that answers within deadline_ms. If scoring is not finished by then,
+        data['partial'] is True and data['continuation_token'] fetches the rest via get_match_run
+        """
+        try:
+            data = {
+                'job_description': job_description.strip(),
+                'min_score': min_score,
+                'deadline_ms': deadline_ms
+            }
+            if mode:
+                data['mode'] = mode
+                data['explain_top'] = explain_top
+            response = self._make_request('POST', '/match', json=data,
+                                          timeout=(10, deadline_ms / 1000.0 + self.session.timeout))
+            return response.json()
+        except Exception as e:
+            logger.error(f"Matching failed: {str(e)}")
+            return {
+                'success': False,
+                'error': str(e),
+                'data': None,
+                'message': 'Failed to perform candidate matching'
+            }
+
+    def get_match_run(self, continuation_token: str) -> Dict[str, Any]:
+        """Current results of a /match that returned partial results; partial is False once complete"""
+        try:
+            response = self._make_request('GET', f'/match/runs/{continuation_token}')
+            return response.json()
+        except Exception as e:
+            logger.error(f"Failed to fetch match run {continuation_token}: {str(e)}")
+            return {
+                'success': False,
+                'error': str(e),
+                'data': None,
+                'message': f'Failed to retrieve match run {continuation_token}'
+            }
+
+    def explain_candidates(self, job_description: str, candidate_ids: List[str]) -> Dict[str, Any]:
+        """Fetch justification, matches and recommendation for specific candidates"""
+        try:
+            data = {
+                'job_description': job_description.strip(),
+                'candidate_ids': list(candidate_ids)
+            }
+            response = self._make_request('POST', '/match/explain', json=data)
+            return response.json()
+        except Exception as e:
+            logger.error(f"Explaining candidates failed: {str(e)}")
+            return {
+                'success': False,
+                'error': str(e),
+                'data': {'results': []},
+                'message': 'Failed to explain candidates'
+            }
+
+    def _requisition_call(self, method: str, endpoint: str, failure: str, **kwargs) -> Dict[str, Any]:
+        try:
+            response = self._make_request(method, endpoint, **kwargs)
+            return response.json()
+        except Exception as e:
+            logger.error(f"{failure}: {str(e)}")
+            return {'success': False, 'error': str(e), 'data': None, 'message': failure}
+
+    def list_requisitions(self, status: Optional[str] = None) -> Dict[str, Any]:
+        """Saved job requisitions, optionally only 'open' or 'closed' ones"""
+        params = {'status': status} if status else None
+        return self._requisition_call('GET', '/requisitions', 'Failed to list requisitions', params=params)
+
+    def create_requisition(self, title: str, job_description: str, min_score: float = 0.0,
+                           top_k: Optional[int] = None) -> Dict[str, Any]:
+        """Save a requisition; the backend scores the corpus against it in the background"""
+        data = {'title': title, 'job_description': job_description.strip(), 'min_score': min_score}
+        if top_k is not None:
+            data['top_k'] = top_k
+        return self._requisition_call('POST', '/requisitions', 'Failed to save requisition', json=data)
+
+    def update_requisition(self, requisition_id: str, **fields) -> Dict[str, Any]:
+        """Change title, job_description, status, min_score or top_k of a requisition"""
+        return self._requisition_call('PATCH', f'/requisitions/{requisition_id}',
+                                      'Failed to update requisition', json=fields)
+
+    def get_requisition_results(self, requisition_id: str, min_score: Optional[float] = None,
+                                limit: Optional[int] = None, offset: int = 0) -> Dict[str, Any]:
+        """Stored match results of a requisition, without scoring anything"""
+        params = {'offset': offset}
+        if min_score is not None:
+            params['min_score'] = min_score
+        if limit is not None:
+            params['limit'] = limit
+        return self._requisition_call('GET', f'/requisitions/{requisition_id}/results',
+                                      'Failed to read requisition results', params=params)
+
+    def match_requisition(self, requisition_id: str, min_score: Optional[float] = None,
+                          limit: Optional[int] = None) -> Dict[str, Any]:
+        """Re-match a requisition; only new or changed candidates are scored"""
+        params = {}
+        if min_score is not None:
+            params['min_score'] = min_score
+        if limit is not None:
+            params['limit'] = limit
+        return self._requisition_call('POST', f'/requisitions/{requisition_id}/match',
+                                      'Failed to match requisition', params=params)
+
     def get_stats(self) -> Dict[str, Any]:
         """Get application statistics"""
         try:
-            candidates_result = self.get_candidates()
+            # Only the total is needed, so fetch the smallest possible page
+            candidates_result = self.get_candidates(limit=1, fields=['id'])
 
             if not candidates_result['success']:
                 return {
@@ -156,10 +406,10 @@ class ResumeScreenerAPI:
                     'data': {}
                 }
 
-            candidates = candidates_result['data']
+            pagination = candidates_result.get('pagination', {})
 
             # Calculate statistics
-            total_candidates = len(candidates)
+            total_candidates = pagination.get('total', len(candidates_result['data']))
             avg_score = 0.0
 
             if total_candidates > 0:
@@ -231,6 +231,9 @@ def load_css():
 # Initialize API client
 api = ResumeScreenerAPI()
 
+# Candidates shown per page on the Candidates view
+CANDIDATES_PAGE_SIZE = int(os.getenv('CANDIDATES_PAGE_SIZE', '25'))
+
 # Sidebar navigation component
 def sidebar_navigation():
     st.markdown('<div class="sidebar-header">', unsafe_allow_html=True)
@@ -355,13 +358,13 @@ def show_upload():
     st.markdown('<div class="fade-in">', unsafe_allow_html=True)
     st.title("📤 Upload Resume")
 
-    st.markdown("Upload PDF, DOCX, or TXT resume files for processing.")
+    st.markdown("Upload PDF, DOCX, or TXT resume files for processing, or a ZIP archive of them.")
 
     # File uploader with custom styling
     st.markdown('<div class="upload-area">', unsafe_allow_html=True)
     uploaded_files = st.file_uploader(
         "Choose resume files",
-        type=['pdf', 'docx', 'txt'],
+        type=['pdf', 'docx', 'txt', 'zip'],
         accept_multiple_files=True,
         help="You can upload multiple files at once"
     )
@@ -373,14 +376,38 @@ def show_upload():
         if st.button("🚀 Process Resumes", type="primary", use_container_width=True):
             with st.spinner("Processing resumes..."):
                 success_count = 0
-                for file in uploaded_files:
+                if len(uploaded_files) > 1 or uploaded_files[0].name.lower().endswith('.zip'):
+                    # Many files: one batch request, parsed in parallel on the backend
+                    result = api.upload_resume_files(uploaded_files)
+                    if result.get('success'):
+                        for entry in result['data']['files']:
+                            if entry['status'] == 'done':
+                                success_count += 1
+                                st.success(f"✅ {entry['filename']} processed successfully")
+                            elif entry['status'] == 'duplicate':
+                                success_count += 1
+                                st.info(f"♻️ {entry['filename']} was already uploaded (candidate {entry['candidate_id']})")
+                            else:
+                                st.error(f"❌ Failed to process {entry['filename']}: {entry.get('error')}")
+                    else:
+                        st.error(f"❌ Batch upload failed: {result.get('message')}")
+                else:
+                    file = uploaded_files[0]
                     st.info(f"Processing: {file.name}")
                     try:
-                        # Upload file to backend
+                        # Upload file to backend; parsing continues in a backend worker
                         result = api.upload_resume_file(file)
-                        if result.get('success'):
+                        if result.get('success') and result['data']['data'].get('duplicate'):
                             success_count += 1
-                            st.success(f"✅ {file.name} processed successfully")
+                            st.info(f"♻️ {file.name} was already uploaded")
+                        elif result.get('success'):
+                            result = api.wait_for_job(result['data']['data']['job_id'])
+                            job = result.get('data') or {}
+                            if result.get('success') and job.get('status') == 'done':
+                                success_count += 1
+                                st.success(f"✅ {file.name} processed successfully")
+                            else:
+                                st.error(f"❌ Failed to process {file.name}: {job.get('error') or result.get('message')}")
                         else:
                             st.error(f"❌ Failed to process {file.name}: {result.get('message')}")
                     except Exception as e:
@@ -409,12 +436,17 @@ def show_candidates():
     st.markdown('<div class="fade-in">', unsafe_allow_html=True)
     st.title("👥 Candidates")
 
-    # Get candidates from API
+    offset = st.session_state.get('candidates_offset', 0)
+    pagination = {}
+
+    # Get one page of candidates from API
     try:
-        result = api.get_candidates()
+        result = api.get_candidates(limit=CANDIDATES_PAGE_SIZE, offset=offset,
+                                    fields=['id', 'name', 'filename', 'email', 'phone', 'skills'])
         if result.get('success'):
-            # Backend returns: {"success": True, "message": "...", "data": [candidates]}
+            # Backend returns: {"success": True, "message": "...", "data": [candidates], "pagination": {...}}
             candidates = result.get('data', [])
+            pagination = result.get('pagination', {})
             
             # Verify we got a list
             if not isinstance(candidates, list):
@@ -427,6 +459,11 @@ def show_candidates():
         st.error(f"Error connecting to backend: {str(e)}")
         candidates = []
 
+    if not candidates and offset > 0:
+        # The page we were on no longer exists (e.g. the corpus shrank); go back to the start
+        st.session_state.candidates_offset = 0
+        st.rerun()
+
     if not candidates:
         st.info("👋 No candidates uploaded yet. Start by uploading some resumes!")
         if st.button("📤 Go to Upload", use_container_width=True):
@@ -434,7 +471,18 @@ def show_candidates():
             st.rerun()
         return
 
-    st.success(f"📊 Found {len(candidates)} candidates")
+    total = pagination.get('total', len(candidates))
+    st.success(f"📊 Found {total} candidates (showing {offset + 1}-{offset + len(candidates)})")
+
+    prev_col, _, next_col = st.columns([1, 3, 1])
+    with prev_col:
+        if st.button("⬅️ Previous", disabled=offset == 0, use_container_width=True):
+            st.session_state.candidates_offset = max(0, offset - CANDIDATES_PAGE_SIZE)
+            st.rerun()
+    with next_col:
+        if st.button("Next ➡️", disabled=pagination.get('next_offset') is None, use_container_width=True):
+            st.session_state.candidates_offset = pagination['next_offset']
+            st.rerun()
 
     # Display candidates in a nice table
     for candidate in candidates:
@@ -503,57 +551,83 @@ def show_matching():
             help="Maximum number of candidates to display"
         )
 
+    fast_ranking = st.checkbox(
+        "Fast ranking",
+        value=True,
+        help="Score every candidate without explanations, then explain only the results shown"
+    )
+
     if st.button("🔍 Find Matches", type="primary", use_container_width=True):
         if not job_description.strip():
             st.error("Please enter a job description")
             return
 
-        with st.spinner("Analyzing candidates..."):
-            try:
-                # Call backend API for matching
-                result = api.match_candidates(job_description, min_score)
-
-                if result.get('success'):
-                    # Backend returns data object with 'results' array
-                    data = result.get('data', {})
-                    matches = data.get('results', [])
-
-                    if matches:
-                        st.success(f"🎯 Found {len(matches)} matching candidates")
-
-                        for i, match in enumerate(matches[:max_candidates]):
-                            score = match.get('score', 0)
-                            candidate_name = match.get('candidate_name', 'Unknown')
-                            justification = match.get('justification', 'No reasoning provided')
-
-                            # Convert score to percentage for display
-                            score_percentage = score * 100
-
-                            with st.container():
-                                st.markdown(f"""
-                                <div class="metric-card">
-                                    <h4>{candidate_name}</h4>
-                                    <p><strong>Match Score: {score:.2f} ({score_percentage:.0f}%)</strong></p>
-                                    <p>{justification}</p>
-                                </div>
-                                """, unsafe_allow_html=True)
-
-                                # Show matches if available
-                                candidate_matches = match.get('matches', [])
-                                if candidate_matches:
-                                    st.write("**Matching Skills:**")
-                                    for skill in candidate_matches[:5]:  # Show top 5 matches
-                                        st.markdown(f"• {skill}")
-                    else:
-                        st.warning("No matches found. Try adjusting your criteria or minimum score.")
+        status_area = st.empty()
+        results_area = st.empty()
+        streamed = {}
+
+        def show_progress(match):
+            # Re-render the current top results as each candidate's score (or explanation) arrives
+            streamed[match['candidate_id']] = match
+            top = sorted(streamed.values(), key=lambda m: m.get('score', 0), reverse=True)
+            status_area.info(f"⏳ Scored {len(streamed)} matching candidate(s) so far...")
+            with results_area.container():
+                for m in top[:max_candidates]:
+                    render_match_card(m)
+
+        try:
+            # Call backend API for matching; results stream in as they are scored
+            result = api.match_candidates(
+                job_description, min_score, on_result=show_progress,
+                mode='rank' if fast_ranking else 'full', explain_top=max_candidates
+            )
+
+            if result.get('success'):
+                # Backend returns data object with 'results' array
+                data = result.get('data', {})
+                matches = data.get('results', [])
+
+                if matches:
+                    status_area.success(f"🎯 Found {len(matches)} matching candidates")
+                    with results_area.container():
+                        for match in matches[:max_candidates]:
+                            render_match_card(match)
                 else:
-                    st.error(f"Matching failed: {result.get('message')}")
+                    status_area.warning("No matches found. Try adjusting your criteria or minimum score.")
+            else:
+                status_area.error(f"Matching failed: {result.get('message')}")
 
-            except Exception as e:
-                st.error(f"Error during matching: {str(e)}")
+        except Exception as e:
+            st.error(f"Error during matching: {str(e)}")
 
     st.markdown('</div>', unsafe_allow_html=True)
 
+def render_match_card(match):
+    score = match.get('score', 0)
+    candidate_name = match.get('candidate_name', 'Unknown')
+    justification = match.get('justification') or (
+        'Explanation pending...' if match.get('explained') is False else 'No reasoning provided'
+    )
+
+    # Convert score to percentage for display
+    score_percentage = score * 100
+
+    with st.container():
+        st.markdown(f"""
+        <div class="metric-card">
+            <h4>{candidate_name}</h4>
+            <p><strong>Match Score: {score:.2f} ({score_percentage:.0f}%)</strong></p>
+            <p>{justification}</p>
+        </div>
+        """, unsafe_allow_html=True)
+
+        # Show matches if available
+        candidate_matches = match.get('matches', [])
+        if candidate_matches:
+            st.write("**Matching Skills:**")
+            for skill in candidate_matches[:5]:  # Show top 5 matches
+                st.markdown(f"• {skill}")
+
 # Analytics page
 def show_analytics():
     st.markdown('<div class="fade-in">', unsafe_allow_html=True)
@@ -0,0 +1,61 @@
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+import pytest
+import requests
+
+import llm_client
+import llm_router
+from llm_router import Backend, LLMRouter
+
+
+class FakeSession:
+    """Answers each POST by backend URL: an exception to raise or a status code."""
+
+    def __init__(self, replies):
+        self.replies = replies
+        self.bodies = []
+
+    def post(self, url, headers=None, json=None, timeout=None):
+        self.bodies.append((url, json))
+        reply = self.replies[url]
+        if isinstance(reply, Exception):
+            raise reply
+        response = requests.Response()
+        response.status_code = reply(json) if callable(reply) else reply
+        response.url = url
+        response._content = b'{"choices": [{"message": {"content": "{}"}}]}'
+        return response
+
+
+@pytest.fixture
+def backends(monkeypatch):
+    first = Backend("first", "http://first/v1", "m")
+    second = Backend("second", "http://second/v1", "m")
+    monkeypatch.setattr(llm_router, "_router", LLMRouter([first, second]))
+    monkeypatch.setattr(llm_client, "LLM_MAX_RETRIES", 1)
+    return first, second
+
+
+def test_unexpected_request_error_releases_inflight(backends, monkeypatch):
+    first, _ = backends
+    monkeypatch.setattr(llm_client, "_session", FakeSession({first.url: requests.exceptions.InvalidURL("bad")}))
+    with pytest.raises(requests.exceptions.InvalidURL):
+        llm_client.post_with_retries({"messages": []}, 10, first)
+    assert first.inflight == 0
+    assert first.failures == 1
+
+
+def test_json_mode_cleared_on_rejecting_backend(backends, monkeypatch):
+    first, second = backends
+    session = FakeSession({
+        first.url: 503,
+        second.url: lambda body: 400 if "response_format" in body else 200,
+    })
+    monkeypatch.setattr(llm_client, "_session", session)
+    payload = {"messages": [], "response_format": {"type": "json_object"}}
+    response = llm_client.send_completion(first, payload, 10)
+    assert response.ok
+    assert first.json_mode
+    assert not second.json_mode
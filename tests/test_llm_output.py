@@ -0,0 +1,42 @@
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+import pytest
+
+import llm_client
+from llm_output import normalize_score
+
+
+@pytest.mark.parametrize("value, expected", [
+    (0.85, 0.85),
+    ("0.85", 0.85),
+    (1.05, 1.0),
+    (1.2, 1.0),
+    (8.5, 0.85),
+    ("8.5/10", 0.85),
+    (10.5, 1.0),
+    (85, 0.85),
+    ("85%", 0.85),
+    (-0.2, 0.0),
+])
+def test_normalize_score(value, expected):
+    assert normalize_score(value) == expected
+
+
+@pytest.mark.parametrize("value", [[0.8], {"score": 0.8}, None, True, "high", float("nan")])
+def test_normalize_score_rejects_non_numbers(value):
+    with pytest.raises(ValueError):
+        normalize_score(value)
+
+
+def test_batch_output_skips_unusable_score():
+    output = '{"results": [{"id": "a", "score": [0.8]}, {"id": "b", "score": 0.7}]}'
+    results = llm_client.parse_batch_output(output, score_only=True)
+    assert results == {"b": {"score": 0.7}}
+
+
+def test_rate_candidate_repairs_non_numeric_score(monkeypatch):
+    replies = iter(['{"score": [0.8]}', '{"score": 0.8}'])
+    monkeypatch.setattr(llm_client, "call_llm_groq", lambda *args, **kwargs: next(replies))
+    assert llm_client.rate_candidate("python", "python developer", score_only=True) == {"score": 0.8}
@@ -0,0 +1,76 @@
+import os
+import sys
+import time
+import tempfile
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+_tmp = tempfile.mkdtemp()
+os.environ.setdefault("STORAGE_DB_PATH", os.path.join(_tmp, "resumes.db"))
+os.environ.setdefault("SCORE_CACHE_PATH", os.path.join(_tmp, "score_cache.db"))
+os.environ.setdefault("UPLOAD_FOLDER", os.path.join(_tmp, "uploads"))
+
+import pytest
+
+import app as app_module
+import match_runs
+
+RECORDS = [{"id": f"c{i}", "name": f"Candidate {i}", "skills": "python"} for i in range(3)]
+
+
+def slow_scores(recs, job_desc, workers=None, batch_size=None, score_only=False):
+    for rec in recs:
+        time.sleep(0.1)
+        yield {"candidate_id": rec["id"], "candidate_name": rec["name"], "score": 0.5}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(app_module, "MATCH_DEADLINE_MS", 50)
+    monkeypatch.setattr(app_module, "read_all_records", lambda: list(RECORDS))
+    monkeypatch.setattr(match_runs, "iter_scored", slow_scores)
+    monkeypatch.setattr(match_runs, "_registry", None)
+    return app_module.app.test_client()
+
+
+def test_default_deadline_applies(client):
+    body = client.post("/match", json={"job_description": "python developer one"}).get_json()["data"]
+    assert body["partial"]
+    assert body["continuation_token"]
+
+
+def test_zero_deadline_overrides_default(client):
+    body = client.post("/match", json={"job_description": "python developer two", "deadline_ms": 0}).get_json()["data"]
+    assert not body["partial"]
+    assert body["matched_candidates"] == len(RECORDS)
+
+
+def test_coalesced_call_uses_its_own_include(client):
+    jd = "python developer three"
+    first = client.post("/match", json={"job_description": jd, "include": "*"}).get_json()["data"]
+    second = client.post("/match", json={"job_description": jd, "deadline_ms": 0}).get_json()["data"]
+    assert first["partial"]
+    assert second["coalesced"]
+    assert all("candidate_data" not in result for result in second["results"])
+
+    third = client.post("/match", json={"job_description": "python developer four"}).get_json()["data"]
+    fourth = client.post("/match", json={"job_description": "python developer four", "include": ["name"],
+                                         "deadline_ms": 0}).get_json()["data"]
+    assert fourth["coalesced"]
+    assert all(result["candidate_data"] == {"name": result["candidate_name"]} for result in fourth["results"])
+    assert all("candidate_data" not in result for result in third["results"])
+
+
+def test_numeric_string_min_score_is_accepted(client):
+    body = client.post("/match", json={"job_description": "python developer five", "min_score": "0.5",
+                                       "deadline_ms": 0}).get_json()["data"]
+    assert body["min_score"] == 0.5
+    assert body["matched_candidates"] == len(RECORDS)
+
+
+@pytest.mark.parametrize("min_score", ["high", [0.5], "nan"])
+def test_invalid_min_score_is_rejected_before_scoring(client, monkeypatch, min_score):
+    started = []
+    monkeypatch.setattr(match_runs.MatchRun, "start", lambda run: started.append(run) or run)
+    response = client.post("/match", json={"job_description": "python developer six", "min_score": min_score})
+    assert response.status_code == 400
+    assert not started
@@ -0,0 +1,27 @@
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from match_runs import match_key
+from prefilter import MATCH_PREFILTER_TOP_K
+
+
+def options(**fields):
+    return dict({"mode": "full", "explain_top": 5}, **fields)
+
+
+def test_match_key_uses_resolved_options():
+    jd = "Senior  Python developer\n"
+    keys = {
+        match_key(jd, options(top_k=MATCH_PREFILTER_TOP_K), "v1"),
+        match_key(jd, options(top_k=str(MATCH_PREFILTER_TOP_K)), "v1"),
+        match_key(jd.strip(), options(), "v1"),
+    }
+    assert len(keys) == 1
+
+
+def test_match_key_separates_what_changes_results():
+    jd = "Python developer"
+    assert match_key(jd, options(), "v1") != match_key(jd, options(), "v2")
+    assert match_key(jd, options(top_k=3), "v1") != match_key(jd, options(top_k=4), "v1")
+    assert match_key(jd, options(mode="rank"), "v1") != match_key(jd, options(mode="rank", explain_top=1), "v1")
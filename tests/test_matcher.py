@@ -0,0 +1,12 @@
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from matcher import score_key
+
+
+def test_score_key_separates_digest_and_raw_prompts():
+    jd = "Senior Python developer " * 50
+    raw = score_key("python", jd)
+    assert score_key("python", jd, requirements=jd) == raw
+    assert score_key("python", jd, requirements="Must have: Python") != raw